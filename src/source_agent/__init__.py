@@ -1,10 +1,51 @@
-# ruff: noqa: F401
 # Configure clean imports for the package
 # See: https://hynek.me/articles/testing-packaging/
+#
+# Submodules are imported on first attribute access (PEP 562), so `import
+# source_agent` stays cheap and e.g. `source_agent.paths` never pays for
+# `openai`. `source_agent.agents` imports both agent implementations.
+import importlib
 
-from . import tools, agents, providers
-from .tools import tool_registry
-from .agents import code
 
+_SUBMODULES = {
+    "agents": (".agents.code", ".agents.async_code", ".agents"),
+    "code": (".agents.code",),
+    "async_code": (".agents.async_code",),
+    "tools": (".tools",),
+    "tool_registry": (".tools.tool_registry",),
+    "providers": (".providers",),
+    "context": (".context",),
+    "artifacts": (".artifacts",),
+    "prompt_cache": (".prompt_cache",),
+    "llm_cache": (".llm_cache",),
+    "paths": (".paths",),
+    "telemetry": (".telemetry",),
+    "batch": (".batch",),
+    "ratelimit": (".ratelimit",),
+    "failover": (".failover",),
+    "mock_server": (".mock_server",),
+    "loop_bench": (".loop_bench",),
+    "bench": (".bench",),
+    "sessions": (".sessions",),
+    "budget": (".budget",),
+    "repomap": (".repomap",),
+    "profiler": (".profiler",),
+    "search": (".search",),
+    "search_index": (".search_index",),
+    "ignore": (".ignore",),
+}
 
-__all__ = ["agents", "code", "tools", "tool_registry", "providers"]
+__all__ = list(_SUBMODULES)
+
+
+def __getattr__(name):
+    if name not in _SUBMODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    for path in _SUBMODULES[name]:
+        module = importlib.import_module(path, __name__)
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
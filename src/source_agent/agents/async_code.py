@@ -0,0 +1,228 @@
+import sys
+import openai
+import asyncio
+import source_agent
+from .code import (
+    RETRYABLE_OPENAI_ERRORS,
+    CodeAgent,
+    AgentEvent,
+    AgentEventType,
+    StreamAccumulator,
+)
+from typing import List, AsyncIterator
+
+
+class AsyncCodeAgent(CodeAgent):
+    """
+    Asyncio variant of `CodeAgent`.
+
+    Uses `openai.AsyncOpenAI`, sleeps with `asyncio.sleep` between retries and
+    runs the (blocking) tools in the event loop's default executor, so many
+    sessions can share a single event loop. Use `arun()` instead of `run()`.
+    """
+
+    def _create_session(self):
+        """Return the async API client used for chat completions."""
+        return source_agent.providers.get_async_client(
+            base_url=self.base_url,
+            api_key=self.api_key,
+        )
+
+    def _summary_session(self):
+        """
+        Return the blocking client used by `summarize_messages`.
+
+        Compaction runs in the default executor, so summaries are requested
+        through the shared sync client rather than the async session.
+        """
+        return source_agent.providers.get_client(
+            base_url=self.base_url,
+            api_key=self.api_key,
+        )
+
+    async def arun(
+        self, user_prompt: str = None, max_steps: int = None
+    ) -> AsyncIterator[AgentEvent]:
+        """
+        Run a full ReAct-style loop with tool usage, yielding events at each step.
+
+        Args:
+            user_prompt: Optional user input to start the conversation.
+            max_steps: Maximum steps before stopping.
+
+        Yields:
+            AgentEvent: An event describing the current state or action of the agent.
+                The last event is always a RUN_SUMMARY with timings and token totals.
+        """
+        self.telemetry = source_agent.telemetry.RunTelemetry()
+        async for event in self._arun_steps(user_prompt, max_steps):
+            yield self._record_event(event)
+        yield self._record_event(self._run_summary_event())
+
+    async def _arun_steps(
+        self, user_prompt: str = None, max_steps: int = None
+    ) -> AsyncIterator[AgentEvent]:
+        """The ReAct loop behind `arun`, without the final summary."""
+        if user_prompt:
+            self._append_message({"role": "user", "content": user_prompt})
+
+        steps = max_steps or self.MAX_STEPS
+
+        for step in range(1, steps + 1):
+            yield self._iteration_start_event(step, steps)
+
+            # Compaction may call a (blocking) summarizer, keep it off the loop
+            compacted_event = await asyncio.get_running_loop().run_in_executor(
+                None, self._compact_context
+            )
+            if compacted_event:
+                yield compacted_event
+
+            budget_event = self._check_budget()
+            if budget_event:
+                yield budget_event
+                return
+
+            try:
+                # Same bookkeeping as `CodeAgent._complete`, with awaited requests
+                started, key, cached = self._start_completion(self.messages)
+                if cached:
+                    message, usage = cached
+                elif self.stream:
+                    accumulator = StreamAccumulator()
+                    stream = await self._arequest(
+                        lambda agent: agent.acall_llm(self.messages, stream=True),
+                        hedge=False,
+                    )
+                    async for chunk in stream:
+                        event = self._chunk_event(accumulator, chunk)
+                        if event:
+                            yield event
+                    message, usage = accumulator.message(), accumulator.usage
+                else:
+                    response = await self._arequest(
+                        lambda agent: agent.acall_llm(self.messages)
+                    )
+                    message, usage = self._response_message(response)
+                self._finish_completion(started, key, message, usage, bool(cached))
+            except Exception as e:
+                yield self._llm_error_event(e)
+                return
+
+            yield self._llm_usage_event(step, usage, message)
+
+            self._append_message(message)
+
+            message_event = self._agent_message_event(message)
+            if message_event:
+                yield message_event
+
+            for batch in self.plan_tool_batches(message.tool_calls or []):
+                for tool_call in batch:
+                    yield self._tool_call_event(tool_call)
+
+                if batch[0].function.name == "msg_complete_tool":
+                    yield AgentEvent(
+                        type=AgentEventType.TASK_COMPLETE,
+                        data={"message": "Task marked complete!"},
+                    )
+                    return
+
+                for tool_call, result_message in zip(
+                    batch, await self.aexecute_tool_batch(batch), strict=True
+                ):
+                    self._append_message(result_message)
+                    yield self._tool_result_event(tool_call, result_message)
+
+        yield AgentEvent(
+            type=AgentEventType.MAX_STEPS_REACHED,
+            data={"message": f"Max steps ({steps}) reached without task completion."},
+        )
+
+    async def _arequest(self, call, hedge: bool = True):
+        """Async variant of `CodeAgent._request`; losing hedges are cancelled."""
+        if not self.fallback_agents:
+            return await call(self)
+        finished = []
+
+        async def attempt(agent):
+            try:
+                return await call(agent)
+            finally:
+                finished.append(agent)
+
+        try:
+            response, _ = await self._provider_chain().acall(
+                attempt, stats=self.llm_call_stats, hedge=hedge
+            )
+        finally:
+            self._merge_attempts(finished)
+        return response
+
+    async def aexecute_tool_batch(self, batch) -> List[dict]:
+        """
+        Execute a batch of tool calls in the default executor.
+
+        Results are returned in call order; at most `max_tool_workers` calls of
+        the batch run at the same time.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_tool_workers)
+
+        async def execute(tool_call):
+            async with semaphore:
+                return await loop.run_in_executor(
+                    None, self._timed_tool_call, tool_call
+                )
+
+        return list(await asyncio.gather(*(execute(call) for call in batch)))
+
+    async def acall_llm(
+        self,
+        messages,
+        max_retries: int = None,
+        backoff_base: float = None,
+        backoff_factor: float = None,
+        max_backoff: float = None,
+        stream: bool = False,
+    ):
+        """
+        Call the OpenAI-compatible chat API with retries, without blocking the loop.
+
+        Takes the same arguments as `CodeAgent.call_llm`.
+
+        Returns:
+            The response from the chat API, or an async chunk stream when `stream` is set.
+        """
+        retries = max_retries or self.MAX_RETRIES
+        base = backoff_base or self.BACKOFF_BASE
+        factor = backoff_factor or self.BACKOFF_FACTOR
+        cap = max_backoff or self.MAX_BACKOFF
+
+        for attempt in range(1, retries + 1):
+            self.llm_call_stats.attempts += 1
+            delay = self._throttle(messages)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                raw = await self.session.chat.completions.with_raw_response.create(
+                    **self._completion_kwargs(messages, stream)
+                )
+                self.rate_limiter.update(raw.headers)
+                return raw.parse()
+            except RETRYABLE_OPENAI_ERRORS as e:
+                delay = self._retry_delay(e, attempt, retries, base, factor, cap)
+                self.llm_call_stats.retries += 1
+                self.llm_call_stats.backoff_seconds += delay
+                await asyncio.sleep(delay)
+
+            except openai.OpenAIError as e:
+                print(
+                    f"❌ Non-retryable OpenAI error during LLM call: {e}",
+                    file=sys.stderr,
+                )
+                raise
+
+            except Exception as e:
+                print(f"❌ Unexpected error during LLM call: {e}", file=sys.stderr)
+                raise
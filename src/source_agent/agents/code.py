@@ -1,23 +1,40 @@
 import re
 import sys
+import copy
 import json
 import time
 import openai
 import random
 import source_agent
 from enum import Enum
-from typing import Any, Dict, Iterator
+from typing import Any, Dict, List, Tuple, Iterator, Optional, Generator
 from pathlib import Path
 from dataclasses import field, dataclass
+from openai.types.chat import ChatCompletionMessage
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Define specific OpenAI errors that are generally retryable.
+RETRYABLE_OPENAI_ERRORS = (
+    openai.RateLimitError,  # 429 status code
+    openai.APITimeoutError,  # Timeout during the API call
+    openai.APIConnectionError,  # Network connection issues
+    openai.APIStatusError,  # Only transient ones (408, 409, 5xx), see `_retry_delay`
+)
 
 
 class AgentEventType(Enum):
     ITERATION_START = "iteration_start"
     AGENT_MESSAGE = "agent_message"
+    AGENT_MESSAGE_DELTA = "agent_message_delta"
     TOOL_CALL = "tool_call"
     TOOL_RESULT = "tool_result"
+    LLM_USAGE = "llm_usage"
+    RUN_SUMMARY = "run_summary"
+    CONTEXT_COMPACTED = "context_compacted"
     TASK_COMPLETE = "task_complete"
     MAX_STEPS_REACHED = "max_steps_reached"
+    BUDGET_EXCEEDED = "budget_exceeded"
     ERROR = "error"
 
 
@@ -35,6 +52,73 @@ class AgentEvent:
     data: Dict[str, Any] = field(default_factory=dict)
 
 
+class StreamAccumulator:
+    """
+    Reassembles streamed chat completion chunks into a single assistant message.
+
+    Text deltas are concatenated and partial tool calls are merged by their
+    `index`, so the result has the same shape as a non-streamed message.
+    """
+
+    def __init__(self):
+        self.content_parts = []
+        self.tool_calls = {}
+        self.text_chunks = 0
+        self.usage = None
+
+    def add(self, chunk) -> str:
+        """
+        Merge a chunk into the accumulated message.
+
+        Args:
+            chunk: A streamed `ChatCompletionChunk`.
+
+        Returns:
+            The text delta carried by the chunk, or an empty string.
+        """
+        # With `include_usage`, the final chunk carries usage and no choices
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return ""
+
+        delta = chunk.choices[0].delta
+
+        for tool_call in delta.tool_calls or []:
+            entry = self.tool_calls.setdefault(
+                tool_call.index,
+                {
+                    "id": "",
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""},
+                },
+            )
+            if tool_call.id:
+                entry["id"] = tool_call.id
+            if tool_call.function:
+                if tool_call.function.name:
+                    entry["function"]["name"] += tool_call.function.name
+                if tool_call.function.arguments:
+                    entry["function"]["arguments"] += tool_call.function.arguments
+
+        text = delta.content or ""
+        if text:
+            self.content_parts.append(text)
+            self.text_chunks += 1
+        return text
+
+    def message(self) -> ChatCompletionMessage:
+        """Build the assistant message from everything received so far."""
+        tool_calls = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+        return ChatCompletionMessage.model_validate(
+            {
+                "role": "assistant",
+                "content": "".join(self.content_parts) or None,
+                "tool_calls": tool_calls or None,
+            }
+        )
+
+
 class CodeAgent:
     DEFAULT_SYSTEM_PROMPT_PATH = "AGENTS.md"
     MAX_STEPS = 12
@@ -42,6 +126,8 @@ class CodeAgent:
     BACKOFF_BASE = 1.0
     BACKOFF_FACTOR = 2.0
     MAX_BACKOFF = 60.0
+    MAX_TOOL_WORKERS = 8
+    ARTIFACT_THRESHOLD = 16_000
 
     def __init__(
         self,
@@ -50,29 +136,185 @@ class CodeAgent:
         model: str = None,
         temperature: float = 0.3,
         system_prompt: str = None,
+        stream: bool = False,
+        max_tool_workers: int = None,
+        context_manager: "source_agent.context.ContextWindowManager" = None,
+        artifact_threshold: int = None,
+        prompt_cache: str = None,
+        response_cache: "source_agent.llm_cache.ResponseCache" = None,
+        fallbacks: List["source_agent.failover.Fallback"] = None,
+        hedge_after: float = None,
+        journal: "source_agent.sessions.SessionJournal" = None,
+        budget: "source_agent.budget.Budget" = None,
+        repo_map: int = None,
     ):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
         self.temperature = temperature
+        self.stream = stream
+        self.max_tool_workers = max_tool_workers or self.MAX_TOOL_WORKERS
+        self.context_manager = context_manager
+        # One of the `source_agent.prompt_cache` modes, or None to disable
+        self.prompt_cache = prompt_cache
+        self.response_cache = response_cache
+        # Per-run caps, checked against an estimate before every request
+        self.budget = budget
+        self.token_estimator = source_agent.context.TokenEstimator()
+        self._request_tokens = 0
+
+        self.telemetry = source_agent.telemetry.RunTelemetry()
+        self.llm_call_stats = source_agent.telemetry.LLMCallStats()
+        self.tool_durations = {}
+        self._last_completion = {}
+
+        # Tool results above this many characters are spilled to disk (0 disables)
+        threshold = (
+            self.ARTIFACT_THRESHOLD
+            if artifact_threshold is None
+            else artifact_threshold
+        )
+        self.artifact_store = (
+            source_agent.artifacts.ArtifactStore(threshold=threshold)
+            if threshold > 0
+            else None
+        )
 
         self.system_prompt = system_prompt or Path(
             self.DEFAULT_SYSTEM_PROMPT_PATH
         ).read_text(encoding="utf-8")
+        if repo_map:
+            # Saves the exploratory file listing steps at the start of a task
+            repo_map = source_agent.repomap.build_repo_map(".", budget_tokens=repo_map)
+            self.system_prompt = f"{self.system_prompt}\n\n{repo_map}"
         self.messages = []
+        self.journal = None
         self.reset_conversation()
 
+        # Journal the conversation; an existing session's journal resumes it
+        self.journal = journal
+        if journal is not None:
+            self.messages = journal.load() or self.messages
+            journal.checkpoint(self.messages)
+
         self.tools = source_agent.tools.tool_registry.registry.get_tools()
         self.tool_mapping = source_agent.tools.tool_registry.registry.get_mapping()
+        self.read_only_tools = source_agent.tools.tool_registry.registry.read_only
 
-        self.session = openai.OpenAI(
+        self.session = self._create_session()
+        # Shared by every agent talking to the same provider endpoint
+        self.rate_limiter = source_agent.ratelimit.get_limiter(self.base_url)
+
+        # Providers to fail over to, and seconds before hedging with the next one
+        self.hedge_after = hedge_after
+        self.fallback_agents = [self._fallback_agent(f) for f in fallbacks or []]
+
+    def _create_session(self):
+        """Return the shared API client used for chat completions."""
+        return source_agent.providers.get_client(
             base_url=self.base_url,
             api_key=self.api_key,
         )
 
+    def _fallback_agent(self, fallback: "source_agent.failover.Fallback"):
+        """Clone this agent to send requests to a fallback provider instead."""
+        agent = copy.copy(self)
+        agent.base_url = fallback.base_url
+        agent.api_key = fallback.api_key
+        agent.model = fallback.model or self.model
+        agent.prompt_cache = fallback.prompt_cache
+        agent.fallback_agents = []
+        agent.session = agent._create_session()
+        agent.rate_limiter = source_agent.ratelimit.get_limiter(agent.base_url)
+        # Hedges run on other threads, so nothing mutable is shared with the primary
+        agent.token_estimator = source_agent.context.TokenEstimator()
+        agent.llm_call_stats = source_agent.telemetry.LLMCallStats()
+        return agent
+
+    def _attempt_agent(self, max_retries: int = None):
+        """Clone this agent to send a single request, with stats of its own."""
+        agent = copy.copy(self)
+        agent.llm_call_stats = source_agent.telemetry.LLMCallStats()
+        if max_retries:
+            agent.MAX_RETRIES = max_retries
+        return agent
+
+    def _provider_chain(self) -> "source_agent.failover.ProviderChain":
+        """
+        Build the chain of this agent and its fallbacks for one request.
+
+        Each provider gets the request through its own `_attempt_agent`, so a
+        losing hedge that finishes in the background can't write to the stats
+        of the request that moved on, or of a later one. Only the last provider
+        retries; the others call the API once, so a transient error fails over
+        right away instead of after the whole backoff schedule.
+        """
+        agents = [self, *self.fallback_agents]
+        last = len(agents) - 1
+        return source_agent.failover.ProviderChain(
+            [
+                (agent.base_url, agent._attempt_agent(None if i == last else 1))
+                for i, agent in enumerate(agents)
+            ],
+            hedge_after=self.hedge_after,
+        )
+
+    def _merge_attempts(self, finished: List[Any]):
+        """Add the stats of finished attempts; losing hedges still in flight are left out."""
+        for agent in list(finished):
+            self.llm_call_stats.merge(agent.llm_call_stats)
+
+    def _request(self, call, hedge: bool = True):
+        """
+        Send an LLM request, failing over to (or hedging with) the fallbacks.
+
+        Args:
+            call: Sends the request through the agent it is given.
+            hedge: False to only fail over, for streamed responses.
+
+        Returns:
+            The response of whichever provider answered first.
+        """
+        if not self.fallback_agents:
+            return call(self)
+        finished = []
+
+        def attempt(agent):
+            try:
+                return call(agent)
+            finally:
+                finished.append(agent)
+
+        try:
+            response, _ = self._provider_chain().call(
+                attempt, stats=self.llm_call_stats, hedge=hedge
+            )
+        finally:
+            self._merge_attempts(finished)
+        return response
+
     def reset_conversation(self):
         """Clear conversation and initialize with system prompt."""
         self.messages = [{"role": "system", "content": self.system_prompt}]
+        if self.journal:
+            self.journal.checkpoint(self.messages)
+
+    def _append_message(self, message):
+        """Add a message to the conversation and the journal."""
+        self.messages.append(message)
+        if self.journal:
+            self.journal.append_message(message)
+
+    def _record_event(self, event: AgentEvent) -> AgentEvent:
+        """Journal an event (text deltas excepted) and return it."""
+        if not self.journal:
+            return event
+        if event.type == AgentEventType.CONTEXT_COMPACTED:
+            # Compaction rewrites the history instead of appending to it
+            self.journal.checkpoint(self.messages)
+        if event.type != AgentEventType.AGENT_MESSAGE_DELTA:
+            self.journal.append_event(event.type.value, event.data)
+        return event
 
     def run(
         self, user_prompt: str = None, max_steps: int = None
@@ -86,77 +328,388 @@ class CodeAgent:
 
         Yields:
             AgentEvent: An event describing the current state or action of the agent.
+                The last event is always a RUN_SUMMARY with timings and token totals.
         """
+        self.telemetry = source_agent.telemetry.RunTelemetry()
+        with source_agent.profiler.span("run", model=self.model):
+            for event in self._run_steps(user_prompt, max_steps):
+                yield self._record_event(event)
+        yield self._record_event(self._run_summary_event())
+
+    def _run_steps(
+        self, user_prompt: str = None, max_steps: int = None
+    ) -> Iterator[AgentEvent]:
+        """The ReAct loop behind `run`, without the final summary."""
         if user_prompt:
-            self.messages.append({"role": "user", "content": user_prompt})
+            self._append_message({"role": "user", "content": user_prompt})
 
         steps = max_steps or self.MAX_STEPS
 
         for step in range(1, steps + 1):
-            yield AgentEvent(
-                type=AgentEventType.ITERATION_START,
-                data={"step": step, "max_steps": steps},
-            )
+            yield self._iteration_start_event(step, steps)
+
+            compacted_event = self._compact_context()
+            if compacted_event:
+                yield compacted_event
+
+            budget_event = self._check_budget()
+            if budget_event:
+                yield budget_event
+                return
 
             try:
-                response = self.call_llm(self.messages)
+                message, usage = yield from self._complete(self.messages)
             except Exception as e:
-                yield AgentEvent(
-                    type=AgentEventType.ERROR,
-                    data={
-                        "message": f"LLM call failed: {str(e)}",
-                        "exception_type": type(e).__name__,
-                    },
-                )
+                yield self._llm_error_event(e)
                 return
 
-            message = response.choices[0].message
-            self.messages.append(message)
+            yield self._llm_usage_event(step, usage, message)
 
-            parsed_content = self.parse_response_message(message.content)
-            if parsed_content:
-                yield AgentEvent(
-                    type=AgentEventType.AGENT_MESSAGE, data={"content": parsed_content}
-                )
+            self._append_message(message)
 
-            if message.tool_calls:
-                for tool_call in message.tool_calls:
-                    tool_name = tool_call.function.name
-                    yield AgentEvent(
-                        type=AgentEventType.TOOL_CALL,
-                        data={
-                            "name": tool_name,
-                            "arguments": tool_call.function.arguments,
-                        },
-                    )
+            message_event = self._agent_message_event(message)
+            if message_event:
+                yield message_event
 
-                    if tool_name == "msg_complete_tool":
-                        yield AgentEvent(
-                            type=AgentEventType.TASK_COMPLETE,
-                            data={"message": "Task marked complete!"},
-                        )
-                        return
-
-                    result_message = self.handle_tool_call(tool_call)
-                    self.messages.append(result_message)
-                    # Attempt to parse tool result content as JSON if it's a string, otherwise use as-is
-                    tool_result_content = result_message["content"]
-                    try:
-                        parsed_tool_result = json.loads(tool_result_content)
-                    except (json.JSONDecodeError, TypeError):
-                        # Fallback to string representation for complex types
-                        parsed_tool_result = tool_result_content
+            for batch in self.plan_tool_batches(message.tool_calls or []):
+                for tool_call in batch:
+                    yield self._tool_call_event(tool_call)
 
+                if batch[0].function.name == "msg_complete_tool":
                     yield AgentEvent(
-                        type=AgentEventType.TOOL_RESULT,
-                        data={"name": tool_name, "result": parsed_tool_result},
+                        type=AgentEventType.TASK_COMPLETE,
+                        data={"message": "Task marked complete!"},
                     )
+                    return
+
+                for tool_call, result_message in zip(
+                    batch, self.execute_tool_batch(batch), strict=True
+                ):
+                    self._append_message(result_message)
+                    yield self._tool_result_event(tool_call, result_message)
 
         yield AgentEvent(
             type=AgentEventType.MAX_STEPS_REACHED,
             data={"message": f"Max steps ({steps}) reached without task completion."},
         )
 
+    def _compact_context(self) -> Optional[AgentEvent]:
+        """
+        Let the context manager shrink the conversation before the next request.
+
+        Returns:
+            A CONTEXT_COMPACTED event if any tokens were saved, otherwise None.
+        """
+        if not self.context_manager:
+            return None
+
+        with source_agent.profiler.span("compact_context", "context"):
+            report = self.context_manager.apply(self.messages)
+        if report.tokens_saved <= 0:
+            return None
+
+        return AgentEvent(
+            type=AgentEventType.CONTEXT_COMPACTED,
+            data={
+                "tokens_before": report.tokens_before,
+                "tokens_after": report.tokens_after,
+                "tokens_saved": report.tokens_saved,
+                "elided": report.elided,
+                "summarized": report.summarized,
+            },
+        )
+
+    def _check_budget(self) -> Optional[AgentEvent]:
+        """
+        Estimate the next request and check it against the run's budget.
+
+        Returns:
+            A BUDGET_EXCEEDED event if the request would cross a cap, otherwise None.
+        """
+        if not self.budget:
+            return None
+
+        request_tokens = self.token_estimator.request(self.messages, self.tools)
+        self._request_tokens = request_tokens
+        exceeded = self.budget.check(self.telemetry.spent, request_tokens)
+        if not exceeded:
+            return None
+
+        return AgentEvent(
+            type=AgentEventType.BUDGET_EXCEEDED,
+            data={
+                **exceeded,
+                "message": (
+                    f"Budget exceeded: {exceeded['limit']} would reach "
+                    f"{exceeded['used'] + exceeded['requested']} "
+                    f"(cap {exceeded['cap']}), request not sent."
+                ),
+            },
+        )
+
+    def summarize_messages(self, messages) -> str:
+        """
+        Ask the model for a short summary of part of the conversation.
+
+        Suitable as the `summarizer` of a `ContextWindowManager`.
+
+        Args:
+            messages: The messages to summarize, as plain dicts.
+
+        Returns:
+            The summary text.
+        """
+        response = self._summary_session().chat.completions.create(
+            model=self.model,
+            temperature=self.temperature,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "Summarize the following agent conversation. Keep every fact, "
+                        "file path, decision and open question needed to continue the "
+                        "task. Be concise."
+                    ),
+                },
+                {"role": "user", "content": json.dumps(messages, default=str)},
+            ],
+        )
+        return response.choices[0].message.content or ""
+
+    def _summary_session(self):
+        """Return the blocking API client used by `summarize_messages`."""
+        return self.session
+
+    def _complete(self, messages) -> Generator[AgentEvent, None, Tuple[Any, Any]]:
+        """
+        Request the next assistant message, streaming it if enabled.
+
+        Returns:
+            A tuple of the assistant message and the response usage (or None).
+        """
+        with source_agent.profiler.span("llm_call", "llm", model=self.model):
+            started, key, cached = self._start_completion(messages)
+            if cached:
+                message, usage = cached
+            elif self.stream:
+                message, usage = yield from self._stream_message(messages)
+            else:
+                response = self._request(lambda agent: agent.call_llm(messages))
+                message, usage = self._response_message(response)
+            return self._finish_completion(started, key, message, usage, bool(cached))
+
+    def _start_completion(
+        self, messages
+    ) -> Tuple[float, Optional[str], Optional[Tuple[Any, Any]]]:
+        """
+        Reset the request stats and look `messages` up in the response cache.
+
+        Returns:
+            The start time, the cache key and the cached (message, usage) pair,
+            as returned by `_cache_lookup`.
+        """
+        started = time.perf_counter()
+        self.llm_call_stats = source_agent.telemetry.LLMCallStats()
+        return (started, *self._cache_lookup(messages))
+
+    def _finish_completion(
+        self, started: float, key: Optional[str], message, usage, cache_hit: bool
+    ) -> Tuple[Any, Any]:
+        """Time a finished completion and record it in the response cache."""
+        self._last_completion = {
+            "llm_seconds": time.perf_counter() - started,
+            "cache_hit": cache_hit,
+        }
+        if not cache_hit:
+            self._cache_store(key, message, usage)
+        return message, usage
+
+    @staticmethod
+    def _response_message(response) -> Tuple[Any, Any]:
+        """Return the assistant message and usage of a non-streamed response."""
+        return response.choices[0].message, getattr(response, "usage", None)
+
+    def _cache_lookup(
+        self, messages
+    ) -> Tuple[Optional[str], Optional[Tuple[Any, Any]]]:
+        """
+        Look up a recorded response for `messages` in the response cache.
+
+        Returns:
+            The cache key (None without a cache) and the cached (message, usage)
+            pair, or None on a miss.
+
+        Raises:
+            CacheMissError: On a miss in replay mode.
+        """
+        if not self.response_cache:
+            return None, None
+
+        key = self.response_cache.key(
+            {
+                "model": self.model,
+                "temperature": self.temperature,
+                "tools": self.tools,
+                "messages": messages,
+            },
+            aliases=self._cache_aliases(),
+        )
+        if self.response_cache.mode == source_agent.llm_cache.RECORD:
+            return key, None
+
+        entry = self.response_cache.get(key)
+        if entry:
+            # Handles of recorded artifacts point into this run's store
+            aliases = {v: k for k, v in self._cache_aliases().items()}
+            message = source_agent.llm_cache.substitute(entry["message"], aliases)
+            return key, (
+                ChatCompletionMessage.model_validate(message),
+                entry.get("usage"),
+            )
+        if self.response_cache.mode == source_agent.llm_cache.REPLAY:
+            raise source_agent.llm_cache.CacheMissError(
+                f"No recorded response for request {key}"
+            )
+        return key, None
+
+    def _cache_store(self, key: Optional[str], message, usage):
+        """Record a fresh response in the response cache, if one is configured."""
+        if not key:
+            return
+        if usage is not None and not isinstance(usage, dict):
+            usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+        message = source_agent.context.message_to_dict(message)
+        self.response_cache.put(
+            key,
+            {
+                "message": source_agent.llm_cache.substitute(
+                    message, self._cache_aliases()
+                ),
+                "usage": usage,
+            },
+        )
+
+    def _cache_aliases(self) -> Dict[str, str]:
+        """
+        Map run-specific strings to placeholders for the response cache.
+
+        Artifact handles embed the store's random session id; replacing it
+        keeps cache keys stable across runs, so replay still hits once a
+        result has been spilled.
+        """
+        if not self.artifact_store:
+            return {}
+        return {
+            self.artifact_store.session_id: source_agent.artifacts.SESSION_PLACEHOLDER
+        }
+
+    def _stream_message(self, messages) -> Generator[AgentEvent, None, Tuple[Any, Any]]:
+        """
+        Stream a completion, yielding text deltas as they arrive.
+
+        Returns:
+            The reassembled assistant message and its usage once the stream is exhausted.
+        """
+        accumulator = StreamAccumulator()
+        # Chunks are consumed after the request returns, so streams never hedge
+        stream = self._request(
+            lambda agent: agent.call_llm(messages, stream=True), hedge=False
+        )
+        for chunk in stream:
+            event = self._chunk_event(accumulator, chunk)
+            if event:
+                yield event
+        return accumulator.message(), accumulator.usage
+
+    def _iteration_start_event(self, step: int, steps: int) -> AgentEvent:
+        """Build the ITERATION_START event and note the step in the telemetry."""
+        self.telemetry.record_step(step)
+        return AgentEvent(
+            type=AgentEventType.ITERATION_START,
+            data={
+                "step": step,
+                "max_steps": steps,
+                "elapsed_seconds": round(self.telemetry.elapsed(), 4),
+            },
+        )
+
+    def _llm_usage_event(self, step: int, usage, message=None) -> AgentEvent:
+        """
+        Record the last completion in the telemetry and build its LLM_USAGE event.
+
+        The event carries token counts (including cached prompt tokens), the
+        wall time of the request and the retries/backoff spent in `call_llm`.
+        Counts the provider didn't report are charged to the budget from the
+        local estimates of the request and of `message`.
+        """
+        tokens = source_agent.prompt_cache.usage_tokens(usage)
+        llm_seconds = self._last_completion.get("llm_seconds", 0.0)
+        cache_hit = self._last_completion.get("cache_hit", False)
+        self.telemetry.record_llm(llm_seconds, self.llm_call_stats, tokens, cache_hit)
+        if self.budget:
+            completion = tokens["completion_tokens"]
+            if not completion and message is not None:
+                completion = source_agent.context.estimate_tokens(message)
+            self.telemetry.record_spend(
+                tokens["prompt_tokens"] or self._request_tokens, completion
+            )
+
+        return AgentEvent(
+            type=AgentEventType.LLM_USAGE,
+            data={
+                "step": step,
+                **tokens,
+                "llm_seconds": round(llm_seconds, 4),
+                "cache_hit": cache_hit,
+                **self.llm_call_stats.as_dict(),
+            },
+        )
+
+    def _run_summary_event(self) -> AgentEvent:
+        """Build the RUN_SUMMARY event closing every run."""
+        return AgentEvent(
+            type=AgentEventType.RUN_SUMMARY, data=self.telemetry.summary()
+        )
+
+    def _chunk_event(
+        self, accumulator: StreamAccumulator, chunk
+    ) -> Optional[AgentEvent]:
+        """
+        Add a streamed chunk to `accumulator`.
+
+        Returns:
+            The AGENT_MESSAGE_DELTA event for the chunk's text, or None if it
+            carried no text.
+        """
+        text = accumulator.add(chunk)
+        if not text:
+            return None
+        return AgentEvent(
+            type=AgentEventType.AGENT_MESSAGE_DELTA,
+            data={"content": text, "index": accumulator.text_chunks - 1},
+        )
+
+    def _agent_message_event(self, message) -> Optional[AgentEvent]:
+        """Build the AGENT_MESSAGE event for an assistant message, if it has text."""
+        parsed_content = self.parse_response_message(message.content or "")
+        if not parsed_content:
+            return None
+        return AgentEvent(
+            type=AgentEventType.AGENT_MESSAGE,
+            data={"content": parsed_content, "streamed": self.stream},
+        )
+
+    def _llm_error_event(self, error: Exception) -> AgentEvent:
+        """Build the ERROR event for a failed LLM call."""
+        self.telemetry.record_failure(self.llm_call_stats)
+        return AgentEvent(
+            type=AgentEventType.ERROR,
+            data={
+                "message": f"LLM call failed: {str(error)}",
+                "exception_type": type(error).__name__,
+            },
+        )
+
     def parse_response_message(self, message: str) -> str:
         """
         Extracts clean user-facing content from a model response.
@@ -174,6 +727,81 @@ class CodeAgent:
 
         return message.strip()
 
+    def plan_tool_batches(self, tool_calls) -> List[list]:
+        """
+        Group tool calls into batches that preserve the original call order.
+
+        Consecutive read-only tools share a batch and may run concurrently.
+        Every mutating tool (and `msg_complete_tool`) gets a batch of its own,
+        so writes and shell commands are never reordered or overlapped.
+        """
+        batches = []
+        for tool_call in tool_calls:
+            read_only = tool_call.function.name in self.read_only_tools
+            if (
+                read_only
+                and batches
+                and batches[-1][0].function.name in self.read_only_tools
+            ):
+                batches[-1].append(tool_call)
+            else:
+                batches.append([tool_call])
+        return batches
+
+    def execute_tool_batch(self, batch) -> List[dict]:
+        """
+        Execute a batch of tool calls, returning result messages in call order.
+
+        Batches with more than one call are dispatched to a bounded thread pool.
+        """
+        if len(batch) == 1 or self.max_tool_workers <= 1:
+            return [self._timed_tool_call(tool_call) for tool_call in batch]
+
+        workers = min(len(batch), self.max_tool_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._timed_tool_call, batch))
+
+    def _timed_tool_call(self, tool_call) -> dict:
+        """Run `handle_tool_call` and record how long the tool took."""
+        started = time.perf_counter()
+        result_message = self.handle_tool_call(tool_call)
+        duration = time.perf_counter() - started
+        self.tool_durations[tool_call.id] = duration
+        self.telemetry.record_tool(tool_call.function.name, duration)
+        return result_message
+
+    def _tool_call_event(self, tool_call) -> AgentEvent:
+        """Build the TOOL_CALL event announcing a tool call."""
+        return AgentEvent(
+            type=AgentEventType.TOOL_CALL,
+            data={
+                "name": tool_call.function.name,
+                "arguments": tool_call.function.arguments,
+            },
+        )
+
+    def _tool_result_event(self, tool_call, result_message) -> AgentEvent:
+        """Build the TOOL_RESULT event for a finished tool call."""
+        # Attempt to parse tool result content as JSON if it's a string, otherwise use as-is
+        tool_result_content = result_message["content"]
+        try:
+            parsed_tool_result = json.loads(tool_result_content)
+        except (json.JSONDecodeError, TypeError):
+            # Fallback to string representation for complex types
+            parsed_tool_result = tool_result_content
+
+        duration = self.tool_durations.pop(tool_call.id, None)
+        return AgentEvent(
+            type=AgentEventType.TOOL_RESULT,
+            data={
+                "name": tool_call.function.name,
+                "result": parsed_tool_result,
+                "duration_seconds": (
+                    round(duration, 4) if duration is not None else None
+                ),
+            },
+        )
+
     def handle_tool_call(self, tool_call):
         """Execute the named tool with arguments, return result as message."""
         try:
@@ -181,7 +809,8 @@ class CodeAgent:
             args_raw = tool_call.function.arguments
 
             try:
-                tool_args = json.loads(args_raw)
+                with source_agent.profiler.span("parse_arguments", "json"):
+                    tool_args = json.loads(args_raw)
             except json.JSONDecodeError:
                 return self._tool_error(tool_call, "Invalid JSON arguments.")
 
@@ -189,17 +818,26 @@ class CodeAgent:
             if not func:
                 return self._tool_error(tool_call, f"Unknown tool: {tool_name}")
 
-            result = func(**tool_args)
+            with source_agent.profiler.span(tool_name, "tool"):
+                result = func(**tool_args)
             # Ensure result is always JSON serializable for the 'content' field of the tool message
             # This is important for the LLM to process it correctly
             if not isinstance(result, (str, dict, list, int, float, bool, type(None))):
                 result = str(result)
 
+            with source_agent.profiler.span("serialize_result", "json"):
+                content = json.dumps(result)
+                if self.artifact_store:
+                    # Keep huge results out of the conversation, they'd be re-sent every step
+                    content = (
+                        self.artifact_store.spill(content, tool_name, result) or content
+                    )
+
             return {
                 "role": "tool",
                 "tool_call_id": tool_call.id,
                 "name": tool_name,
-                "content": json.dumps(result),
+                "content": content,
             }
 
         except Exception as e:
@@ -221,6 +859,7 @@ class CodeAgent:
         backoff_base: float = None,
         backoff_factor: float = None,
         max_backoff: float = None,
+        stream: bool = False,
     ):
         """
         Call the OpenAI-compatible chat API with retries.
@@ -231,9 +870,10 @@ class CodeAgent:
             backoff_base: Base delay for exponential backoff.
             backoff_factor: Factor to increase delay on each retry.
             max_backoff: Maximum delay before giving up.
+            stream: If True, return an iterator of completion chunks instead.
 
         Returns:
-            The response from the chat API.
+            The response from the chat API, or a chunk stream when `stream` is set.
 
         Raises:
             openai.OpenAIError: If the API call fails after retries due to an OpenAI-specific error.
@@ -244,39 +884,27 @@ class CodeAgent:
         factor = backoff_factor or self.BACKOFF_FACTOR
         cap = max_backoff or self.MAX_BACKOFF
 
-        # Define specific OpenAI errors that are generally retryable.
-        RETRYABLE_OPENAI_ERRORS = (
-            openai.RateLimitError,  # 429 status code
-            openai.APITimeoutError,  # Timeout during the API call
-            openai.APIConnectionError,  # Network connection issues
-            openai.APIStatusError,  # Covers 5xx errors which are often retryable, and also other 4xx errors
-        )
-
         for attempt in range(1, retries + 1):
+            self.llm_call_stats.attempts += 1
+            with source_agent.profiler.span("throttle", "llm"):
+                time.sleep(self._throttle(messages))
             try:
-                return self.session.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    tools=self.tools,
-                    tool_choice="auto",
-                    temperature=self.temperature,
-                )
+                with source_agent.profiler.span(
+                    "http_request", "llm", attempt=attempt, base_url=self.base_url
+                ):
+                    raw = self.session.chat.completions.with_raw_response.create(
+                        **self._completion_kwargs(messages, stream)
+                    )
+                self.rate_limiter.update(raw.headers)
+                with source_agent.profiler.span("parse_response", "json"):
+                    return raw.parse()
             except RETRYABLE_OPENAI_ERRORS as e:
                 # This block handles known retryable OpenAI API errors.
-                if attempt == retries:
-                    print(
-                        f"❌ LLM call failed after {attempt} attempts: {e}",
-                        file=sys.stderr,
-                    )
-                    raise  # Re-raise if all retries exhausted
-
-                delay = min(base * (factor ** (attempt - 1)) + random.random(), cap)
-                print(
-                    f"⚠️  Attempt {attempt} failed: {type(e).__name__}: {e}. "
-                    f"Retrying in {delay:.1f}s...",
-                    file=sys.stderr,
-                )
-                time.sleep(delay)
+                delay = self._retry_delay(e, attempt, retries, base, factor, cap)
+                self.llm_call_stats.retries += 1
+                self.llm_call_stats.backoff_seconds += delay
+                with source_agent.profiler.span("backoff", "llm", seconds=delay):
+                    time.sleep(delay)
 
             except openai.OpenAIError as e:
                 # This block handles non-retryable OpenAI API errors (e.g., AuthenticationError,
@@ -292,3 +920,87 @@ class CodeAgent:
                 # This block catches any other unexpected Python exceptions.
                 print(f"❌ Unexpected error during LLM call: {e}", file=sys.stderr)
                 raise
+
+    def _completion_kwargs(self, messages, stream: bool = False) -> Dict[str, Any]:
+        """Build the keyword arguments for a chat completions request."""
+        if self.prompt_cache == source_agent.prompt_cache.EXPLICIT:
+            messages = source_agent.prompt_cache.apply_cache_breakpoints(messages)
+
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "tools": self.tools,
+            "tool_choice": "auto",
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+        if stream:
+            # Ask for a final usage chunk so streamed runs report tokens too
+            kwargs["stream_options"] = {"include_usage": True}
+        return kwargs
+
+    def _throttle(self, messages) -> float:
+        """
+        Reserve rate limit capacity for a request.
+
+        Returns:
+            Seconds to wait before sending it, so concurrent sessions stay
+            under the provider's limits instead of tripping them.
+        """
+        tokens = 0
+        if self.rate_limiter.tracks_tokens:
+            tokens = self.token_estimator.request(messages, self.tools)
+        delay = self.rate_limiter.reserve(tokens)
+        self.llm_call_stats.throttle_seconds += delay
+        return delay
+
+    def _retry_delay(
+        self,
+        error: Exception,
+        attempt: int,
+        retries: int,
+        base: float,
+        factor: float,
+        cap: float,
+    ) -> float:
+        """
+        Log a retryable failure and compute the backoff before the next attempt.
+
+        A `Retry-After` header from the provider takes precedence over
+        exponential backoff, and holds back every session sharing the limiter.
+
+        Raises:
+            The original error if it isn't transient or this was the last
+            allowed attempt.
+        """
+        if isinstance(error, openai.APIStatusError):
+            headers = error.response.headers
+            self.rate_limiter.update(headers)
+            if not source_agent.ratelimit.is_transient(error):
+                # Bad requests, auth failures etc. won't succeed on a retry
+                print(
+                    f"❌ Non-retryable OpenAI error during LLM call: {error}",
+                    file=sys.stderr,
+                )
+                raise error
+        else:
+            headers = None
+
+        if attempt == retries:
+            print(
+                f"❌ LLM call failed after {attempt} attempts: {error}",
+                file=sys.stderr,
+            )
+            raise error  # Re-raise if all retries exhausted
+
+        delay = source_agent.ratelimit.retry_after(headers)
+        if delay is not None:
+            self.rate_limiter.block(delay)
+        else:
+            delay = min(base * (factor ** (attempt - 1)) + random.random(), cap)
+        print(
+            f"⚠️  Attempt {attempt} failed: {type(error).__name__}: {error}. "
+            f"Retrying in {delay:.1f}s...",
+            file=sys.stderr,
+        )
+        return delay
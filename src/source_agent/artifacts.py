@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import hashlib
+import pathlib
+import tempfile
+import itertools
+from typing import Any, Dict, Optional
+
+
+# <session id>/<artifact id>; session ids may also be journal ids such as
+# 20261018-061019-8f69c2, but never contain "." or "/" to escape the root
+HANDLE_PATTERN = re.compile(r"^[0-9A-Za-z][0-9A-Za-z-]{0,63}/[0-9a-f]{1,32}$")
+# Stands in for a store's random session id in the response cache
+SESSION_PLACEHOLDER = "artifact-session"
+
+
+def default_root() -> pathlib.Path:
+    """
+    Directory under which every session keeps its artifacts.
+
+    Can be overridden with the SOURCE_AGENT_ARTIFACT_DIR environment variable.
+    """
+    override = os.getenv("SOURCE_AGENT_ARTIFACT_DIR")
+    if override:
+        return pathlib.Path(override)
+    return pathlib.Path(tempfile.gettempdir()) / "source-agent-artifacts"
+
+
+def result_text(result: Any) -> str:
+    """
+    Render a tool result as plain text, keeping its real line breaks.
+
+    Strings are kept as they are and a dict's `content` (a string, or a list
+    of lines) stands for the whole result. Other dicts list their fields one
+    per line, with multi-line strings written out verbatim; anything else is
+    pretty-printed JSON.
+    """
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict):
+        content = result.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list) and all(isinstance(c, str) for c in content):
+            return "\n".join(content)
+        fields = []
+        for key, value in result.items():
+            if isinstance(value, str) and "\n" in value:
+                fields.append(f"{key}:\n{value}")
+            else:
+                fields.append(f"{key}: {json.dumps(value)}")
+        return "\n".join(fields)
+    return json.dumps(result, indent=2)
+
+
+class ArtifactStore:
+    """
+    Session-scoped, on-disk store for tool results too large for the conversation.
+
+    Oversized results are written to `<root>/<session_id>/<artifact_id>.txt` and
+    the conversation only receives a preview plus a handle that
+    `artifact_read_tool` can page through. Artifact ids are a hash of the
+    content, so the same result always gets the same handle within a session.
+    """
+
+    THRESHOLD = 16_000
+    PREVIEW_CHARS = 2_000
+
+    def __init__(
+        self,
+        root: Optional[pathlib.Path] = None,
+        session_id: str = None,
+        threshold: int = None,
+        preview_chars: int = None,
+    ):
+        self.root = pathlib.Path(root) if root else default_root()
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.threshold = threshold if threshold is not None else self.THRESHOLD
+        self.preview_chars = (
+            preview_chars if preview_chars is not None else self.PREVIEW_CHARS
+        )
+        self.directory = self.root / self.session_id
+
+    def put(self, content: str, tool_name: str = None) -> str:
+        """
+        Write `content` to the store.
+
+        Args:
+            content: The text to store.
+            tool_name: Name of the tool that produced it, kept as metadata.
+
+        Returns:
+            The artifact handle.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        artifact_id = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        path = self.directory / f"{artifact_id}.txt"
+        path.write_text(content, encoding="utf-8")
+        meta = {
+            "tool": tool_name,
+            "total_chars": len(content),
+            "total_lines": content.count("\n") + 1,
+        }
+        (self.directory / f"{artifact_id}.json").write_text(json.dumps(meta))
+        return f"{self.session_id}/{artifact_id}"
+
+    def spill(
+        self, content: str, tool_name: str = None, result: Any = None
+    ) -> Optional[str]:
+        """
+        Move an oversized tool result into the store.
+
+        Args:
+            content: The serialized tool result.
+            tool_name: Name of the tool that produced it.
+            result: The tool result itself. Its text (see `result_text`) is
+                stored instead of `content`, so the artifact can be paged by
+                the lines of the file or log rather than escaped JSON.
+
+        Returns:
+            A compact JSON replacement for the conversation, or None if the
+            content is small enough to keep inline.
+        """
+        if len(content) <= self.threshold:
+            return None
+
+        text = content if result is None else result_text(result)
+        handle = self.put(text, tool_name)
+        return json.dumps(
+            {
+                "artifact": handle,
+                "total_chars": len(text),
+                "total_lines": text.count("\n") + 1,
+                "preview": text[: self.preview_chars],
+                "message": (
+                    f"Result too large to include ({len(content)} chars). "
+                    "Use artifact_read_tool with this handle to page through it."
+                ),
+            }
+        )
+
+    def cleanup(self):
+        """Delete every artifact of this session."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def read_artifact(
+    handle: str,
+    offset: int = 0,
+    limit: int = 4000,
+    start_line: int = None,
+    end_line: int = None,
+    root: Optional[pathlib.Path] = None,
+) -> Dict[str, Any]:
+    """
+    Read part of a stored artifact, by character offset or by line range.
+
+    Args:
+        handle: The handle returned when the artifact was stored.
+        offset: Character offset to start reading from.
+        limit: Maximum number of characters to return.
+        start_line: First line to return (1-based). Switches to line mode.
+        end_line: Last line to return (inclusive). Defaults to `start_line` + 99.
+        root: Artifact root directory, defaults to `default_root()`.
+
+    Returns:
+        A dict with the requested content and where the next page starts.
+    """
+    if not HANDLE_PATTERN.match(handle or ""):
+        return {"success": False, "error": f"Invalid artifact handle - {handle}"}
+
+    base = pathlib.Path(root) if root else default_root()
+    path = base / f"{handle}.txt"
+    if not path.is_file():
+        return {"success": False, "error": f"Artifact not found - {handle}"}
+
+    meta_path = base / f"{handle}.json"
+    meta = json.loads(meta_path.read_text()) if meta_path.is_file() else {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        if start_line is not None:
+            start = max(1, start_line)
+            end = end_line if end_line is not None else start + 99
+            lines = list(itertools.islice(f, start - 1, max(end, start)))
+            last = start + len(lines) - 1
+            more = f.readline() != ""
+            return {
+                "success": True,
+                "handle": handle,
+                "content": "".join(lines),
+                "start_line": start,
+                "end_line": last,
+                "next_line": last + 1 if more else None,
+                "total_lines": meta.get("total_lines"),
+            }
+
+        offset = max(0, offset)
+        f.read(offset)
+        content = f.read(limit)
+        more = f.read(1) != ""
+        return {
+            "success": True,
+            "handle": handle,
+            "content": content,
+            "offset": offset,
+            "next_offset": offset + len(content) if more else None,
+            "total_chars": meta.get("total_chars"),
+        }
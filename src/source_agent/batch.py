@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import pathlib
+import source_agent
+from typing import Any, Dict, List, Callable, Iterable, Optional
+from collections import Counter, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    wait,
+)
+
+
+CONCURRENCY = 4
+
+
+def load_prompts(path: pathlib.Path) -> List[Dict[str, Any]]:
+    """
+    Read a JSONL file of batch items.
+
+    Each line is an object with a required "prompt" and optional "id",
+    "provider", "model", "max_steps" and "workdir" keys. A line may also be a
+    bare JSON string, which is used as the prompt.
+
+    Args:
+        path: Path to the JSONL file.
+
+    Returns:
+        The items, each with an "id" (the line number when not given).
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no prompt.
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {number} of {path}: {e}") from e
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict) or not item.get("prompt"):
+                raise ValueError(f"Missing 'prompt' on line {number} of {path}")
+            item.setdefault("id", str(number))
+            items.append(item)
+    return items
+
+
+def build_agent(agent_kwargs: Dict[str, Any], agent_factory: Callable[..., Any] = None):
+    """
+    Construct an agent from plain, picklable options.
+
+    Besides the agent's own keyword arguments, `agent_kwargs` may hold
+    `context_budget`, `summarize_context` and `llm_cache` (the keyword
+    arguments of `ResponseCache`). These are turned into objects here, in the
+    worker, because caches and bound methods cannot cross a process boundary.
+
+    Args:
+        agent_kwargs: Keyword arguments and options for the agent.
+        agent_factory: Agent class or factory, defaults to `CodeAgent`.
+
+    Returns:
+        The agent instance.
+    """
+    kwargs = dict(agent_kwargs)
+    context_budget = kwargs.pop("context_budget", None)
+    summarize_context = kwargs.pop("summarize_context", False)
+    llm_cache = kwargs.pop("llm_cache", None)
+    if llm_cache:
+        kwargs["response_cache"] = source_agent.llm_cache.ResponseCache(**llm_cache)
+
+    factory = agent_factory or source_agent.agents.code.CodeAgent
+    agent = factory(**kwargs)
+    if context_budget:
+        agent.context_manager = source_agent.context.ContextWindowManager(
+            budget_tokens=context_budget,
+            summarizer=agent.summarize_messages if summarize_context else None,
+            estimator=agent.token_estimator,
+        )
+    return agent
+
+
+def resolve_paths(agent_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Make the paths in `agent_kwargs` absolute, against the current directory.
+
+    Called before a job is handed to a worker that changes into its own
+    workdir, so e.g. a relative response cache directory stays shared by
+    every item instead of being created once per workdir.
+    """
+    llm_cache = agent_kwargs.get("llm_cache")
+    if not llm_cache:
+        return agent_kwargs
+    directory = llm_cache.get("directory") or source_agent.paths.cache_dir("llm")
+    return {
+        **agent_kwargs,
+        "llm_cache": {**llm_cache, "directory": str(pathlib.Path(directory).resolve())},
+    }
+
+
+def run_item(
+    item: Dict[str, Any],
+    agent_kwargs: Dict[str, Any],
+    user_prompt: str,
+    workdir: Optional[str] = None,
+    agent_factory: Callable[..., Any] = None,
+) -> Dict[str, Any]:
+    """
+    Run one batch item to completion and summarize its events.
+
+    Runs in a worker thread, or in a worker process when `workdir` is set
+    (the working directory is process-wide, and every tool resolves paths
+    against it).
+
+    Args:
+        item: The batch item.
+        agent_kwargs: Keyword arguments and options for `build_agent`.
+        user_prompt: The full prompt to send.
+        workdir: Directory to run the agent in, created if missing.
+        agent_factory: Agent class or factory, defaults to `CodeAgent`.
+
+    Returns:
+        A JSON-serializable result record.
+    """
+    started = time.perf_counter()
+    record = {"id": item["id"], "prompt": item["prompt"], "status": "error"}
+    agent = None
+
+    try:
+        if workdir:
+            os.makedirs(workdir, exist_ok=True)
+            os.chdir(workdir)
+            record["workdir"] = workdir
+
+        agent = build_agent(agent_kwargs, agent_factory)
+        counts = Counter()
+        final_message = None
+
+        for event in agent.run(
+            user_prompt=user_prompt, max_steps=item.get("max_steps")
+        ):
+            counts[event.type.value] += 1
+            if event.type == source_agent.agents.code.AgentEventType.AGENT_MESSAGE:
+                final_message = event.data["content"]
+            elif event.type == source_agent.agents.code.AgentEventType.TASK_COMPLETE:
+                record["status"] = "complete"
+            elif (
+                event.type == source_agent.agents.code.AgentEventType.MAX_STEPS_REACHED
+            ):
+                record["status"] = "max_steps"
+            elif event.type == source_agent.agents.code.AgentEventType.BUDGET_EXCEEDED:
+                record["status"] = "budget_exceeded"
+                record["error"] = event.data["message"]
+            elif event.type == source_agent.agents.code.AgentEventType.ERROR:
+                record["error"] = event.data["message"]
+            elif event.type == source_agent.agents.code.AgentEventType.RUN_SUMMARY:
+                record["summary"] = event.data
+
+        record["final_message"] = final_message
+        record["events"] = dict(counts)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if getattr(agent, "artifact_store", None):
+            agent.artifact_store.cleanup()
+
+    record["elapsed_seconds"] = round(time.perf_counter() - started, 4)
+    return record
+
+
+def run_batch(
+    items: Iterable[Dict[str, Any]],
+    build_job: Callable[[Dict[str, Any]], Dict[str, Any]],
+    output,
+    concurrency: int = None,
+    workdir_root: Optional[pathlib.Path] = None,
+    agent_factory: Callable[..., Any] = None,
+) -> Dict[str, Any]:
+    """
+    Run batch items concurrently, writing one JSONL result per finished item.
+
+    At most `concurrency` items per provider are in flight at any time, and
+    items for one provider never wait behind a busy provider. Results are
+    written (and flushed) in completion order as soon as each item finishes.
+
+    Args:
+        items: The batch items.
+        build_job: Maps an item to the `agent_kwargs` and `user_prompt` for
+            `run_item`. May raise to reject an item (e.g. a missing API key).
+        output: Text stream the JSONL results are written to.
+        concurrency: Maximum in-flight items per provider.
+        workdir_root: If set, item `id` gets its own directory `<root>/<id>`
+            and items run in worker processes.
+        agent_factory: Agent class or factory, defaults to `CodeAgent`.
+
+    Returns:
+        Totals for the whole batch.
+    """
+    limit = concurrency or CONCURRENCY
+    items = list(items)
+    started = time.perf_counter()
+
+    queues: Dict[str, deque] = {}
+    for item in items:
+        queues.setdefault(item.get("provider") or "", deque()).append(item)
+
+    use_processes = bool(workdir_root) or any(item.get("workdir") for item in items)
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    in_flight: Dict[str, int] = {provider: 0 for provider in queues}
+    pending = {}
+    statuses = Counter()
+
+    def write(record):
+        statuses[record["status"]] += 1
+        output.write(json.dumps(record, default=str) + "\n")
+        output.flush()
+
+    with executor_cls(max_workers=max(1, limit * len(queues))) as executor:
+
+        def fill():
+            for provider, queue in queues.items():
+                while queue and in_flight[provider] < limit:
+                    item = queue.popleft()
+                    try:
+                        job = build_job(item)
+                    except Exception as e:
+                        write(
+                            {
+                                "id": item["id"],
+                                "prompt": item["prompt"],
+                                "status": "error",
+                                "error": str(e),
+                            }
+                        )
+                        continue
+
+                    workdir = item.get("workdir")
+                    if not workdir and workdir_root:
+                        workdir = str(pathlib.Path(workdir_root) / str(item["id"]))
+                    if workdir:
+                        workdir = str(pathlib.Path(workdir).resolve())
+
+                    future = executor.submit(
+                        run_item,
+                        item,
+                        resolve_paths(job["agent_kwargs"]),
+                        job["user_prompt"],
+                        workdir,
+                        agent_factory,
+                    )
+                    pending[future] = (provider, item)
+                    in_flight[provider] += 1
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, item = pending.pop(future)
+                in_flight[provider] -= 1
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {
+                        "id": item["id"],
+                        "prompt": item["prompt"],
+                        "status": "error",
+                        "error": f"{type(e).__name__}: {e}",
+                    }
+                write(record)
+            fill()
+
+    totals = {
+        "total": len(items),
+        "elapsed_seconds": round(time.perf_counter() - started, 4),
+        **dict(statuses),
+    }
+    print(f"📦 Batch finished: {json.dumps(totals)}", file=sys.stderr)
+    return totals
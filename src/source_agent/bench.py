@@ -0,0 +1,230 @@
+import json
+import time
+import source_agent
+from typing import Any, Dict, List, Optional
+from .context import CHARS_PER_TOKEN
+from .telemetry import percentile, latency_summary
+from .agents.code import StreamAccumulator
+
+
+REPEATS = 3
+
+# Representative agent requests: exploring, reading, editing, testing and answering
+BENCH_PROMPTS = [
+    {
+        "id": "explore",
+        "prompt": "List the Python files in this repository and summarize its layout.",
+    },
+    {
+        "id": "read",
+        "prompt": "Read src/source_agent/entrypoint.py and explain what main() does.",
+    },
+    {
+        "id": "search",
+        "prompt": "Find every place that calls call_llm and report the file and line.",
+    },
+    {
+        "id": "edit",
+        "prompt": "Create notes/todo.md with a checklist of three refactoring ideas.",
+    },
+    {
+        "id": "test",
+        "prompt": "Run the test suite and tell me whether it passes.",
+    },
+    {
+        "id": "answer",
+        "prompt": "In two sentences, what is the difference between a list and a tuple?",
+    },
+]
+
+SYSTEM_PROMPT = (
+    "You are a coding agent with access to tools. Use a tool whenever it helps "
+    "answer the request."
+)
+
+
+def validate_tool_call(tool_call: Dict[str, Any], tools: List[Dict[str, Any]]) -> bool:
+    """
+    Check that a tool call could actually be executed.
+
+    Args:
+        tool_call: The tool call as a dict with `function.name` and
+            `function.arguments`.
+        tools: The tool schemas sent with the request.
+
+    Returns:
+        True if the tool exists, the arguments are a JSON object and every
+        required parameter is present.
+    """
+    function = tool_call.get("function") or {}
+    schemas = {t["function"]["name"]: t["function"] for t in tools}
+    schema = schemas.get(function.get("name"))
+    if not schema:
+        return False
+    try:
+        arguments = json.loads(function.get("arguments") or "{}")
+    except json.JSONDecodeError:
+        return False
+    if not isinstance(arguments, dict):
+        return False
+    required = (schema.get("parameters") or {}).get("required") or []
+    return all(name in arguments for name in required)
+
+
+def measure_request(
+    client: Any,
+    model: str,
+    messages: List[Dict[str, Any]],
+    tools: List[Dict[str, Any]],
+    temperature: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Send one streamed request and time it.
+
+    Returns:
+        A dict with `ttft_seconds` (until the first text or tool call delta),
+        `latency_seconds`, `completion_tokens` (from usage, or estimated from
+        the output length), `tokens_per_second` after the first token and the
+        number of `tool_calls` and `valid_tool_calls`.
+    """
+    accumulator = StreamAccumulator()
+    started = time.perf_counter()
+    first = None
+
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        tools=tools,
+        tool_choice="auto",
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    for chunk in stream:
+        text = accumulator.add(chunk)
+        if first is None and (text or accumulator.tool_calls):
+            first = time.perf_counter()
+    finished = time.perf_counter()
+
+    message = accumulator.message()
+    tool_calls = [call.model_dump() for call in message.tool_calls or []]
+    completion_tokens = getattr(accumulator.usage, "completion_tokens", None)
+    if not completion_tokens:
+        output = (message.content or "") + "".join(
+            call["function"]["arguments"] for call in tool_calls
+        )
+        completion_tokens = max(len(output) // CHARS_PER_TOKEN, 1)
+
+    ttft = (first or finished) - started
+    generation = finished - (first or started)
+    return {
+        "ttft_seconds": ttft,
+        "latency_seconds": finished - started,
+        "completion_tokens": completion_tokens,
+        "tokens_per_second": completion_tokens / generation if generation > 0 else 0.0,
+        "tool_calls": len(tool_calls),
+        "valid_tool_calls": sum(validate_tool_call(call, tools) for call in tool_calls),
+    }
+
+
+def bench_target(
+    target: Dict[str, Any],
+    prompts: List[Dict[str, str]] = None,
+    repeats: int = None,
+    system_prompt: str = None,
+    tools: List[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Benchmark one provider and model.
+
+    Args:
+        target: Dict with `name`, `base_url`, `api_key` and `model`.
+        prompts: The prompts to send, defaults to `BENCH_PROMPTS`.
+        repeats: How many times each prompt is sent.
+        system_prompt: System prompt for every request.
+        tools: Tool schemas, defaults to every registered tool.
+
+    Returns:
+        Aggregated measurements for the target.
+    """
+    prompts = prompts or BENCH_PROMPTS
+    repeats = repeats or REPEATS
+    tools = tools or source_agent.tools.tool_registry.registry.get_tools()
+    client = source_agent.providers.get_client(target["base_url"], target["api_key"])
+
+    samples, errors = [], []
+    for _ in range(repeats):
+        for item in prompts:
+            messages = [
+                {"role": "system", "content": system_prompt or SYSTEM_PROMPT},
+                {"role": "user", "content": item["prompt"]},
+            ]
+            try:
+                samples.append(
+                    measure_request(client, target["model"], messages, tools)
+                )
+            except Exception as e:
+                errors.append(f"{item['id']}: {type(e).__name__}: {e}")
+
+    tool_calls = sum(s["tool_calls"] for s in samples)
+    speeds = [s["tokens_per_second"] for s in samples if s["tokens_per_second"]]
+    return {
+        "name": target["name"],
+        "model": target["model"],
+        "requests": len(samples) + len(errors),
+        "errors": len(errors),
+        "error_messages": errors[:5],
+        "ttft": latency_summary([s["ttft_seconds"] for s in samples]),
+        "latency": latency_summary([s["latency_seconds"] for s in samples]),
+        "tokens_per_second": round(percentile(speeds, 50), 2),
+        "tool_calls": tool_calls,
+        "tool_call_validity": (
+            round(sum(s["valid_tool_calls"] for s in samples) / tool_calls, 4)
+            if tool_calls
+            else None
+        ),
+    }
+
+
+def run_bench(
+    targets: List[Dict[str, Any]],
+    prompts: List[Dict[str, str]] = None,
+    repeats: int = None,
+    system_prompt: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Benchmark every target with the same prompts and tools.
+
+    Returns:
+        A JSON-serializable report with one result per target.
+    """
+    return {
+        "prompts": len(prompts or BENCH_PROMPTS),
+        "repeats": repeats or REPEATS,
+        "results": [
+            bench_target(target, prompts, repeats, system_prompt) for target in targets
+        ],
+    }
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    """Render the bench results as a comparison table, fastest p50 latency first."""
+    header = (
+        f"{'target':<40} {'ttft p50':>9} {'ttft p90':>9} {'lat p50':>9} "
+        f"{'lat p90':>9} {'lat p99':>9} {'tok/s':>8} {'tools ok':>9} {'errors':>7}"
+    )
+    lines = [header, "-" * len(header)]
+    results = sorted(report["results"], key=lambda r: r["latency"]["p50_seconds"])
+    for result in results:
+        validity = result["tool_call_validity"]
+        lines.append(
+            f"{(result['name'] + ':' + result['model'])[:40]:<40} "
+            f"{result['ttft']['p50_seconds']:>8.2f}s {result['ttft']['p90_seconds']:>8.2f}s "
+            f"{result['latency']['p50_seconds']:>8.2f}s "
+            f"{result['latency']['p90_seconds']:>8.2f}s "
+            f"{result['latency']['p99_seconds']:>8.2f}s "
+            f"{result['tokens_per_second']:>8.1f} "
+            f"{'-' if validity is None else f'{validity:.0%}':>9} "
+            f"{result['errors']:>7}"
+        )
+    return "\n".join(lines)
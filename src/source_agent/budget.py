@@ -0,0 +1,80 @@
+from typing import Any, Dict, Optional
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Budget:
+    """
+    Hard caps on what a single `CodeAgent.run` may spend.
+
+    Caps are checked before every LLM request against the tokens the run has
+    been billed so far (estimated locally when a response reports no usage)
+    plus a local estimate of the next request's prompt, so a request that
+    would cross a cap is never sent. Output tokens can't be
+    known in advance; that cap stops the run once it has been reached.
+
+    Attributes:
+        max_input_tokens: Prompt tokens for the whole run.
+        max_output_tokens: Completion tokens for the whole run.
+        max_cost: Dollars for the whole run, priced with `input_price` and
+            `output_price`.
+        max_request_tokens: Prompt tokens of any single request, e.g. the
+            model's context window.
+        input_price: Dollars per million prompt tokens.
+        output_price: Dollars per million completion tokens.
+    """
+
+    max_input_tokens: Optional[int] = None
+    max_output_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    max_request_tokens: Optional[int] = None
+    input_price: float = 0.0
+    output_price: float = 0.0
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Price a number of prompt and completion tokens in dollars."""
+        return (
+            input_tokens * self.input_price + output_tokens * self.output_price
+        ) / 1_000_000
+
+    def check(
+        self, used: Dict[str, int], request_tokens: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Check whether the next request fits in the budget.
+
+        Args:
+            used: Tokens billed so far, with `prompt_tokens` and
+                `completion_tokens`.
+            request_tokens: Estimated prompt tokens of the next request.
+
+        Returns:
+            None if it fits, otherwise a dict naming the `limit` that would be
+            exceeded, its `cap`, the `used` amount and the `requested` amount.
+        """
+        input_tokens = used.get("prompt_tokens", 0)
+        output_tokens = used.get("completion_tokens", 0)
+
+        checks = [
+            ("request_tokens", self.max_request_tokens, 0, request_tokens),
+            ("input_tokens", self.max_input_tokens, input_tokens, request_tokens),
+            ("output_tokens", self.max_output_tokens, output_tokens, 0),
+            (
+                "cost",
+                self.max_cost,
+                round(self.cost(input_tokens, output_tokens), 6),
+                round(self.cost(request_tokens, 0), 6),
+            ),
+        ]
+        for limit, cap, spent, requested in checks:
+            if cap is None:
+                continue
+            # The output cap can't see the next completion, stop once it's used up
+            if spent + requested > cap or (limit == "output_tokens" and spent >= cap):
+                return {
+                    "limit": limit,
+                    "cap": cap,
+                    "used": spent,
+                    "requested": requested,
+                }
+        return None
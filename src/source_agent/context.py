@@ -0,0 +1,251 @@
+import json
+import threading
+from typing import Any, Dict, List, Tuple, Callable, Optional
+from dataclasses import dataclass
+
+
+# Rough average for English text and code with BPE tokenizers.
+CHARS_PER_TOKEN = 4
+# Fixed cost of the role/name framing around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "[Summary of earlier conversation]"
+
+
+def message_to_dict(message: Any) -> Dict[str, Any]:
+    """
+    Return a plain dict view of a chat message.
+
+    Assistant messages returned by the API are pydantic models, everything the
+    agent builds itself is already a dict.
+    """
+    if isinstance(message, dict):
+        return message
+    if hasattr(message, "model_dump"):
+        return message.model_dump(exclude_none=True)
+    return dict(vars(message))
+
+
+def estimate_tokens(message: Any) -> int:
+    """
+    Estimate the number of tokens a message contributes to a request.
+
+    Args:
+        message: A chat message (dict or API message object).
+
+    Returns:
+        The estimated token count.
+    """
+    serialized = json.dumps(message_to_dict(message), default=str)
+    return len(serialized) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+class TokenEstimator:
+    """
+    Cached token estimates for a conversation and its tool schemas.
+
+    Each message is serialized once, when it is first seen; later calls only
+    look it up by identity, so estimating a whole request every step costs a
+    dict lookup per message rather than a `json.dumps` of the conversation.
+    Safe to share with a hedged request still running on another thread.
+    """
+
+    def __init__(self):
+        # id(message) -> (message, tokens); the message is kept so ids can't be reused
+        self._cache: Dict[int, Tuple[Any, int]] = {}
+        self._tools: Tuple[Any, int, int] = (None, 0, 0)
+        self._lock = threading.Lock()
+
+    def message(self, message: Any) -> int:
+        """Return the (cached) token estimate for a single message."""
+        cached = self._cache.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        tokens = estimate_tokens(message)
+        with self._lock:
+            self._cache[id(message)] = (message, tokens)
+        return tokens
+
+    def count(self, messages: List[Any]) -> int:
+        """Return the estimated token count of a whole conversation."""
+        return sum(map(self.message, messages))
+
+    def tools(self, tools: List[Dict[str, Any]]) -> int:
+        """Return the estimated token count of the tool schemas sent with a request."""
+        if not tools:
+            return 0
+        cached, length, tokens = self._tools
+        if cached is not tools or length != len(tools):
+            tokens = len(json.dumps(tools, default=str)) // CHARS_PER_TOKEN
+            self._tools = (tools, len(tools), tokens)
+        return tokens
+
+    def request(self, messages: List[Any], tools: List[Dict[str, Any]] = None) -> int:
+        """Return the estimated prompt tokens of a request, tools included."""
+        if len(self._cache) > 2 * len(messages) + 64:
+            self.prune(messages)
+        return self.count(messages) + self.tools(tools)
+
+    def prune(self, messages: List[Any]):
+        """Drop cache entries for messages that are no longer in the conversation."""
+        live = {id(message) for message in messages}
+        with self._lock:
+            for key in [key for key in self._cache if key not in live]:
+                del self._cache[key]
+
+
+@dataclass(frozen=True)
+class ContextReport:
+    """
+    Outcome of a single compaction pass.
+
+    Attributes:
+        tokens_before: Estimated prompt tokens before compaction.
+        tokens_after: Estimated prompt tokens after compaction.
+        elided: Number of tool results replaced by a short placeholder.
+        summarized: Number of messages folded into a summary.
+    """
+
+    tokens_before: int
+    tokens_after: int
+    elided: int = 0
+    summarized: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class ContextWindowManager:
+    """
+    Keeps `CodeAgent.messages` within a token budget.
+
+    When the estimated size of the conversation exceeds `budget_tokens`, the
+    following policies are applied in order until it fits again:
+
+    1. Old tool results are elided (oldest first) and replaced by a short preview.
+    2. If a `summarizer` is configured, everything between the system prompt and
+       the latest turns is replaced by a single summary message.
+
+    The system prompt and the last `keep_last` messages are never modified.
+    """
+
+    KEEP_LAST = 6
+    PREVIEW_CHARS = 200
+
+    def __init__(
+        self,
+        budget_tokens: int,
+        keep_last: int = None,
+        summarizer: Optional[Callable[[List[Dict[str, Any]]], str]] = None,
+        preview_chars: int = None,
+        estimator: TokenEstimator = None,
+    ):
+        self.budget_tokens = budget_tokens
+        self.keep_last = keep_last if keep_last is not None else self.KEEP_LAST
+        self.summarizer = summarizer
+        self.preview_chars = (
+            preview_chars if preview_chars is not None else self.PREVIEW_CHARS
+        )
+        self.estimator = estimator or TokenEstimator()
+
+    def tokens_for(self, message: Any) -> int:
+        """Return the (cached) token estimate for a single message."""
+        return self.estimator.message(message)
+
+    def count(self, messages: List[Any]) -> int:
+        """Return the estimated token count of a whole conversation."""
+        return self.estimator.count(messages)
+
+    def apply(self, messages: List[Any]) -> ContextReport:
+        """
+        Compact `messages` in place if they exceed the budget.
+
+        Args:
+            messages: The conversation, starting with the system prompt.
+
+        Returns:
+            ContextReport: Token counts before and after, and what was changed.
+        """
+        before = self.count(messages)
+        total = before
+        elided = 0
+        summarized = 0
+
+        if total > self.budget_tokens:
+            tail_start = self._tail_start(messages)
+
+            for index in range(1, tail_start):
+                if total <= self.budget_tokens:
+                    break
+                replacement = self._elide(messages[index])
+                if replacement is None:
+                    continue
+                total += self.tokens_for(replacement) - self.tokens_for(messages[index])
+                messages[index] = replacement
+                elided += 1
+
+            if total > self.budget_tokens and self.summarizer and tail_start > 1:
+                summary = self._summarize(messages[1:tail_start])
+                if summary is not None:
+                    summarized = tail_start - 1
+                    messages[1:tail_start] = [summary]
+                    total = self.count(messages)
+
+        self.estimator.prune(messages)
+        return ContextReport(
+            tokens_before=before,
+            tokens_after=total,
+            elided=elided,
+            summarized=summarized,
+        )
+
+    def _tail_start(self, messages: List[Any]) -> int:
+        """
+        Index of the first message of the protected tail.
+
+        The tail never starts on a tool result, so an assistant message and the
+        tool results answering its calls always stay together.
+        """
+        start = max(1, len(messages) - self.keep_last)
+        while (
+            1 < start < len(messages)
+            and message_to_dict(messages[start]).get("role") == "tool"
+        ):
+            start -= 1
+        return start
+
+    def _elide(self, message: Any) -> Optional[Dict[str, Any]]:
+        """Return a placeholder for a tool result, or None if it can't be elided."""
+        data = message_to_dict(message)
+        if data.get("role") != "tool":
+            return None
+
+        content = data.get("content")
+        if not isinstance(content, str):
+            return None
+        try:
+            if json.loads(content).get("elided"):
+                return None
+        except (json.JSONDecodeError, AttributeError):
+            pass
+
+        placeholder = {
+            "elided": True,
+            "original_tokens": self.tokens_for(message),
+            "preview": content[: self.preview_chars],
+        }
+        replacement = {**data, "content": json.dumps(placeholder)}
+        if estimate_tokens(replacement) >= placeholder["original_tokens"]:
+            return None  # Too small to be worth eliding
+        return replacement
+
+    def _summarize(self, middle: List[Any]) -> Optional[Dict[str, Any]]:
+        """Fold `middle` into a single summary message using the summarizer."""
+        try:
+            summary = self.summarizer([message_to_dict(m) for m in middle])
+        except Exception:
+            return None
+        if not summary:
+            return None
+        return {"role": "user", "content": f"{SUMMARY_PREFIX}\n{summary}"}
@@ -1,11 +1,12 @@
 import sys
 import json
+import pathlib
 import argparse
 import source_agent
 
 
 def handle_agent_events(
-    agent_events: source_agent.agents.code.AgentEvent, verbose: bool
+    agent_events: "source_agent.agents.code.AgentEvent", verbose: bool
 ):
     """
     Handles and prints events yielded by the agent.
@@ -15,32 +16,140 @@ def handle_agent_events(
         verbose: If True, prints more detailed information (e.g., tool arguments).
     """
     for event in agent_events:
-        if event.type == source_agent.agents.code.AgentEventType.ITERATION_START:
-            print("\n" + "-" * 40 + "\n")
-            print(f"🔄 Iteration {event.data['step']}/{event.data['max_steps']}")
-        elif event.type == source_agent.agents.code.AgentEventType.AGENT_MESSAGE:
-            print(f"🤖 Agent: {event.data['content']}")
-        elif event.type == source_agent.agents.code.AgentEventType.TOOL_CALL:
-            tool_name = event.data["name"]
-            tool_args = event.data["arguments"]
-            print(f"🔧 Calling: {tool_name}")
-            if verbose:
-                try:
-                    print(f"   Args: {json.dumps(json.loads(tool_args), indent=2)}")
-                except json.JSONDecodeError:
-                    print(f"   Raw Args: {tool_args}")
-        elif event.type == source_agent.agents.code.AgentEventType.TOOL_RESULT:
-            tool_name = event.data["name"]
-            tool_result = event.data["result"]
-            print(f"✅ Tool Result ({tool_name}): {json.dumps(tool_result, indent=2)}")
-        elif event.type == source_agent.agents.code.AgentEventType.TASK_COMPLETE:
-            # Exit generator iteration as task is complete
-            print(f"💯 {event.data['message']}\n")
-            return
-        elif event.type == source_agent.agents.code.AgentEventType.MAX_STEPS_REACHED:
-            print(f"🛑 {event.data['message']}")
-        elif event.type == source_agent.agents.code.AgentEventType.ERROR:
-            print(f"❌ Error: {event.data['message']}", file=sys.stderr)
+        # Printing shows up in --profile traces, it can be slow on some terminals
+        with source_agent.profiler.span("handle_event", "cli", type=event.type.value):
+            if event.type == source_agent.agents.code.AgentEventType.ITERATION_START:
+                print("\n" + "-" * 40 + "\n")
+                print(f"🔄 Iteration {event.data['step']}/{event.data['max_steps']}")
+            elif (
+                event.type
+                == source_agent.agents.code.AgentEventType.AGENT_MESSAGE_DELTA
+            ):
+                # Streamed text arrives in pieces; print the prefix once per message
+                if event.data["index"] == 0:
+                    print("🤖 Agent: ", end="")
+                print(event.data["content"], end="", flush=True)
+            elif event.type == source_agent.agents.code.AgentEventType.AGENT_MESSAGE:
+                if event.data.get("streamed"):
+                    # Content was already printed by the deltas, just end the line
+                    print()
+                else:
+                    print(f"🤖 Agent: {event.data['content']}")
+            elif event.type == source_agent.agents.code.AgentEventType.TOOL_CALL:
+                tool_name = event.data["name"]
+                tool_args = event.data["arguments"]
+                print(f"🔧 Calling: {tool_name}")
+                if verbose:
+                    try:
+                        print(f"   Args: {json.dumps(json.loads(tool_args), indent=2)}")
+                    except json.JSONDecodeError:
+                        print(f"   Raw Args: {tool_args}")
+            elif event.type == source_agent.agents.code.AgentEventType.TOOL_RESULT:
+                tool_name = event.data["name"]
+                tool_result = event.data["result"]
+                print(
+                    f"✅ Tool Result ({tool_name}): {json.dumps(tool_result, indent=2)}"
+                )
+                if verbose and event.data.get("duration_seconds") is not None:
+                    print(f"   Took {event.data['duration_seconds']:.3f}s")
+            elif event.type == source_agent.agents.code.AgentEventType.LLM_USAGE:
+                if verbose:
+                    print(
+                        f"📊 Tokens: prompt {event.data['prompt_tokens']} "
+                        f"(cached {event.data['cached_tokens']}, "
+                        f"uncached {event.data['uncached_tokens']}), "
+                        f"completion {event.data['completion_tokens']} | "
+                        f"LLM {event.data['llm_seconds']:.2f}s, "
+                        f"{event.data['retries']} retries "
+                        f"({event.data['backoff_seconds']:.1f}s backoff)"
+                    )
+            elif (
+                event.type == source_agent.agents.code.AgentEventType.CONTEXT_COMPACTED
+            ):
+                print(
+                    f"🧹 Context compacted: {event.data['tokens_before']} → "
+                    f"{event.data['tokens_after']} tokens "
+                    f"(saved {event.data['tokens_saved']})"
+                )
+            elif event.type == source_agent.agents.code.AgentEventType.TASK_COMPLETE:
+                print(f"💯 {event.data['message']}\n")
+            elif (
+                event.type == source_agent.agents.code.AgentEventType.MAX_STEPS_REACHED
+            ):
+                print(f"🛑 {event.data['message']}")
+            elif event.type == source_agent.agents.code.AgentEventType.BUDGET_EXCEEDED:
+                print(f"💸 {event.data['message']}", file=sys.stderr)
+            elif event.type == source_agent.agents.code.AgentEventType.ERROR:
+                print(f"❌ Error: {event.data['message']}", file=sys.stderr)
+            elif event.type == source_agent.agents.code.AgentEventType.RUN_SUMMARY:
+                # Always the last event of a run
+                if verbose:
+                    print(source_agent.telemetry.format_summary(event.data))
+                return
+
+
+def format_prompt(prompt: str) -> str:
+    """Wrap a user prompt in the instructions used for autonomous runs."""
+    return (
+        "You are a helpful code assistant. Think step-by-step and use tools when needed.\n"
+        "Stop when you have completed your thoughts.\n"
+        f"The user's prompt is:\n\n{prompt}"
+    )
+
+
+def resolve_fallbacks(specs, prompt_cache: bool = False):
+    """
+    Turn `--fallback PROVIDER[:MODEL]` values into fallback endpoints.
+
+    Args:
+        specs: The option values, may be None.
+        prompt_cache: If True, use each provider's prompt caching mode.
+
+    Returns:
+        A list of `source_agent.failover.Fallback`.
+
+    Raises:
+        ValueError: If a provider is unknown or its API key is missing.
+    """
+    fallbacks = []
+    for spec in specs or []:
+        provider, _, model = spec.partition(":")
+        api_key, base_url = source_agent.providers.get(provider)
+        fallbacks.append(
+            source_agent.failover.Fallback(
+                base_url=base_url,
+                api_key=api_key,
+                model=model or None,
+                prompt_cache=(
+                    source_agent.providers.PROVIDERS[provider.lower()].prompt_cache
+                    if prompt_cache
+                    else None
+                ),
+            )
+        )
+    return fallbacks
+
+
+def build_budget(args):
+    """
+    Build the per-run budget from the command-line caps.
+
+    Returns:
+        A `source_agent.budget.Budget`, or None if no cap was given.
+    """
+    caps = {
+        "max_input_tokens": args.max_input_tokens,
+        "max_output_tokens": args.max_output_tokens,
+        "max_cost": args.max_cost,
+        "max_request_tokens": args.max_request_tokens,
+    }
+    if all(cap is None for cap in caps.values()):
+        return None
+    if args.max_cost is not None and not (args.input_price or args.output_price):
+        raise ValueError("--max-cost needs --input-price and/or --output-price")
+    return source_agent.budget.Budget(
+        **caps, input_price=args.input_price, output_price=args.output_price
+    )
 
 
 def run_prompt_mode(agent, prompt: str, verbose: bool):
@@ -52,17 +161,85 @@ def run_prompt_mode(agent, prompt: str, verbose: bool):
         prompt: The prompt to provide to the agent.
         verbose: If True, enables verbose output for agent events.
     """
-    user_prompt = (
-        "You are a helpful code assistant. Think step-by-step and use tools when needed.\n"
-        "Stop when you have completed your thoughts.\n"
-        f"The user's prompt is:\n\n{prompt}"
-    )
-
     print("🚀 Running in autonomous mode...")
-    agent_events_generator = agent.run(user_prompt=user_prompt)
+    agent_events_generator = agent.run(user_prompt=format_prompt(prompt))
     handle_agent_events(agent_events_generator, verbose)
 
 
+def run_batch_mode(args) -> int:
+    """
+    Run every prompt in a JSONL file and write one result line per prompt.
+
+    Items may override `provider` and `model` per line; everything else comes
+    from the command line. API keys are resolved per provider up front, so an
+    item for an unconfigured provider fails on its own without stopping the
+    rest of the batch.
+
+    Args:
+        args: The parsed command-line arguments.
+
+    Returns:
+        Exit code (0 if every prompt completed, 1 otherwise).
+    """
+    input_path = pathlib.Path(args.batch)
+    output_path = pathlib.Path(args.batch_output or f"{input_path}.results.jsonl")
+    items = source_agent.batch.load_prompts(input_path)
+
+    # Read once here so items running in their own directories share it
+    system_prompt = pathlib.Path(
+        source_agent.agents.code.CodeAgent.DEFAULT_SYSTEM_PROMPT_PATH
+    ).read_text(encoding="utf-8")
+    fallbacks = resolve_fallbacks(args.fallback, args.prompt_cache)
+    budget = build_budget(args)
+
+    def build_job(item):
+        provider = item.get("provider") or args.provider
+        api_key, base_url = source_agent.providers.get(provider)
+        return {
+            "user_prompt": format_prompt(item["prompt"]),
+            "agent_kwargs": {
+                "api_key": api_key,
+                "base_url": base_url,
+                "model": item.get("model") or args.model,
+                "temperature": args.temperature,
+                "system_prompt": system_prompt,
+                "max_tool_workers": args.tool_workers,
+                "artifact_threshold": args.artifact_threshold,
+                "prompt_cache": (
+                    source_agent.providers.PROVIDERS[provider.lower()].prompt_cache
+                    if args.prompt_cache
+                    else None
+                ),
+                "context_budget": args.context_budget,
+                "summarize_context": args.summarize_context,
+                "llm_cache": (
+                    {
+                        "directory": args.llm_cache_dir,
+                        "mode": args.llm_cache,
+                        "max_bytes": args.llm_cache_max_mb * 1024 * 1024,
+                    }
+                    if args.llm_cache
+                    else None
+                ),
+                "fallbacks": fallbacks,
+                "hedge_after": args.hedge_after,
+                "budget": budget,
+                "repo_map": args.repo_map,
+            },
+        }
+
+    print(f"📦 Running {len(items)} prompts from {input_path} → {output_path}")
+    with open(output_path, "w", encoding="utf-8") as output:
+        totals = source_agent.batch.run_batch(
+            items,
+            build_job,
+            output,
+            concurrency=args.concurrency,
+            workdir_root=args.batch_workdir,
+        )
+    return 0 if totals.get("complete", 0) == totals["total"] else 1
+
+
 def run_interactive_mode(agent, verbose: bool):
     """
     Runs the agent in interactive mode, allowing user input and displaying agent progress.
@@ -73,16 +250,14 @@ def run_interactive_mode(agent, verbose: bool):
     """
     history = []
 
-    print(
-        """
+    print("""
 🧠 Entering interactive mode.
 💡 Type your prompt and press ↵.
 
     Type ':exit' to quit,
     Type ':reset' to start fresh,
     Type ':help' for commands.
-        """
-    )
+        """)
 
     while True:
         try:
@@ -92,15 +267,13 @@ def run_interactive_mode(agent, verbose: bool):
                 continue
 
             if user_input.lower() in (":help", "?"):
-                print(
-                    """
+                print("""
 🔧 Available commands:
   :exit      Quit the session
   :history   Show conversation history (local to CLI)
   :reset     Clear conversation history (agent's memory)
   :help      Show this help message
-                    """
-                )
+                    """)
                 continue
 
             if user_input.lower() in ("q", ":exit"):
@@ -134,13 +307,8 @@ def run_interactive_mode(agent, verbose: bool):
 
                 # In interactive mode, we might want to allow deeper interaction.
                 # For now, just continue processing.
-                # If a "task_complete" event is received, break the loop
-                if (
-                    event.type == source_agent.agents.code.AgentEventType.TASK_COMPLETE
-                    or event.type
-                    == source_agent.agents.code.AgentEventType.MAX_STEPS_REACHED
-                    or event.type == source_agent.agents.code.AgentEventType.ERROR
-                ):
+                # The run summary is always the final event of a run
+                if event.type == source_agent.agents.code.AgentEventType.RUN_SUMMARY:
                     break
 
         except (KeyboardInterrupt, EOFError):
@@ -153,13 +321,283 @@ def run_interactive_mode(agent, verbose: bool):
             )
 
 
-def main() -> int:
+def mock_server_main(argv) -> int:
+    """
+    Serve a scripted scenario on a local OpenAI-compatible endpoint.
+
+    Args:
+        argv: Command-line arguments after the subcommand.
+
+    Returns:
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="source-agent mock-server",
+        description="Serve a scripted scenario on a local OpenAI-compatible endpoint.",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        default="basic",
+        help="Scenario file (YAML or JSON) or bundled scenario name (default: basic)",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    server = source_agent.mock_server.MockServer(
+        source_agent.mock_server.load_scenario(args.scenario),
+        host=args.host,
+        port=args.port,
+    )
+    print(f"🧪 Serving scenario '{server.scenario['name']}' at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping mock server.")
+    finally:
+        server.stop()
+    return 0
+
+
+def loop_bench_main(argv) -> int:
+    """
+    Benchmark the agent loop against a scripted mock server.
+
+    Args:
+        argv: Command-line arguments after the subcommand.
+
+    Returns:
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="source-agent loop-bench",
+        description="Benchmark the agent loop against a scripted local mock server.",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        default="basic",
+        help="Scenario file (YAML or JSON) or bundled scenario name (default: basic)",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=source_agent.loop_bench.RUNS,
+        help=f"Number of measured runs (default: {source_agent.loop_bench.RUNS})",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Runs in flight at once"
+    )
+    parser.add_argument("--stream", action="store_true", default=False)
+    parser.add_argument(
+        "--base-url",
+        type=str,
+        default=None,
+        help="Use an already running mock server instead of an in-process one",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        default=False,
+        help="Also report the Python heap peak (slower)",
+    )
+    parser.add_argument(
+        "--json", action="store_true", default=False, help="Print the report as JSON"
+    )
+    args = parser.parse_args(argv)
+
+    report = source_agent.loop_bench.run_loop_benchmark(
+        scenario=args.scenario,
+        runs=args.runs,
+        concurrency=args.concurrency,
+        stream=args.stream,
+        base_url=args.base_url,
+        trace_memory=args.trace_memory,
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(source_agent.loop_bench.format_report(report))
+    return 0
+
+
+def index_main(argv) -> int:
+    """
+    Build or update the trigram index used by file_search_tool.
+
+    Args:
+        argv: Command-line arguments after the subcommand.
+
+    Returns:
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="source-agent index",
+        description="Build or update the search index of a workspace.",
+    )
+    parser.add_argument(
+        "path", nargs="?", default=".", help="Workspace directory (default: .)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        default=False,
+        help="Re-read every file instead of only the changed ones",
+    )
+    parser.add_argument(
+        "--json", action="store_true", default=False, help="Print the stats as JSON"
+    )
+    args = parser.parse_args(argv)
+
+    index = source_agent.search_index.TrigramIndex(args.path)
+    stats = index.update(rebuild=args.rebuild)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print(
+            f"🗂️  Indexed {stats['files']} files ({stats['updated']} updated, "
+            f"{stats['removed']} removed), {stats['trigrams']} trigrams, "
+            f"{stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.2f}s: {index.path}"
+        )
+    return 0
+
+
+def bench_main(argv) -> int:
+    """
+    Compare providers and models on latency, throughput and tool-call validity.
+
+    Args:
+        argv: Command-line arguments after the subcommand.
+
+    Returns:
+        Exit code (1 if every request to some target failed).
+    """
+    parser = argparse.ArgumentParser(
+        prog="source-agent bench",
+        description="Benchmark providers on representative agent requests.",
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        action="append",
+        default=None,
+        metavar="PROVIDER[:MODEL]",
+        help="Provider and model to benchmark (repeatable, default: openrouter:moonshotai/kimi-k2)",
+    )
+    parser.add_argument(
+        "--base-url",
+        type=str,
+        default=None,
+        help="Benchmark a local OpenAI-compatible endpoint instead of the targets",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="mock",
+        help="Model to request from --base-url (default: mock)",
+    )
+    parser.add_argument(
+        "--mock",
+        action="store_true",
+        default=False,
+        help="Benchmark an in-process mock server, fully offline",
+    )
+    parser.add_argument(
+        "--prompts",
+        type=str,
+        default=None,
+        help="JSONL file of prompts to send instead of the built-in set",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=source_agent.bench.REPEATS,
+        help=f"Times each prompt is sent (default: {source_agent.bench.REPEATS})",
+    )
+    parser.add_argument(
+        "--json",
+        type=str,
+        default=None,
+        help="Also write the full report as JSON to this file",
+    )
+    args = parser.parse_args(argv)
+
+    prompts = (
+        source_agent.batch.load_prompts(pathlib.Path(args.prompts))
+        if args.prompts
+        else None
+    )
+
+    server = None
+    if args.mock:
+        server = source_agent.mock_server.MockServer(
+            source_agent.mock_server.load_scenario("bench")
+        ).start()
+        args.base_url = server.base_url
+
+    try:
+        if args.base_url:
+            targets = [
+                {
+                    "name": "local",
+                    "base_url": args.base_url,
+                    "api_key": "local",
+                    "model": args.model,
+                }
+            ]
+        else:
+            targets = []
+            for spec in args.target or ["openrouter:moonshotai/kimi-k2"]:
+                provider, _, model = spec.partition(":")
+                api_key, base_url = source_agent.providers.get(provider)
+                targets.append(
+                    {
+                        "name": provider,
+                        "base_url": base_url,
+                        "api_key": api_key,
+                        "model": model or "moonshotai/kimi-k2",
+                    }
+                )
+
+        print(f"⏱️  Benchmarking {len(targets)} target(s)...")
+        report = source_agent.bench.run_bench(targets, prompts, args.repeats)
+    except Exception as e:
+        print(f"An unhandled error occurred: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if server:
+            server.stop()
+
+    print(source_agent.bench.format_table(report))
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(report, indent=2))
+    failed = any(r["errors"] == r["requests"] for r in report["results"])
+    return 1 if failed else 0
+
+
+SUBCOMMANDS = {
+    "bench": bench_main,
+    "mock-server": mock_server_main,
+    "loop-bench": loop_bench_main,
+    "index": index_main,
+}
+
+
+def main(argv=None) -> int:
     """
     Main entry point for the application.
 
+    The first argument may name a subcommand (see `SUBCOMMANDS`); otherwise
+    the agent runs with the options below.
+
     Returns:
         Exit code (0 for success, non-zero for failure).
     """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
+
     parser = argparse.ArgumentParser(description="Simple coding agent.")
     parser.add_argument(
         "-p",
@@ -212,8 +650,293 @@ def main() -> int:
         default=False,
         help="Enable verbose output for agent events and tool calls",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="Stream model output token by token as it is generated",
+    )
+    parser.add_argument(
+        "--tool-workers",
+        type=int,
+        default=None,
+        help="Maximum read-only tool calls to run concurrently (default: 8)",
+    )
+    parser.add_argument(
+        "--context-budget",
+        type=int,
+        default=None,
+        help="Compact the conversation when it exceeds this many estimated tokens",
+    )
+    parser.add_argument(
+        "--summarize-context",
+        action="store_true",
+        default=False,
+        help="Summarize older turns with the model when compaction alone is not enough",
+    )
+    parser.add_argument(
+        "--artifact-threshold",
+        type=int,
+        default=None,
+        help="Store tool results larger than this many characters on disk (0 disables, default: 16000)",
+    )
+    parser.add_argument(
+        "--prompt-cache",
+        action="store_true",
+        default=False,
+        help="Enable provider prompt caching and report cached input tokens (with -v)",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        type=str,
+        default=None,
+        choices=["read-through", "record", "replay"],
+        help="Cache LLM responses on disk: read-through, record, or replay (fail on miss)",
+    )
+    parser.add_argument(
+        "--llm-cache-dir",
+        type=str,
+        default=None,
+        help="Directory for the LLM response cache (default: ~/.cache/source-agent/llm)",
+    )
+    parser.add_argument(
+        "--llm-cache-max-mb",
+        type=int,
+        default=256,
+        help="Maximum LLM response cache size before LRU eviction (default: 256)",
+    )
+
+    parser.add_argument(
+        "--batch",
+        type=str,
+        default=None,
+        help='Run every prompt in a JSONL file ({"prompt": ...} per line) concurrently',
+    )
+    parser.add_argument(
+        "--batch-output",
+        type=str,
+        default=None,
+        help="Where to write batch results (default: <batch file>.results.jsonl)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum concurrent batch prompts per provider (default: 4)",
+    )
+    parser.add_argument(
+        "--batch-workdir",
+        type=str,
+        default=None,
+        help="Give each batch prompt its own working directory under this path",
+    )
+
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=100,
+        help="Maximum HTTP connections per provider endpoint (default: 100)",
+    )
+    parser.add_argument(
+        "--keepalive",
+        type=float,
+        default=60.0,
+        help="Seconds to keep idle provider connections open for reuse (default: 60)",
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=600.0,
+        help="Seconds to wait for a model response (default: 600)",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds to wait for a provider connection (default: 10)",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        default=False,
+        help="Use HTTP/2 for provider requests (requires the 'http2' extra)",
+    )
+
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=None,
+        help="Requests per minute allowed by the provider (default: learned from response headers)",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=None,
+        help="Tokens per minute allowed by the provider (default: learned from response headers)",
+    )
+
+    parser.add_argument(
+        "--fallback",
+        type=str,
+        action="append",
+        default=None,
+        metavar="PROVIDER[:MODEL]",
+        help="Provider to fail over to when the primary is failing (repeatable, tried in order)",
+    )
+    parser.add_argument(
+        "--hedge-after",
+        type=float,
+        default=None,
+        help="Also send a request to the next fallback if no response after this many seconds",
+    )
+
+    parser.add_argument(
+        "--repo-map",
+        type=int,
+        nargs="?",
+        const=2_000,
+        default=None,
+        metavar="TOKENS",
+        help="Add a repository outline to the system prompt (default: 2000 tokens)",
+    )
+
+    parser.add_argument(
+        "--max-input-tokens",
+        type=int,
+        default=None,
+        help="Stop a run before it sends more than this many prompt tokens in total",
+    )
+    parser.add_argument(
+        "--max-output-tokens",
+        type=int,
+        default=None,
+        help="Stop a run once it has received this many completion tokens",
+    )
+    parser.add_argument(
+        "--max-request-tokens",
+        type=int,
+        default=None,
+        help="Never send a single request estimated above this many tokens (e.g. the context window)",
+    )
+    parser.add_argument(
+        "--max-cost",
+        type=float,
+        default=None,
+        help="Stop a run before it spends more than this many dollars",
+    )
+    parser.add_argument(
+        "--input-price",
+        type=float,
+        default=0.0,
+        help="Dollars per million prompt tokens, for --max-cost",
+    )
+    parser.add_argument(
+        "--output-price",
+        type=float,
+        default=0.0,
+        help="Dollars per million completion tokens, for --max-cost",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="TRACE.json",
+        help="Record where the run spends its time and write a Chrome trace (view in Perfetto)",
+    )
+    parser.add_argument(
+        "--profile-sample",
+        type=float,
+        nargs="?",
+        const=5.0,
+        default=None,
+        metavar="MS",
+        help="With --profile, also sample Python stacks every MS milliseconds (default: 5) to find hot spots",
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        metavar="SESSION",
+        help="Continue a journaled session, by id or path to its .jsonl journal",
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        default=False,
+        help="Don't journal interactive sessions to ~/.cache/source-agent/sessions",
+    )
+
+    args = parser.parse_args(argv)
+
+    if not args.profile:
+        return run(args)
+
+    source_agent.profiler.start(
+        sample_interval=args.profile_sample / 1000 if args.profile_sample else None
+    )
+    try:
+        return run(args)
+    finally:
+        source_agent.profiler.stop().write(args.profile)
+        print(
+            f"📈 Trace written to {args.profile} (open it in https://ui.perfetto.dev)",
+            file=sys.stderr,
+        )
+
+
+def run(args) -> int:
+    """
+    Run the agent (or a batch) with the parsed command-line options.
+
+    Returns:
+        Exit code (0 for success, non-zero for failure).
+    """
+    # Set before any agent (or batch worker) creates its client
+    source_agent.providers.configure_clients(
+        source_agent.providers.ClientOptions(
+            max_connections=args.pool_size,
+            max_keepalive_connections=min(
+                args.pool_size,
+                source_agent.providers.ClientOptions.max_keepalive_connections,
+            ),
+            keepalive_expiry=args.keepalive,
+            timeout=args.request_timeout,
+            connect_timeout=args.connect_timeout,
+            http2=args.http2,
+        )
+    )
 
-    args = parser.parse_args()
+    if args.rpm or args.tpm:
+        source_agent.ratelimit.configure_limiter(
+            source_agent.providers.PROVIDERS[args.provider].base_url,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+        )
+
+    if args.batch:
+        try:
+            return run_batch_mode(args)
+        except Exception as e:
+            print(f"An unhandled error occurred: {e}", file=sys.stderr)
+            return 1
+
+    try:
+        budget = build_budget(args)
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
+
+    journal = None
+    if args.resume:
+        try:
+            journal = source_agent.sessions.SessionJournal.open(args.resume)
+        except FileNotFoundError as e:
+            print(f"❌ Error: {e}", file=sys.stderr)
+            return 1
+    elif args.interactive and not args.no_journal:
+        journal = source_agent.sessions.SessionJournal()
 
     api_key, base_url = source_agent.providers.get(args.provider)
     agent = source_agent.agents.code.CodeAgent(
@@ -221,7 +944,41 @@ def main() -> int:
         base_url=base_url,
         model=args.model,
         temperature=args.temperature,
+        stream=args.stream,
+        max_tool_workers=args.tool_workers,
+        artifact_threshold=args.artifact_threshold,
+        prompt_cache=(
+            source_agent.providers.PROVIDERS[args.provider].prompt_cache
+            if args.prompt_cache
+            else None
+        ),
+        response_cache=(
+            source_agent.llm_cache.ResponseCache(
+                directory=args.llm_cache_dir,
+                mode=args.llm_cache,
+                max_bytes=args.llm_cache_max_mb * 1024 * 1024,
+            )
+            if args.llm_cache
+            else None
+        ),
+        fallbacks=resolve_fallbacks(args.fallback, args.prompt_cache),
+        hedge_after=args.hedge_after,
+        journal=journal,
+        budget=budget,
+        repo_map=args.repo_map,
     )
+    if journal and agent.artifact_store:
+        # Keep artifacts under the session id, so handles still resolve on resume
+        agent.artifact_store = source_agent.artifacts.ArtifactStore(
+            session_id=journal.session_id,
+            threshold=agent.artifact_store.threshold,
+        )
+    if args.context_budget:
+        agent.context_manager = source_agent.context.ContextWindowManager(
+            budget_tokens=args.context_budget,
+            summarizer=agent.summarize_messages if args.summarize_context else None,
+            estimator=agent.token_estimator,
+        )
 
     try:
         if args.interactive:
@@ -231,6 +988,12 @@ def main() -> int:
     except Exception as e:
         print(f"An unhandled error occurred: {e}", file=sys.stderr)
         return 1
+    finally:
+        if journal:
+            journal.close()
+            print(f"💾 Session saved. Resume it with: --resume {journal.session_id}")
+        elif agent.artifact_store:
+            agent.artifact_store.cleanup()
 
     return 0
 
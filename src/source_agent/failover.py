@@ -0,0 +1,319 @@
+import time
+import openai
+import asyncio
+import threading
+from typing import Any, Dict, List, Tuple, Callable, Optional, Sequence, Awaitable
+from .ratelimit import is_transient
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class Fallback:
+    """
+    A provider endpoint to fail over (or hedge) to.
+
+    Attributes:
+        base_url: The provider's base URL.
+        api_key: The API key for the provider.
+        model: Model to request there, defaults to the primary's model.
+        prompt_cache: The provider's prompt cache mode, or None to disable.
+    """
+
+    base_url: str
+    api_key: str
+    model: Optional[str] = None
+    prompt_cache: Optional[str] = None
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """
+    Return True if `error` says the provider is unhealthy, not the request bad.
+
+    Only these errors trip circuit breakers and move on to the next provider;
+    a 400 or 401 would fail the same way everywhere and is raised right away.
+    """
+    if isinstance(error, openai.APIStatusError):
+        return is_transient(error)
+    return isinstance(error, (openai.OpenAIError, ConnectionError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Skips a provider for a cool-down period after repeated failures.
+
+    After `failure_threshold` consecutive failures the breaker opens. Once
+    `cooldown` seconds have passed one trial request is let through; its
+    success closes the breaker, its failure opens it again. Thread-safe.
+    """
+
+    def __init__(self, failure_threshold: int = None, cooldown: float = None):
+        self.failure_threshold = failure_threshold or FAILURE_THRESHOLD
+        self.cooldown = COOLDOWN_SECONDS if cooldown is None else cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def available(self) -> bool:
+        """Return True if a request may be sent to the provider now."""
+        with self._lock:
+            return self._available()
+
+    def _available(self) -> bool:
+        if self.opened_at is None:
+            return True
+        return not self._trial and time.monotonic() - self.opened_at >= self.cooldown
+
+    def allow(self) -> bool:
+        """Like `available`, but claims the single trial request when half-open."""
+        with self._lock:
+            if not self._available():
+                return False
+            if self.opened_at is not None:
+                self._trial = True  # Half-open: let a single request probe it
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+_breakers: Dict[Any, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(key: Any) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a provider endpoint."""
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker()
+        return breaker
+
+
+def clear_breakers():
+    """Forget every circuit breaker and its failure history."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class ProviderChain:
+    """
+    Sends a request to an ordered list of providers until one succeeds.
+
+    The first provider whose circuit breaker allows it gets the request. If it
+    fails, the next one is tried. With `hedge_after` set, a provider that
+    hasn't answered within that many seconds gets company: the request is
+    also sent to the next provider and the first successful response wins.
+    Hedging trades some duplicate requests for a much shorter tail latency.
+
+    Args:
+        targets: `(key, target)` pairs in order of preference. The key
+            identifies the provider's circuit breaker; the target is passed
+            to the request function.
+        hedge_after: Seconds before a hedged request is sent, None to only
+            fail over.
+    """
+
+    def __init__(self, targets: Sequence[Tuple[Any, Any]], hedge_after: float = None):
+        self.targets = list(targets)
+        self.hedge_after = hedge_after
+
+    def candidates(self) -> List[Tuple[Any, Any]]:
+        """The targets whose breakers allow a request, or all if none do."""
+        return self._available() or list(self.targets)
+
+    def _available(self) -> List[Tuple[Any, Any]]:
+        return [(key, t) for key, t in self.targets if get_breaker(key).available()]
+
+    @staticmethod
+    def _next_target(queue, forced: bool, required: bool) -> Optional[Tuple[Any, Any]]:
+        """
+        Pop the next target whose breaker lets the request through.
+
+        A breaker may have opened, or another request claimed its half-open
+        trial, since the queue was built; such targets are skipped. With every
+        breaker open (`forced`) they're tried anyway, and a `required` launch
+        falls back to the last target rather than sending nothing at all.
+        """
+        while queue:
+            key, target = queue.popleft()
+            if get_breaker(key).allow() or forced or (required and not queue):
+                return key, target
+        return None
+
+    def _hedge_timeout(self, hedge: bool, queue) -> Optional[float]:
+        return self.hedge_after if hedge and queue and self.hedge_after else None
+
+    @staticmethod
+    def _record(key: Any, error: Exception = None):
+        breaker = get_breaker(key)
+        if error is not None and is_provider_failure(error):
+            breaker.record_failure()
+        else:
+            # Any answer, even a rejection of the request, means it's reachable
+            breaker.record_success()
+
+    def _guarded(self, key: Any, fn: Callable[[Any], Any], target: Any) -> Any:
+        try:
+            result = fn(target)
+        except Exception as e:
+            self._record(key, e)
+            raise
+        self._record(key)
+        return result
+
+    def call(
+        self, fn: Callable[[Any], Any], stats: Any = None, hedge: bool = True
+    ) -> Tuple[Any, Any]:
+        """
+        Run `fn(target)` against the chain.
+
+        Losing hedged requests can't be interrupted; they finish in the
+        background and their results are discarded.
+
+        Args:
+            fn: Sends the request to one target and returns the response.
+            stats: Optional object whose `hedges` and `failovers` counters
+                are incremented.
+            hedge: False to only fail over, e.g. for streamed responses whose
+                chunks are consumed after `fn` returns.
+
+        Returns:
+            The winning response and the target that produced it.
+
+        Raises:
+            The last provider's error if every provider failed, or the first
+            error that isn't a provider failure.
+        """
+        available = self._available()
+        queue = deque(available or self.targets)
+        executor = ThreadPoolExecutor(max_workers=len(queue))
+        pending = {}
+        last_error = None
+
+        def launch(required: bool = True) -> bool:
+            picked = self._next_target(queue, not available, required)
+            if picked is not None:
+                key, target = picked
+                pending[executor.submit(self._guarded, key, fn, target)] = target
+            return picked is not None
+
+        try:
+            launch()
+            while pending:
+                done, _ = wait(
+                    pending,
+                    timeout=self._hedge_timeout(hedge, queue),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    if launch(required=False) and stats is not None:
+                        stats.hedges += 1
+                    continue
+
+                for future in done:
+                    target = pending.pop(future)
+                    try:
+                        return future.result(), target
+                    except Exception as e:
+                        if not is_provider_failure(e):
+                            raise
+                        last_error = e
+
+                if not pending and queue:
+                    if stats is not None:
+                        stats.failovers += 1
+                    launch()
+            raise last_error
+        finally:
+            executor.shutdown(wait=False)
+
+    async def acall(
+        self,
+        fn: Callable[[Any], Awaitable[Any]],
+        stats: Any = None,
+        hedge: bool = True,
+    ) -> Tuple[Any, Any]:
+        """
+        Async variant of `call`; losing hedged requests are cancelled.
+
+        Args:
+            fn: Coroutine function sending the request to one target.
+            stats: Optional object whose `hedges` and `failovers` counters
+                are incremented.
+            hedge: False to only fail over.
+
+        Returns:
+            The winning response and the target that produced it.
+        """
+        available = self._available()
+        queue = deque(available or self.targets)
+        pending = {}
+        last_error = None
+
+        async def guarded(key, target):
+            try:
+                result = await fn(target)
+            except Exception as e:
+                self._record(key, e)
+                raise
+            self._record(key)
+            return result
+
+        def launch(required: bool = True) -> bool:
+            picked = self._next_target(queue, not available, required)
+            if picked is not None:
+                key, target = picked
+                pending[asyncio.ensure_future(guarded(key, target))] = target
+            return picked is not None
+
+        try:
+            launch()
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._hedge_timeout(hedge, queue),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if launch(required=False) and stats is not None:
+                        stats.hedges += 1
+                    continue
+
+                for task in done:
+                    target = pending.pop(task)
+                    try:
+                        return task.result(), target
+                    except Exception as e:
+                        if not is_provider_failure(e):
+                            raise
+                        last_error = e
+
+                if not pending and queue:
+                    if stats is not None:
+                        stats.failovers += 1
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
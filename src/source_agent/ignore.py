@@ -0,0 +1,182 @@
+import os
+import re
+import pathspec
+import threading
+from typing import Dict, List, Tuple, Optional
+
+
+# Compiled rules files: path -> ((mtime_ns, size), spec or None)
+_rules: Dict[str, Tuple[Tuple[int, int], Optional[pathspec.PathSpec]]] = {}
+_rules_lock = threading.Lock()
+
+
+def load_rules(path: str) -> Optional[pathspec.PathSpec]:
+    """
+    Return the compiled patterns of a gitignore-style file, or None if it's missing.
+
+    Compiled patterns are cached process-wide and only reparsed when the
+    file's mtime or size changes.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _rules_lock:
+        cached = _rules.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            spec = pathspec.GitIgnoreSpec.from_lines(f.read().splitlines())
+    except OSError:
+        return None
+    with _rules_lock:
+        _rules[path] = (stamp, spec)
+    return spec
+
+
+def clear_rules():
+    """Forget every compiled rules file."""
+    with _rules_lock:
+        _rules.clear()
+
+
+def global_excludes_file() -> str:
+    """
+    Return the path of git's global excludes file.
+
+    That's `core.excludesFile` from the user's git config, or
+    `$XDG_CONFIG_HOME/git/ignore` like git itself.
+    """
+    config_home = os.getenv("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    path = os.path.join(config_home, "git", "ignore")
+    # Later files win, as in git
+    configs = [
+        os.path.join(config_home, "git", "config"),
+        os.getenv("GIT_CONFIG_GLOBAL") or os.path.expanduser("~/.gitconfig"),
+    ]
+    for config in configs:
+        try:
+            with open(config, "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        section = ""
+        for line in lines:
+            line = line.strip()
+            if line.startswith("["):
+                header = line[1:].split("]")[0].split()
+                section = header[0].lower() if header else ""
+                continue
+            match = re.match(r"excludesfile\s*=\s*(.*)", line, re.IGNORECASE)
+            if section == "core" and match:
+                value = re.split(r"\s[#;]", match.group(1))[0].strip().strip('"')
+                path = os.path.expanduser(value)
+    return path
+
+
+def repository_top(path: str) -> Optional[str]:
+    """Return the nearest directory at or above `path` containing `.git`."""
+    path = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+class IgnoreRules:
+    """
+    The ignore rules of a directory tree, applied the way git applies them.
+
+    Rules come from the global excludes file, `.git/info/exclude` and every
+    `.gitignore` from the repository top down to each path's directory;
+    deeper files take precedence, and within a file the last matching
+    pattern wins. Nothing inside an ignored directory can be re-included,
+    so a walker can prune a directory as soon as `is_ignored` says so.
+
+    Each directory's rule chain is built once per instance, and the rules
+    files themselves are compiled once per process (see `load_rules`).
+
+    Args:
+        root: The directory paths are relative to.
+        global_excludes: Also apply the user's global excludes file.
+    """
+
+    def __init__(self, root: str = ".", global_excludes: bool = True):
+        self.root = os.path.abspath(root)
+        top = repository_top(self.root) or self.root
+        rel = os.path.relpath(self.root, top).replace(os.sep, "/")
+        # Path of the root relative to the repository top
+        self.prefix = "" if rel == "." else f"{rel}/"
+
+        # (path prefix the patterns are relative to, patterns), lowest precedence first
+        chain: List[Tuple[str, pathspec.PathSpec]] = []
+        sources = [os.path.join(top, ".git", "info", "exclude")]
+        if global_excludes:
+            sources.insert(0, global_excludes_file())
+        chain.extend(("", spec) for spec in map(load_rules, sources) if spec)
+        # .gitignore files above the root, down from the repository top
+        base = ""
+        for part in self.prefix.split("/")[:-1]:
+            spec = load_rules(os.path.join(top, base, ".gitignore"))
+            if spec:
+                chain.append((base, spec))
+            base = f"{base}{part}/"
+        spec = load_rules(os.path.join(self.root, ".gitignore"))
+        if spec:
+            chain.append((self.prefix, spec))
+
+        self._chains: Dict[str, List[Tuple[str, pathspec.PathSpec]]] = {"": chain}
+        self._ignored_dirs: Dict[str, bool] = {}
+
+    def _chain(self, rel_dir: str) -> List[Tuple[str, pathspec.PathSpec]]:
+        # The rules that apply to the entries of `rel_dir`
+        chain = self._chains.get(rel_dir)
+        if chain is None:
+            chain = self._chain(rel_dir.rpartition("/")[0])
+            spec = load_rules(os.path.join(self.root, rel_dir, ".gitignore"))
+            if spec:
+                chain = chain + [(f"{self.prefix}{rel_dir}/", spec)]
+            self._chains[rel_dir] = chain
+        return chain
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Whether `path` (relative to the root, `/`-separated) is ignored.
+
+        Args:
+            path: The file or directory to check.
+            is_dir: `path` is a directory; directory answers are cached and
+                cover everything below it.
+        """
+        path = path.strip("/")
+        if not path:
+            return False
+        if is_dir and path in self._ignored_dirs:
+            return self._ignored_dirs[path]
+
+        parent = path.rpartition("/")[0]
+        ignored = bool(parent) and self.is_ignored(parent, is_dir=True)
+        if not ignored:
+            full = f"{self.prefix}{path}/" if is_dir else f"{self.prefix}{path}"
+            for base, spec in reversed(self._chain(parent)):
+                result = spec.check_file(full[len(base) :])
+                if result.include is not None:
+                    ignored = result.include
+                    break
+        if is_dir:
+            self._ignored_dirs[path] = ignored
+        return ignored
+
+    def match_file(self, path: str) -> bool:
+        """`pathspec`-style check; a trailing slash marks a directory."""
+        return self.is_ignored(path, is_dir=path.endswith("/"))
+
+
+def load_ignore(root: str = ".") -> IgnoreRules:
+    """Return the ignore rules for paths relative to `root`."""
+    return IgnoreRules(root)
@@ -0,0 +1,149 @@
+import os
+import json
+import hashlib
+import pathlib
+import tempfile
+import threading
+from .paths import cache_dir
+from typing import Any, Dict, Optional
+from .context import message_to_dict
+
+
+READ_THROUGH = "read-through"
+RECORD = "record"
+REPLAY = "replay"
+MODES = (READ_THROUGH, RECORD, REPLAY)
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def substitute(data: Any, aliases: Dict[str, str]) -> Any:
+    """Replace every occurrence of the `aliases` keys in JSON-serializable data."""
+    if not aliases:
+        return data
+    payload = json.dumps(data, default=str)
+    for value, placeholder in aliases.items():
+        payload = payload.replace(value, placeholder)
+    return json.loads(payload)
+
+
+class ResponseCache:
+    """
+    Disk-backed cache of LLM responses with LRU eviction.
+
+    Entries are keyed by a hash of everything that determines the response
+    (model, temperature, tool schemas and messages) and stored as one JSON file
+    each. Reads refresh the file's mtime, and the least recently used entries
+    are evicted once the cache grows past `max_bytes`.
+
+    Modes:
+        read-through: Serve hits from disk, call the model and record on a miss.
+        record: Always call the model and overwrite the stored response.
+        replay: Only serve from disk; a miss raises `CacheMissError`.
+    """
+
+    MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(
+        self,
+        directory: Optional[pathlib.Path] = None,
+        mode: str = READ_THROUGH,
+        max_bytes: int = None,
+    ):
+        if mode not in MODES:
+            raise ValueError(
+                f"Unknown cache mode: '{mode}'. Available modes are: {', '.join(MODES)}"
+            )
+        self.directory = pathlib.Path(directory) if directory else cache_dir("llm")
+        self.mode = mode
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._lock = threading.Lock()
+        self._size = None
+
+    @staticmethod
+    def key(request: Dict[str, Any], aliases: Dict[str, str] = None) -> str:
+        """
+        Compute the cache key for a request.
+
+        Args:
+            request: Dict with the model, temperature, tools and messages.
+            aliases: Run-specific strings (like artifact session ids) and the
+                stable placeholders they are replaced with before hashing.
+
+        Returns:
+            A hex SHA-256 digest of the canonical JSON form of the request.
+        """
+        canonical = {
+            **request,
+            "messages": [message_to_dict(m) for m in request.get("messages", [])],
+        }
+        payload = json.dumps(
+            canonical, sort_keys=True, separators=(",", ":"), default=str
+        )
+        for value, placeholder in (aliases or {}).items():
+            payload = payload.replace(value, placeholder)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Store `entry` under `key`, evicting old entries if needed."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(entry, default=str).encode("utf-8")
+
+        # Write atomically so concurrent readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _disk_usage(self) -> int:
+        return sum(p.stat().st_size for p in self.directory.glob("*/*.json"))
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits again."""
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                size -= entry_size
+            except OSError:
+                continue
+        self._size = size
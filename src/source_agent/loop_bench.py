@@ -0,0 +1,192 @@
+import sys
+import time
+import tracemalloc
+import source_agent
+from typing import Any, Dict, List, Optional
+from .telemetry import latency_summary
+from .mock_server import MockServer, load_scenario
+from concurrent.futures import ThreadPoolExecutor
+
+
+RUNS = 20
+PROMPT = "Work through the scripted task."
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, None where it can't be read."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _run_once(
+    base_url: str, index: int, stream: bool, agent_kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    agent = source_agent.agents.code.CodeAgent(
+        api_key="mock",
+        base_url=base_url,
+        model="mock",
+        system_prompt="You are a benchmark agent.",
+        stream=stream,
+        **agent_kwargs,
+    )
+    try:
+        events = 0
+        summary = {}
+        # A distinct prompt per run keeps the server's per-conversation state apart
+        for event in agent.run(user_prompt=f"[run {index}] {PROMPT}"):
+            events += 1
+            if event.type == source_agent.agents.code.AgentEventType.RUN_SUMMARY:
+                summary = event.data
+        return {"events": events, **summary}
+    finally:
+        if agent.artifact_store:
+            agent.artifact_store.cleanup()
+
+
+def run_loop_benchmark(
+    scenario: Any = "basic",
+    runs: int = None,
+    concurrency: int = 1,
+    stream: bool = False,
+    base_url: Optional[str] = None,
+    trace_memory: bool = False,
+    agent_kwargs: Dict[str, Any] = None,
+) -> Dict[str, Any]:
+    """
+    Drive `CodeAgent` through a scripted scenario and measure the loop itself.
+
+    Everything except the model runs for real: the HTTP client, request and
+    response serialization, event handling and the tools. One warm-up run is
+    made first and excluded from the results.
+
+    Args:
+        scenario: A scenario dict, file path or bundled scenario name.
+        runs: Number of measured runs.
+        concurrency: Runs in flight at once.
+        stream: Request streamed responses.
+        base_url: Use a mock server that is already running (e.g. in another
+            process, so it doesn't compete with the agent for the GIL)
+            instead of starting one in-process.
+        trace_memory: Also report the Python heap peak with `tracemalloc`,
+            which slows the run down noticeably.
+        agent_kwargs: Extra keyword arguments for `CodeAgent`.
+
+    Returns:
+        A JSON-serializable report.
+    """
+    runs = runs or RUNS
+    agent_kwargs = agent_kwargs or {}
+    if not isinstance(scenario, dict):
+        scenario = load_scenario(scenario)
+
+    server = None
+    if not base_url:
+        server = MockServer(scenario).start()
+        base_url = server.base_url
+
+    try:
+        _run_once(base_url, -1, stream, agent_kwargs)  # Warm up imports and connections
+        if server:
+            server.reset()
+            server.delay_seconds = 0.0
+
+        rss_before = _peak_rss_mb()
+        if trace_memory:
+            tracemalloc.start()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            results: List[Dict[str, Any]] = list(
+                executor.map(
+                    lambda i: _run_once(base_url, i, stream, agent_kwargs),
+                    range(runs),
+                )
+            )
+        wall = time.perf_counter() - started
+
+        heap_peak = None
+        if trace_memory:
+            heap_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+    finally:
+        if server:
+            server.stop()
+
+    steps = sum(r.get("steps", 0) for r in results)
+    llm_calls = sum(r["llm"]["count"] for r in results)
+    llm_seconds = sum(r["llm"]["total_seconds"] for r in results)
+    step_seconds = [r["wall_seconds"] / r["steps"] for r in results if r.get("steps")]
+    # Time per step spent outside the model call and the tools
+    overhead = [
+        (r["wall_seconds"] - r["llm"]["total_seconds"] - r["tools"]["total_seconds"])
+        / r["steps"]
+        for r in results
+        if r.get("steps")
+    ]
+
+    report = {
+        "scenario": scenario.get("name"),
+        "runs": runs,
+        "concurrency": concurrency,
+        "stream": stream,
+        "steps": steps,
+        "wall_seconds": round(wall, 4),
+        "steps_per_second": round(steps / wall, 2) if wall else 0.0,
+        "step_seconds": latency_summary(step_seconds),
+        "overhead_per_step_seconds": (
+            round(sum(overhead) / len(overhead), 6) if overhead else 0.0
+        ),
+        "events": sum(r["events"] for r in results),
+        "llm_calls": llm_calls,
+        "retries": sum(r["llm"]["retries"] for r in results),
+    }
+    if rss_before is not None:
+        rss_peak = _peak_rss_mb()
+        report["peak_rss_mb"] = round(rss_peak, 1)
+        report["rss_growth_mb"] = round(rss_peak - rss_before, 1)
+    if server and llm_calls:
+        # What the client side of a model call costs beyond the scripted latency
+        report["client_overhead_per_call_seconds"] = round(
+            (llm_seconds - server.delay_seconds) / llm_calls, 6
+        )
+    if heap_peak is not None:
+        report["heap_peak_mb"] = round(heap_peak, 1)
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a loop benchmark report for the terminal."""
+    steps = report["step_seconds"]
+    lines = [
+        f"🏁 Scenario '{report['scenario']}': {report['runs']} runs, "
+        f"concurrency {report['concurrency']}{', streamed' if report['stream'] else ''}",
+        f"   Throughput: {report['steps_per_second']:.1f} steps/s "
+        f"({report['steps']} steps in {report['wall_seconds']:.2f}s)",
+        f"   Step time:  p50 {steps['p50_seconds'] * 1000:.1f}ms / "
+        f"p90 {steps['p90_seconds'] * 1000:.1f}ms / p99 {steps['p99_seconds'] * 1000:.1f}ms",
+        f"   Overhead:   {report['overhead_per_step_seconds'] * 1000:.2f}ms per step "
+        f"outside LLM calls and tools",
+    ]
+    if "client_overhead_per_call_seconds" in report:
+        lines.append(
+            f"   Client:     {report['client_overhead_per_call_seconds'] * 1000:.2f}ms "
+            f"per LLM call beyond scripted latency"
+        )
+    memory = []
+    if "peak_rss_mb" in report:
+        memory.append(
+            f"peak RSS {report['peak_rss_mb']:.1f}MB (+{report['rss_growth_mb']:.1f}MB)"
+        )
+    if "heap_peak_mb" in report:
+        memory.append(f"heap peak {report['heap_peak_mb']:.1f}MB")
+    if memory:
+        lines.append(f"   Memory:     {', '.join(memory)}")
+    return "\n".join(lines)
@@ -0,0 +1,318 @@
+import json
+import time
+import yaml
+import hashlib
+import pathlib
+import threading
+from typing import Any, Dict, List, Tuple, Union, Optional
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+BUNDLED_SCENARIOS = pathlib.Path(__file__).parent / "scenarios"
+
+
+def load_scenario(path: Union[str, pathlib.Path]) -> Dict[str, Any]:
+    """
+    Load a scenario file, or a bundled scenario by name.
+
+    A scenario describes what the "model" answers at each step:
+
+        name: read-and-finish
+        usage: {prompt_tokens: 1200, completion_tokens: 40}
+        steps:
+          - content: "Let me check the date."
+            tool_calls:
+              - name: get_current_date
+                arguments: {}
+            delay: 0.05          # seconds before the response (or first chunk)
+            chunk_size: 8        # characters per streamed text chunk
+            chunk_delay: 0.001   # seconds between streamed chunks
+            headers: {x-ratelimit-remaining-requests: "99"}
+            errors:              # served first, once each per conversation
+              - status: 429
+                headers: {retry-after: "0"}
+          - tool_calls:
+              - name: msg_complete_tool
+                arguments: {}
+
+    Args:
+        path: A `.yaml`, `.yml` or `.json` file, or the name of a scenario in
+            `source_agent/scenarios` (e.g. "basic").
+
+    Returns:
+        The scenario.
+
+    Raises:
+        ValueError: If the scenario has no steps.
+    """
+    path = pathlib.Path(path)
+    if not path.exists() and (BUNDLED_SCENARIOS / f"{path}.yaml").exists():
+        path = BUNDLED_SCENARIOS / f"{path}.yaml"
+
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yaml", ".yml"):
+        scenario = yaml.safe_load(text)
+    else:
+        scenario = json.loads(text)
+
+    if not isinstance(scenario, dict) or not scenario.get("steps"):
+        raise ValueError(f"Scenario {path} has no steps")
+    scenario.setdefault("name", path.stem)
+    return scenario
+
+
+def _tool_calls(step: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+    calls = []
+    for number, call in enumerate(step.get("tool_calls") or []):
+        arguments = call.get("arguments", {})
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments)
+        calls.append(
+            {
+                "id": f"call_{index}_{number}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": arguments},
+            }
+        )
+    return calls
+
+
+class MockServer:
+    """
+    A local, OpenAI-compatible chat completions endpoint replaying a scenario.
+
+    The step is chosen by the number of assistant messages already in the
+    request, so concurrent conversations replay independently. Requests past
+    the last step get the last step again.
+
+    Usage:
+        with MockServer(load_scenario("basic")) as server:
+            agent = CodeAgent(base_url=server.base_url, api_key="mock", ...)
+
+    Attributes:
+        requests: Number of chat completion requests received.
+        errors_served: Number of scripted error responses sent.
+        delay_seconds: Total scripted delay slept, so benchmarks can subtract it.
+    """
+
+    def __init__(
+        self, scenario: Dict[str, Any], host: str = "127.0.0.1", port: int = 0
+    ):
+        self.scenario = scenario
+        self.requests = 0
+        self.errors_served = 0
+        self.delay_seconds = 0.0
+        self._attempts: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset(self):
+        """Forget which scripted errors each conversation has already seen."""
+        with self._lock:
+            self._attempts.clear()
+
+    def _sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+            with self._lock:
+                self.delay_seconds += seconds
+
+    def plan(
+        self, request: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any], Optional[Dict]]:
+        """
+        Pick the scripted step for a request.
+
+        Returns:
+            The step index, the step, and the scripted error to send instead
+            of the step's response (or None).
+        """
+        messages = request.get("messages", [])
+        index = sum(1 for m in messages if m.get("role") == "assistant")
+        steps = self.scenario["steps"]
+        step = steps[min(index, len(steps) - 1)]
+
+        # Identify the conversation by its first user message
+        first_user = next(
+            (m.get("content") for m in messages if m.get("role") == "user"), ""
+        )
+        conversation = hashlib.sha256(
+            json.dumps(first_user, default=str).encode("utf-8")
+        ).hexdigest()
+
+        with self._lock:
+            self.requests += 1
+            attempt = self._attempts.get((conversation, index), 0)
+            self._attempts[(conversation, index)] = attempt + 1
+            errors = step.get("errors") or []
+            error = errors[attempt] if attempt < len(errors) else None
+            if error:
+                self.errors_served += 1
+        return index, step, error
+
+    def completion(self, request: Dict[str, Any], index: int, step: Dict[str, Any]):
+        """Build a non-streamed chat completion for a step."""
+        tool_calls = _tool_calls(step, index)
+        return {
+            "id": f"chatcmpl-mock-{index}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": step.get("content"),
+                        "tool_calls": tool_calls or None,
+                    },
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                }
+            ],
+            "usage": self.usage(step),
+        }
+
+    def usage(self, step: Dict[str, Any]) -> Dict[str, int]:
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        usage.update(self.scenario.get("usage") or {})
+        usage.update(step.get("usage") or {})
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return usage
+
+    def chunks(self, request: Dict[str, Any], index: int, step: Dict[str, Any]):
+        """Yield the streamed chunks for a step, sleeping between text chunks."""
+        base = {
+            "id": f"chatcmpl-mock-{index}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+        }
+
+        def chunk(delta, finish_reason=None):
+            return {
+                **base,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+
+        yield chunk({"role": "assistant", "content": ""})
+
+        content = step.get("content") or ""
+        size = max(int(step.get("chunk_size", 16)), 1)
+        for start in range(0, len(content), size):
+            if start:
+                self._sleep(step.get("chunk_delay", 0))
+            yield chunk({"content": content[start : start + size]})
+
+        tool_calls = _tool_calls(step, index)
+        for number, call in enumerate(tool_calls):
+            yield chunk({"tool_calls": [{"index": number, **call}]})
+
+        yield chunk({}, "tool_calls" if tool_calls else "stop")
+
+        if (request.get("stream_options") or {}).get("include_usage"):
+            yield {**base, "choices": [], "usage": self.usage(step)}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like a real provider
+            # Headers and body go out in separate writes; don't let Nagle's
+            # algorithm and delayed ACKs add ~40ms to every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Any, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError as e:
+                    self._send_json(400, {"error": {"message": str(e)}})
+                    return
+
+                if self.path.rstrip("/").endswith("/reset"):
+                    server.reset()
+                    self._send_json(200, {"ok": True})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+
+                index, step, error = server.plan(request)
+                if error:
+                    server._sleep(error.get("delay", 0))
+                    self._send_json(
+                        int(error.get("status", 500)),
+                        {
+                            "error": {
+                                "message": error.get("message", "Scripted error"),
+                                "type": error.get("type", "mock_error"),
+                            }
+                        },
+                        error.get("headers"),
+                    )
+                    return
+
+                server._sleep(step.get("delay", 0))
+                if not request.get("stream"):
+                    self._send_json(
+                        200,
+                        server.completion(request, index, step),
+                        step.get("headers"),
+                    )
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                for name, value in (step.get("headers") or {}).items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.close_connection = True
+                for chunk in server.chunks(request, index, step):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
@@ -0,0 +1,23 @@
+import os
+import pathlib
+
+
+def cache_dir(*parts: str) -> pathlib.Path:
+    """
+    Return (a subdirectory of) the source-agent cache directory.
+
+    Resolved from SOURCE_AGENT_CACHE_DIR, then XDG_CACHE_HOME, then ~/.cache.
+    The directory is not created.
+
+    Args:
+        parts: Optional path components appended to the cache root.
+
+    Returns:
+        The resolved cache path.
+    """
+    root = os.getenv("SOURCE_AGENT_CACHE_DIR")
+    if not root:
+        xdg = os.getenv("XDG_CACHE_HOME")
+        base = pathlib.Path(xdg) if xdg else pathlib.Path.home() / ".cache"
+        root = base / "source-agent"
+    return pathlib.Path(root).joinpath(*parts)
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import threading
+from typing import Any, Dict, List, Tuple, Optional
+
+
+SAMPLE_INTERVAL = 0.005
+# Frames from these files are left out of sampled stacks
+_OWN_FILES = (threading.__file__, __file__)
+
+
+class _NullSpan:
+    """What `span` returns while profiling is off: a reusable no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "cat", "args", "started")
+
+    def __init__(self, profiler: "Profiler", name: str, cat: str, args: Dict):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        finished = time.perf_counter_ns()
+        args = self.args
+        if exc_type is not None:
+            args = {**args, "error": exc_type.__name__}
+        self.profiler.add(self.name, self.cat, self.started, finished, args)
+        return False
+
+
+class Profiler:
+    """
+    Records nested timing spans and writes them in Chrome trace event format.
+
+    Open the written file in https://ui.perfetto.dev (or chrome://tracing).
+    Spans are recorded per thread, so tool calls running in parallel show up
+    on their own tracks. With `sample_interval` set, a background thread also
+    samples every thread's Python stack and the samples are written as a
+    flame chart on a separate "Sampled stacks" process, to find hot spots
+    inside tools.
+
+    Args:
+        sample_interval: Seconds between stack samples, None to only record spans.
+    """
+
+    def __init__(self, sample_interval: Optional[float] = None):
+        self.sample_interval = sample_interval
+        self.origin = time.perf_counter_ns()
+        self.events: List[Dict[str, Any]] = []
+        self.samples: List[Tuple[int, int, Tuple[str, ...]]] = []
+        self.thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def span(self, name: str, cat: str = "agent", **args) -> _Span:
+        """Return a context manager timing the code it wraps."""
+        return _Span(self, name, cat, args)
+
+    def add(self, name: str, cat: str, started: int, finished: int, args: Dict = None):
+        """Record a finished span; times are `time.perf_counter_ns()` values."""
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (started - self.origin) / 1000,
+            "dur": (finished - started) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)  # list.append is atomic, no lock needed
+
+    def start(self) -> "Profiler":
+        if self.sample_interval and self._sampler is None:
+            self._sampler = threading.Thread(
+                target=self._sample, name="source-agent-sampler", daemon=True
+            )
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            now = time.perf_counter_ns()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename not in _OWN_FILES:
+                        stack.append(
+                            f"{code.co_name} "
+                            f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        )
+                    frame = frame.f_back
+                self.samples.append((ident, now, tuple(reversed(stack))))
+
+    def _sample_events(self) -> List[Dict[str, Any]]:
+        """Merge consecutive samples sharing a stack prefix into flame chart spans."""
+        events = []
+        by_thread: Dict[int, List[Tuple[int, Tuple[str, ...]]]] = {}
+        for ident, ts, stack in self.samples:
+            by_thread.setdefault(ident, []).append((ts, stack))
+
+        for ident, samples in by_thread.items():
+            open_frames: List[Tuple[str, int]] = []  # (name, started) per depth
+            for ts, stack in samples:
+                common = 0
+                while (
+                    common < len(open_frames)
+                    and common < len(stack)
+                    and open_frames[common][0] == stack[common]
+                ):
+                    common += 1
+                events.extend(self._close_frames(open_frames, common, ts, ident))
+                open_frames.extend((name, ts) for name in stack[common:])
+            last = samples[-1][0] + int((self.sample_interval or 0) * 1e9)
+            events.extend(self._close_frames(open_frames, 0, last, ident))
+        return events
+
+    def _close_frames(self, open_frames, depth: int, at: int, ident: int):
+        # Pop the frames deeper than `depth` as spans ending at `at`
+        while len(open_frames) > depth:
+            name, started = open_frames.pop()
+            yield {
+                "name": name,
+                "cat": "sample",
+                "ph": "X",
+                "ts": (started - self.origin) / 1000,
+                "dur": (at - started) / 1000,
+                "pid": 0,
+                "tid": ident,
+            }
+
+    def trace(self) -> Dict[str, Any]:
+        """Return the recorded spans (and samples) as a Chrome trace."""
+        pid = os.getpid()
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "source-agent"},
+            }
+        ]
+        for ident, name in self.thread_names.items():
+            metadata.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": ident,
+                    "args": {"name": name},
+                }
+            )
+        samples = self._sample_events()
+        if samples:
+            metadata.append(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": 0,
+                    "args": {"name": "Sampled stacks"},
+                }
+            )
+        return {
+            "traceEvents": metadata
+            + sorted(self.events, key=lambda e: e["ts"])
+            + samples,
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self, path: str):
+        """Write the Chrome trace JSON to `path`."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.trace(), f, default=str)
+
+
+_current: Optional[Profiler] = None
+
+
+def span(name: str, cat: str = "agent", **args):
+    """
+    Time a block in the active profiler.
+
+    While no profiler is active this returns a shared no-op, so spans can
+    stay in hot paths for free.
+    """
+    profiler = _current
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name, cat, **args)
+
+
+def start(sample_interval: Optional[float] = None) -> Profiler:
+    """Start recording spans process-wide; returns the new profiler."""
+    global _current
+    stop()
+    _current = Profiler(sample_interval).start()
+    return _current
+
+
+def stop() -> Optional[Profiler]:
+    """Stop recording; returns the profiler that was active, if any."""
+    global _current
+    profiler, _current = _current, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def active() -> Optional[Profiler]:
+    return _current
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List
+from .context import message_to_dict
+
+
+EXPLICIT = "explicit"
+IMPLICIT = "implicit"
+NONE = "none"
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def apply_cache_breakpoints(messages: List[Any]) -> List[Any]:
+    """
+    Return a copy of `messages` with Anthropic-style cache breakpoints.
+
+    A breakpoint is placed on the system prompt (which, together with the tool
+    schemas, forms the stable prefix) and on the most recent user or tool
+    message, so the next request can reuse everything up to this one.
+    The original list and its messages are left untouched.
+
+    Args:
+        messages: The conversation, starting with the system prompt.
+
+    Returns:
+        A new list suitable for the `messages` argument of the request.
+    """
+    marked = list(messages)
+    targets = [0]
+    for index in range(len(marked) - 1, 0, -1):
+        if message_to_dict(marked[index]).get("role") in ("user", "tool"):
+            targets.append(index)
+            break
+
+    for index in targets:
+        data = message_to_dict(marked[index])
+        content = data.get("content")
+        if isinstance(content, str) and content:
+            marked[index] = {
+                **data,
+                "content": [
+                    {"type": "text", "text": content, "cache_control": CACHE_CONTROL}
+                ],
+            }
+    return marked
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def usage_tokens(usage: Any) -> Dict[str, int]:
+    """
+    Normalize a completion `usage` block across providers.
+
+    Cached prompt tokens are reported as `prompt_tokens_details.cached_tokens`
+    (OpenAI, OpenRouter, xAI), `prompt_cache_hit_tokens` (DeepSeek) or
+    `cache_read_input_tokens` (Anthropic).
+
+    Args:
+        usage: The `usage` object or dict from a response, may be None.
+
+    Returns:
+        A dict with prompt, completion, cached and uncached token counts.
+    """
+    prompt = _field(usage, "prompt_tokens") or 0
+    completion = _field(usage, "completion_tokens") or 0
+    cached = (
+        _field(_field(usage, "prompt_tokens_details"), "cached_tokens")
+        or _field(usage, "prompt_cache_hit_tokens")
+        or _field(usage, "cache_read_input_tokens")
+        or 0
+    )
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": cached,
+        "uncached_tokens": max(prompt - cached, 0),
+    }
@@ -1,5 +1,9 @@
 import os
-from typing import Dict
+import openai
+import asyncio
+import weakref
+import threading
+from typing import Any, Dict, Tuple, Optional
 from dataclasses import dataclass
 
 
@@ -7,24 +11,35 @@ from dataclasses import dataclass
 class ProviderConfig:
     env_var: str
     base_url: str
+    # How the provider caches prompt prefixes: "explicit" needs cache_control
+    # breakpoints, "implicit" caches stable prefixes automatically, "none" doesn't cache
+    prompt_cache: str = "none"
 
 
 PROVIDERS: Dict[str, ProviderConfig] = {
-    "openrouter": ProviderConfig("OPENROUTER_API_KEY", "https://openrouter.ai/api/v1"),
-    "openai": ProviderConfig("OPENAI_API_KEY", "https://api.openai.com/v1"),
+    "openrouter": ProviderConfig(
+        "OPENROUTER_API_KEY", "https://openrouter.ai/api/v1", "explicit"
+    ),
+    "openai": ProviderConfig("OPENAI_API_KEY", "https://api.openai.com/v1", "implicit"),
     "google": ProviderConfig(
-        "GEMINI_API_KEY", "https://generativelanguage.googleapis.com/v1beta"
+        "GEMINI_API_KEY", "https://generativelanguage.googleapis.com/v1beta", "implicit"
     ),
     "google_vertex": ProviderConfig(
-        "GOOGLE_VERTEX_API_KEY", "https://generativelanguage.googleapis.com/v1beta"
+        "GOOGLE_VERTEX_API_KEY",
+        "https://generativelanguage.googleapis.com/v1beta",
+        "implicit",
+    ),
+    "anthropic": ProviderConfig(
+        "ANTHROPIC_API_KEY", "https://api.anthropic.com/v1", "explicit"
     ),
-    "anthropic": ProviderConfig("ANTHROPIC_API_KEY", "https://api.anthropic.com/v1"),
     "mistral": ProviderConfig("MISTRAL_API_KEY", "https://api.mistral.ai/v1"),
-    "deepseek": ProviderConfig("DEEPSEEK_API_KEY", "https://api.deepseek.com/v1"),
+    "deepseek": ProviderConfig(
+        "DEEPSEEK_API_KEY", "https://api.deepseek.com/v1", "implicit"
+    ),
     "cerebras": ProviderConfig("CEREBRAS_API_KEY", "https://api.cerebras.net/v1"),
-    "groq": ProviderConfig("GROQ_API_KEY", "https://api.groq.com/v1"),
+    "groq": ProviderConfig("GROQ_API_KEY", "https://api.groq.com/v1", "implicit"),
     "vercel": ProviderConfig("VERCEL_API_KEY", "https://api.vercel.ai/v1"),
-    "xai": ProviderConfig("XAI_API_KEY", "https://api.x.ai/v1"),
+    "xai": ProviderConfig("XAI_API_KEY", "https://api.x.ai/v1", "implicit"),
 }
 
 
@@ -58,3 +73,144 @@ def get(provider_name: str = "openrouter") -> tuple[str, str]:
         )
 
     return api_key, config.base_url
+
+
+@dataclass(frozen=True)
+class ClientOptions:
+    """
+    Connection pool and timeout settings for the shared API clients.
+
+    Attributes:
+        max_connections: Maximum open connections per client.
+        max_keepalive_connections: Idle connections kept open for reuse.
+        keepalive_expiry: Seconds an idle connection is kept open.
+        timeout: Seconds to wait for a response (read, write and pool).
+        connect_timeout: Seconds to wait for a connection (TCP and TLS).
+        http2: Negotiate HTTP/2, which needs the `h2` package.
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    timeout: float = 600.0
+    connect_timeout: float = 10.0
+    http2: bool = False
+
+    def httpx_kwargs(self) -> Dict[str, Any]:
+        limits_type = type(openai.DEFAULT_CONNECTION_LIMITS)
+        return {
+            "limits": limits_type(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": openai.Timeout(self.timeout, connect=self.connect_timeout),
+            "http2": self.http2,
+        }
+
+
+_client_options = ClientOptions()
+_clients: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+# Async connections belong to the event loop they were opened on
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def configure_clients(options: ClientOptions):
+    """
+    Set the pool and timeout settings used for clients created from now on.
+
+    Clients already in the cache are closed and dropped so the next
+    `get_client` call picks up the new settings.
+
+    Args:
+        options: The settings to use.
+    """
+    global _client_options
+    _client_options = options
+    clear_clients()
+
+
+def get_client(base_url: str = None, api_key: str = None):
+    """
+    Return the process-wide `openai.OpenAI` client for a provider endpoint.
+
+    Clients are cached by `(base_url, api_key)` and are thread-safe, so every
+    agent talking to the same endpoint shares one connection pool and reuses
+    its kept-alive TCP and TLS connections instead of handshaking again.
+
+    Args:
+        base_url: The provider's base URL.
+        api_key: The API key for the provider.
+
+    Returns:
+        The shared client.
+    """
+    key = (base_url, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = openai.OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                # Retries are handled by the agent, which honors rate limit headers
+                max_retries=0,
+                http_client=openai.DefaultHttpxClient(**_client_options.httpx_kwargs()),
+            )
+            _clients[key] = client
+        return client
+
+
+def get_async_client(base_url: str = None, api_key: str = None):
+    """
+    Return an `openai.AsyncOpenAI` client for a provider endpoint.
+
+    Async connections cannot outlive the event loop that opened them, so
+    clients are shared per running loop. Outside a running loop a new,
+    unshared client is returned.
+
+    Args:
+        base_url: The provider's base URL.
+        api_key: The API key for the provider.
+
+    Returns:
+        The client.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    def create():
+        return openai.AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(
+                **_client_options.httpx_kwargs()
+            ),
+        )
+
+    if loop is None:
+        return create()
+
+    key = (base_url, api_key)
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = create()
+        return client
+
+
+def clear_clients():
+    """Close and forget every cached client."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _async_clients.clear()
+    # Async clients are just dropped, closing them needs their event loop
+    for client in clients:
+        close = getattr(client, "close", None)
+        if close:
+            close()
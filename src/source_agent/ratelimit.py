@@ -0,0 +1,230 @@
+import re
+import time
+import threading
+import email.utils
+from typing import Any, Dict, Mapping, Optional
+
+
+# Status codes worth retrying: timeout, conflict, rate limit and server errors
+TRANSIENT_STATUS_CODES = frozenset({408, 409, 429})
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate limit reset value into seconds.
+
+    Accepts plain seconds ("1.5") and Go-style durations ("6m0s", "20ms").
+
+    Args:
+        value: The header value, may be None.
+
+    Returns:
+        The duration in seconds, or None if it can't be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+
+def retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Read how long the server asked us to wait before retrying.
+
+    Args:
+        headers: Response headers, may be None.
+
+    Returns:
+        Seconds to wait, from `retry-after-ms` or `retry-after` (seconds or an
+        HTTP date), or None if neither is present.
+    """
+    if not headers:
+        return None
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return max(float(milliseconds) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+def is_transient(error: Exception) -> bool:
+    """Return True for API errors that may succeed if the request is repeated."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return False
+    return status in TRANSIENT_STATUS_CODES or status >= 500
+
+
+class TokenBucket:
+    """
+    A token bucket that hands out reservations instead of refusing.
+
+    `reserve` always succeeds but may drive the balance negative; the caller
+    then waits until the bucket would have refilled that far. Concurrent
+    callers therefore queue up at the refill rate instead of all sending at
+    once and failing together.
+    """
+
+    def __init__(self, capacity: float = None, refill_per_second: float = None):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity or 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity and self.refill_per_second:
+            elapsed = now - self.updated
+            self.tokens = min(
+                self.capacity, self.tokens + elapsed * self.refill_per_second
+            )
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` tokens and return the seconds to wait before using them."""
+        self._refill(now)
+        if not self.capacity or not self.refill_per_second:
+            return 0.0  # Limit not known yet
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_second
+
+    def update(self, limit: float, remaining: float, reset: Optional[float], now):
+        """
+        Sync the bucket with the limit the server reported.
+
+        The refill rate is what it takes to get from `remaining` back to
+        `limit` within `reset` seconds, which works for per-minute and
+        per-day windows alike.
+        """
+        self._refill(now)
+        known = bool(self.capacity)
+        if not self.refill_per_second:
+            # No configured rate yet, assume a one minute window
+            self.refill_per_second = limit / 60
+        if reset and limit > remaining:
+            self.refill_per_second = (limit - remaining) / reset
+        self.capacity = limit
+        # Never hand back tokens that are already reserved by waiting callers
+        self.tokens = min(self.tokens, remaining) if known else remaining
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one provider.
+
+    Limits may be configured up front and are kept in line with the provider's
+    `x-ratelimit-*` response headers. A `Retry-After` blocks every caller
+    sharing the limiter, not just the one that got the 429. Thread-safe.
+    """
+
+    def __init__(
+        self, requests_per_minute: float = None, tokens_per_minute: float = None
+    ):
+        self.requests = TokenBucket(
+            requests_per_minute, requests_per_minute and requests_per_minute / 60
+        )
+        self.tokens = TokenBucket(
+            tokens_per_minute, tokens_per_minute and tokens_per_minute / 60
+        )
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def tracks_tokens(self) -> bool:
+        """Whether a tokens-per-minute limit is known, so requests need a size."""
+        return bool(self.tokens.capacity)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve capacity for one request of about `tokens` tokens.
+
+        Returns:
+            Seconds the caller should wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now) if tokens else 0.0,
+            )
+            return max(wait, self.blocked_until - now)
+
+    def block(self, seconds: float):
+        """Hold every request for `seconds`, e.g. after a `Retry-After`."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update(self, headers: Optional[Mapping[str, str]]):
+        """Feed the `x-ratelimit-*` headers of a response into the buckets."""
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                try:
+                    limit = float(headers.get(f"x-ratelimit-limit-{kind}"))
+                    remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+                except (TypeError, ValueError):
+                    continue
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                bucket.update(limit, remaining, reset, now)
+
+
+_limiters: Dict[Any, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(key: Any) -> RateLimiter:
+    """
+    Return the process-wide limiter for a provider endpoint.
+
+    Args:
+        key: Identifies the provider, usually its base URL.
+
+    Returns:
+        The shared limiter, created without limits on first use.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter()
+        return limiter
+
+
+def configure_limiter(
+    key: Any, requests_per_minute: float = None, tokens_per_minute: float = None
+) -> RateLimiter:
+    """Set known limits for a provider endpoint up front, replacing its limiter."""
+    with _limiters_lock:
+        limiter = _limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return limiter
+
+
+def clear_limiters():
+    """Forget every limiter and what it learned from response headers."""
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,226 @@
+import os
+import ast
+import json
+import hashlib
+import pathlib
+import tempfile
+from .paths import cache_dir
+from typing import Any, Dict, List, Tuple, Optional
+from .ignore import load_ignore
+from .search import PRUNE_DIRS, walk
+from .context import CHARS_PER_TOKEN
+from collections import Counter
+
+
+BUDGET_TOKENS = 2_000
+MAX_FILES = 5_000
+# Directories that are never worth mapping, on top of .gitignore
+SKIP_DIRS = PRUNE_DIRS | {
+    "dist",
+    "build",
+}
+# Files that tell the agent what the project is, ranked first
+ENTRY_FILES = {"README.md", "pyproject.toml", "setup.py", "AGENTS.md", "__main__.py"}
+# Bump when the cached outline format changes
+CACHE_VERSION = 1
+HEADER = "# Repository map (top-level symbols, most referenced files first)"
+
+
+def outline_python(source: str) -> Tuple[List[str], List[str]]:
+    """
+    Outline a Python module.
+
+    Returns:
+        The top-level symbols (`class Name`, `def name(args)`) and the module
+        names the file imports.
+    """
+    tree = ast.parse(source)
+    symbols, imports = [], []
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name.startswith("_") and not node.name.startswith("__"):
+                continue  # Private helpers aren't worth the budget
+        if isinstance(node, ast.ClassDef):
+            symbols.append(f"class {node.name}")
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            args = [a.arg for a in node.args.posonlyargs + node.args.args]
+            if node.args.vararg:
+                args.append(f"*{node.args.vararg.arg}")
+            symbols.append(f"def {node.name}({', '.join(args)})")
+        elif isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            # Relative imports are resolved against the file's package later;
+            # a name may be a submodule, so `from a import b` counts `a.b` too
+            base = "." * node.level + (node.module or "")
+            sep = "." if node.module else ""
+            imports.append(base)
+            imports.extend(f"{base}{sep}{alias.name}" for alias in node.names)
+    return symbols, imports
+
+
+def _module_name(path: str) -> str:
+    # src/pkg/mod.py -> pkg.mod
+    parts = path[: -len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    if parts and parts[0] == "src":
+        parts = parts[1:]
+    return ".".join(parts)
+
+
+def _resolve(module: str, importer: str) -> str:
+    # Make a relative import absolute, from the path of the importing file
+    if not module.startswith("."):
+        return module
+    level = len(module) - len(module.lstrip("."))
+    package = _module_name(importer).split(".")
+    if not importer.endswith("__init__.py"):
+        package = package[:-1]
+    base = package[: len(package) - (level - 1)] if level > 1 else package
+    rest = module.lstrip(".")
+    return ".".join(base + ([rest] if rest else []))
+
+
+class RepoMap:
+    """
+    A compact, ranked outline of a workspace for the system prompt.
+
+    Lists the workspace's files with the top-level classes and functions of
+    its Python modules, so the agent can start working instead of spending
+    its first steps on `file_list_tool` and `file_search_tool`. Files are
+    ranked by how many other files import them (entry files like the README
+    first, tests last) and the outline is cut to `budget_tokens`.
+
+    File outlines are cached on disk and only rebuilt for files whose mtime
+    or size changed.
+
+    Args:
+        root: The workspace directory.
+        budget_tokens: Maximum estimated size of the rendered map.
+        cache_path: Outline cache file, defaults to one per workspace under
+            `~/.cache/source-agent/repomap`.
+    """
+
+    def __init__(
+        self,
+        root: pathlib.Path = ".",
+        budget_tokens: int = None,
+        cache_path: Optional[pathlib.Path] = None,
+    ):
+        self.root = pathlib.Path(root).resolve()
+        self.budget_tokens = budget_tokens or BUDGET_TOKENS
+        key = hashlib.sha256(str(self.root).encode("utf-8")).hexdigest()[:16]
+        self.cache_path = (
+            pathlib.Path(cache_path)
+            if cache_path
+            else cache_dir("repomap", f"{key}.json")
+        )
+
+    def files(self) -> List[str]:
+        """Relative paths of every mapped file, skipping ignored directories."""
+        rules = load_ignore(self.root)
+        found = []
+        for path in walk(str(self.root), prune=SKIP_DIRS, ignore=rules, hidden=False):
+            found.append(path)
+            if len(found) >= MAX_FILES:
+                break
+        return found
+
+    def _load_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+            return {}
+        return cache.get("files", {})
+
+    def _save_cache(self, entries: Dict[str, Any]):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": entries}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            pass  # The map still works, it's just rebuilt next time
+
+    def outlines(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return `{path: {"symbols": [...], "imports": [...]}}` for every file.
+
+        Only files whose mtime or size changed since the last call are read.
+        """
+        cached = self._load_cache()
+        entries, changed = {}, False
+        for path in self.files():
+            try:
+                stat = (self.root / path).stat()
+            except OSError:
+                continue
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            entry = cached.get(path)
+            if entry is None or entry["stamp"] != stamp:
+                entry = {"stamp": stamp, "symbols": [], "imports": []}
+                if path.endswith(".py"):
+                    try:
+                        source = (self.root / path).read_text(encoding="utf-8")
+                        entry["symbols"], entry["imports"] = outline_python(source)
+                    except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+                        pass
+                changed = True
+            entries[path] = entry
+        if changed or len(entries) != len(cached):
+            self._save_cache(entries)
+        return entries
+
+    def rank(self, entries: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Order paths by importance: entry files, then most imported modules."""
+        modules = {_module_name(p): p for p in entries if p.endswith(".py")}
+        references = Counter()
+        for path, entry in entries.items():
+            for module in entry["imports"]:
+                target = modules.get(_resolve(module, path))
+                if target and target != path:
+                    references[target] += 1
+
+        def score(path):
+            name = path.rsplit("/", 1)[-1]
+            is_test = path.startswith(("tests/", "test/")) or name.startswith("test_")
+            return (
+                name not in ENTRY_FILES,
+                is_test,
+                -references[path],
+                -len(entries[path]["symbols"]),
+                path.count("/"),
+                path,
+            )
+
+        return sorted(entries, key=score)
+
+    def render(self) -> str:
+        """Render the map, cut down to the token budget."""
+        entries = self.outlines()
+        budget_chars = self.budget_tokens * CHARS_PER_TOKEN
+        used = len(HEADER) + 1
+        lines: Dict[str, str] = {}
+
+        # Highest ranked first, with their outline if it fits, else just the name
+        for path in self.rank(entries):
+            symbols = entries[path]["symbols"]
+            for line in ([f"{path}: {', '.join(symbols)}"] if symbols else []) + [path]:
+                if used + len(line) + 1 <= budget_chars:
+                    lines[path] = line
+                    used += len(line) + 1
+                    break
+        output = [HEADER, *(lines[path] for path in sorted(lines))]
+        if len(lines) < len(entries):
+            output.append(f"... {len(entries) - len(lines)} more files not shown")
+        return "\n".join(output)
+
+
+def build_repo_map(root: pathlib.Path = ".", budget_tokens: int = None) -> str:
+    """Render the repository map of `root`; see `RepoMap`."""
+    return RepoMap(root, budget_tokens).render()
@@ -0,0 +1,510 @@
+import os
+import re
+import mmap
+import atexit
+import fnmatch
+import threading
+import multiprocessing
+from typing import Any, Set, List, Tuple, Callable, Iterable, Iterator, Optional
+from itertools import count, islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Directories searches never descend into, on top of ignore rules
+PRUNE_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        ".venv",
+        "venv",
+        "__pycache__",
+        "node_modules",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        ".tox",
+    }
+)
+# The first files of a search are scanned in-process: starting worker
+# processes costs more than it saves on small trees
+PARALLEL_MIN_FILES = 256
+# Files per work unit sent to a worker process
+CHUNK_FILES = 64
+MAX_WORKERS = 8
+# Files with a NUL byte in their first `SNIFF_BYTES` are binary and skipped
+SNIFF_BYTES = 8192
+# Files from this size on are memory-mapped instead of read
+MMAP_MIN_BYTES = 1 << 20
+
+# (relative path, line number, line, is a match rather than context)
+Line = Tuple[str, int, str, bool]
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10
+    import sre_parse
+
+
+def use_workers(count: int, parallel_min_files: int = None) -> bool:
+    """Whether `count` files are worth handing to worker processes."""
+    threshold = PARALLEL_MIN_FILES if parallel_min_files is None else parallel_min_files
+    return count >= max(threshold, 2) and (os.cpu_count() or 1) > 1
+
+
+def walk(
+    root: str,
+    prune: Iterable[str] = PRUNE_DIRS,
+    ignore: Any = None,
+    hidden: bool = True,
+    start: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Yield the relative paths of every file under `root`, in a stable order.
+
+    Built on `os.scandir`, so file types come from the directory listing
+    instead of one `stat` per path, and directories are pruned before they
+    are descended into rather than filtered file by file afterwards.
+    Symlinked directories are not followed. Each directory yields its files
+    in name order, then the files of its subdirectories in name order.
+
+    Args:
+        root: The directory to walk.
+        prune: Directory names that are never entered.
+        ignore: An `ignore.IgnoreRules` (anything with `match_file`) matched
+            against paths relative to `root`; directories are matched with a
+            trailing slash.
+        hidden: Include dotfiles and dot-directories.
+        start: Resume the walk at this relative path: everything yielded
+            before it is skipped without listing the directories it's in.
+    """
+    prune = frozenset(prune)
+    # (directory, the rest of `start` below it or None)
+    stack: List[Tuple[str, Optional[str]]] = [("", start)]
+    while stack:
+        rel_dir, resume = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, rel_dir) if rel_dir else root) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue  # Unreadable or vanished, like rglob
+        # With `start` in a subdirectory every file here was already yielded
+        resume_dir, _, resume_rest = (resume or "").partition("/")
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if not hidden and name.startswith("."):
+                continue
+            path = f"{rel_dir}{name}"
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+            if is_dir:
+                if resume_rest and name < resume_dir:
+                    continue
+                if name in prune or (ignore and ignore.match_file(f"{path}/")):
+                    continue
+                below = resume_rest if resume_rest and name == resume_dir else None
+                subdirs.append((f"{path}/", below))
+            elif is_file:
+                if resume and (resume_rest or name < resume):
+                    continue
+                if not (ignore and ignore.match_file(path)):
+                    yield path
+        stack.extend(reversed(subdirs))
+
+
+def name_matcher(name: str) -> Callable[[str], bool]:
+    """
+    Return a predicate for relative paths matching the glob `name`.
+
+    Like `Path.rglob`, a pattern without a slash is matched against the file
+    name and one with a slash against the trailing path components, where
+    `**` stands for zero or more directories.
+    """
+    if "/" not in name:
+        regex = re.compile(fnmatch.translate(name)).match
+        return lambda path: regex(path.rpartition("/")[2]) is not None
+    # None for `**`; a leading one is implied, the pattern may start anywhere
+    segments = [None]
+    for part in name.split("/"):
+        if part == "**":
+            if segments[-1] is not None:
+                segments.append(None)
+        elif part:
+            segments.append(re.compile(fnmatch.translate(part)).match)
+    end = len(segments)
+
+    def expand(states: Set[int]) -> Set[int]:
+        # A `**` may also match no directory at all
+        for i in sorted(states):
+            while i < end and segments[i] is None:
+                states.add(i + 1)
+                i += 1
+        return states
+
+    def match(path: str) -> bool:
+        components = path.split("/")
+        states = expand({0})
+        for n, component in enumerate(components, 1):
+            advanced = set()
+            for i in states:
+                if i == end:
+                    continue
+                if segments[i] is None:
+                    if n < len(components):  # `**` only spans directories
+                        advanced.add(i)
+                elif segments[i](component):
+                    advanced.add(i + 1)
+            if not advanced:
+                return False
+            states = expand(advanced)
+        return end in states
+
+    return match
+
+
+def line_matcher(
+    pattern: str, regex: bool = False, ignore_case: bool = False
+) -> Callable[[str], Any]:
+    """Return a predicate for lines containing `pattern` (text or regex)."""
+    if regex:
+        return re.compile(pattern, re.IGNORECASE if ignore_case else 0).search
+    if ignore_case:
+        lowered = pattern.lower()
+        return lambda line: lowered in line.lower()
+    return lambda line: pattern in line
+
+
+def _literals(parsed) -> List[str]:
+    # Literal runs every match of a parsed regex must contain
+    literals, run = [], []
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            literals.append("".join(run))
+            run = []
+        if op is sre_parse.SUBPATTERN:
+            literals.extend(_literals(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            literals.extend(_literals(av[2]))
+    if run:
+        literals.append("".join(run))
+    return literals
+
+
+def required_literals(
+    pattern: str, regex: bool = False, ignore_case: bool = False
+) -> Tuple[List[str], bool]:
+    """
+    Return the literal strings every line matching a query must contain.
+
+    For a regex these are its literal runs outside alternations and
+    optional parts, possibly none.
+
+    Returns:
+        The literals, and whether they may match case-insensitively.
+    """
+    if not regex:
+        return [pattern], ignore_case
+    parsed = sre_parse.parse(pattern, re.IGNORECASE if ignore_case else 0)
+    fold = ignore_case or bool(parsed.state.flags & re.IGNORECASE) or "(?" in pattern
+    return _literals(parsed), fold
+
+
+def literal_finder(
+    pattern: str, regex: bool = False, ignore_case: bool = False
+) -> Optional[Callable[[Any, int], int]]:
+    """
+    Return `find(buffer, start)`: the offset of the next possible match in a
+    file's bytes, or -1.
+
+    Looks for the longest required literal with `bytes.find`, or a compiled
+    bytes regex when it must match case-insensitively. Returns None when
+    the query has no literal to look for (or only a non-ASCII one that must
+    be case-folded), and every line has to be checked.
+    """
+    literals, fold = required_literals(pattern, regex, ignore_case)
+    needle = max(literals, key=len, default="").encode("utf-8", errors="ignore")
+    if not needle or (fold and not needle.isascii()):
+        return None
+    if not fold:
+        return lambda buffer, start: buffer.find(needle, start)
+    search = re.compile(re.escape(needle), re.IGNORECASE).search
+
+    def find(buffer, start: int) -> int:
+        match = search(buffer, start)
+        return match.start() if match else -1
+
+    return find
+
+
+def is_binary(head: bytes) -> bool:
+    """Whether the first bytes of a file look binary (contain a NUL byte)."""
+    return b"\0" in head
+
+
+def _decode(data: bytes) -> str:
+    line = data.decode("utf-8", errors="ignore")
+    return line[:-1] if line.endswith("\r") else line
+
+
+def _count_lines(buffer, start: int, end: int) -> int:
+    if isinstance(buffer, bytes):
+        return buffer.count(b"\n", start, end)
+    return buffer[start:end].count(b"\n")  # mmap has no count()
+
+
+def _find_hits(buffer, matcher, finder, after: int):
+    # Yield (number, start, end) of matching lines, numbering only the hits
+    size, position, number, line_start = len(buffer), 0, 1, 0
+    while position < size:
+        found = finder(buffer, position) if finder else position
+        if found < 0:
+            return
+        start = buffer.rfind(b"\n", line_start, found) + 1 or line_start
+        number += _count_lines(buffer, line_start, start)
+        line_start = start
+        end = buffer.find(b"\n", found)
+        end = size if end < 0 else end
+        if number > after and matcher(_decode(buffer[start:end])):
+            yield number, start, end
+        position = end + 1
+
+
+def _line_window(buffer, number: int, start: int, end: int, context: int):
+    # (number, start, end) of the lines around a hit, in order
+    lines = [(number, start, end)]
+    while len(lines) <= context and lines[0][1] > 0:
+        first = lines[0][1]
+        previous = buffer.rfind(b"\n", 0, first - 1) + 1
+        lines.insert(0, (lines[0][0] - 1, previous, first - 1))
+    while lines[-1][0] < number + context and lines[-1][2] + 1 < len(buffer):
+        last = lines[-1][2]
+        following = buffer.find(b"\n", last + 1)
+        following = len(buffer) if following < 0 else following
+        lines.append((lines[-1][0] + 1, last + 1, following))
+    return lines
+
+
+def scan_file(
+    path: str,
+    matcher: Callable[[str], Any],
+    rel: str,
+    context: int = 0,
+    max_matches: int = 0,
+    after: int = 0,
+    finder: Optional[Callable[[Any, int], int]] = None,
+) -> List[Line]:
+    """
+    Return the matching lines of one file; unreadable and binary files have none.
+
+    The file is searched as bytes: read whole, or memory-mapped from
+    `MMAP_MIN_BYTES` on. With a `finder`, only lines containing its
+    literal are decoded and checked with `matcher`, and lines are only
+    counted up to those hits; without one, the file is decoded once and
+    every line is checked. Lines end at `\\n`, like in grep.
+
+    Args:
+        path: The file to read.
+        matcher: Predicate for matching lines, see `line_matcher`.
+        rel: The path to report.
+        context: Lines of context around each match.
+        max_matches: Stop after this many matches, 0 for no limit.
+        after: Only look for matches after this line number.
+        finder: Locates possible matches, see `literal_finder`.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            if is_binary(head):
+                return []
+            if (
+                len(head) == SNIFF_BYTES
+                and os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES
+            ):
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = head + f.read()
+    except (OSError, ValueError):
+        return []
+
+    try:
+        if finder is None:
+            # Nothing to look for: every line has to be checked anyway
+            text = _decode(buffer[:])
+            lines = text.replace("\r\n", "\n").split("\n")
+            if lines and not lines[-1]:
+                lines.pop()  # The final newline doesn't start a line
+            spans = None
+            hits = (
+                number
+                for number, line in enumerate(lines[after:], after + 1)
+                if matcher(line)
+            )
+            hits = list(islice(hits, max_matches or None))
+        else:
+            spans = {}
+            for number, start, end in _find_hits(buffer, matcher, finder, after):
+                spans[number] = (start, end)
+                if len(spans) == max_matches:
+                    break
+            hits = list(spans)
+
+        found, shown, output = set(hits), 0, []
+        for number in hits:
+            if spans is None:
+                first = max(1, number - context)
+                window = zip(count(first), lines[first - 1 : number + context])
+            else:
+                window = (
+                    (n, _decode(buffer[start:end]))
+                    for n, start, end in _line_window(
+                        buffer, number, *spans[number], context
+                    )
+                )
+            for n, line in window:
+                if n > shown:
+                    output.append((rel, n, line.strip(), n in found))
+                    shown = n
+        return output
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+
+def _scan_chunk(
+    root: str,
+    paths: List[str],
+    pattern: str,
+    regex: bool,
+    ignore_case: bool,
+    context: int,
+    max_per_file: int,
+    resume: Optional[Tuple[str, int]],
+) -> List[Line]:
+    # Runs in a worker process, so takes only picklable arguments
+    matcher = line_matcher(pattern, regex, ignore_case)
+    finder = literal_finder(pattern, regex, ignore_case)
+    lines = []
+    for rel in paths:
+        after = resume[1] if resume and resume[0] == rel else 0
+        path = os.path.join(root, rel)
+        lines.extend(
+            scan_file(path, matcher, rel, context, max_per_file, after, finder)
+        )
+    return lines
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Tuple[ProcessPoolExecutor, int]:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            # Tools run on threads, and forking a threaded process is unsafe
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            _pool_workers = min(MAX_WORKERS, os.cpu_count() or 1)
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _pool, _pool_workers
+
+
+def shutdown_pool():
+    """Stop the shared worker processes; the next parallel scan restarts them."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+atexit.register(shutdown_pool)
+
+
+def scan(
+    root: str,
+    paths: Iterable[str],
+    pattern: str,
+    regex: bool = False,
+    ignore_case: bool = False,
+    context: int = 0,
+    max_per_file: int = 0,
+    resume: Optional[Tuple[str, int]] = None,
+    parallel_min_files: int = None,
+) -> Iterator[Line]:
+    """
+    Yield the lines of `paths` matching `pattern`, with optional context.
+
+    Paths are consumed lazily, so a caller that stops iterating also stops
+    the walk feeding it. After the first `parallel_min_files` paths, chunks
+    of `CHUNK_FILES` files are scanned by a shared pool of worker processes,
+    so regex matching isn't serialized on the GIL; only a few chunks are in
+    flight at once, and results always come back in the order of `paths`.
+
+    Args:
+        root: The directory `paths` are relative to.
+        paths: Files to scan, relative to `root`.
+        pattern: Text or regular expression to look for.
+        regex: Treat `pattern` as a regular expression.
+        ignore_case: Match case-insensitively.
+        context: Lines of context around each match.
+        max_per_file: Matches reported per file, 0 for no limit.
+        resume: `(path, line number)`: in that file, only look for matches
+            after that line.
+        parallel_min_files: Files scanned in-process before switching to
+            worker processes, defaults to `PARALLEL_MIN_FILES`.
+
+    Yields:
+        `(path, line number, line, is_match)`; `is_match` is False for context.
+    """
+    # Fail on a bad regex here rather than in every worker
+    matcher = line_matcher(pattern, regex, ignore_case)
+    finder = literal_finder(pattern, regex, ignore_case)
+    paths = iter(paths)
+    threshold = PARALLEL_MIN_FILES if parallel_min_files is None else parallel_min_files
+    parallel = (os.cpu_count() or 1) > 1
+    # The first files are scanned in-process, so searches that stop early
+    # never wait for worker processes
+    for rel in islice(paths, threshold) if parallel else paths:
+        after = resume[1] if resume and resume[0] == rel else 0
+        path = os.path.join(root, rel)
+        yield from scan_file(path, matcher, rel, context, max_per_file, after, finder)
+    if parallel:
+        args = (pattern, regex, ignore_case, context, max_per_file, resume)
+        for lines in map_chunks(_scan_chunk, root, paths, *args):
+            yield from lines
+
+
+def map_chunks(func: Callable, root: str, paths: Iterable[str], *args) -> Iterator[Any]:
+    """
+    Run `func(root, chunk, *args)` on the worker pool for chunks of `paths`.
+
+    `func` must be a module-level function. Results are yielded in chunk
+    order, with at most two chunks per worker in flight; closing the
+    iterator cancels the chunks not started yet.
+    """
+    paths = iter(paths)
+    pending = deque()
+    try:
+        for chunk in iter(lambda: list(islice(paths, CHUNK_FILES)), []):
+            pool, workers = _get_pool()
+            pending.append(pool.submit(func, root, chunk, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
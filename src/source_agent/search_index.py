@@ -0,0 +1,343 @@
+import os
+import json
+import mmap
+import time
+import array
+import bisect
+import struct
+import hashlib
+import pathlib
+import tempfile
+import threading
+from . import search
+from .paths import cache_dir
+from typing import Any, Dict, List, Tuple, Iterable, Iterator, Optional
+from .ignore import load_ignore
+
+
+MAGIC = b"SAIX"
+VERSION = 1
+# Larger files aren't indexed, searches always scan them
+MAX_FILE_BYTES = 1_000_000
+# magic, version, file count, trigram count, file table bytes
+_HEADER = struct.Struct("<4sIIII")
+
+
+def trigrams(data: bytes) -> array.array:
+    """Return the sorted, distinct trigrams of `data` (ASCII-lowercased) as ints."""
+    data = data.lower()
+    keys = {
+        a << 16 | b << 8 | c for a, b, c in zip(data, data[1:], data[2:], strict=False)
+    }
+    return array.array("I", sorted(keys))
+
+
+def query_trigrams(pattern: str, regex: bool = False, ignore_case: bool = False):
+    """
+    Return the trigrams a file must contain to match a query.
+
+    Regex queries contribute the literal runs every match must contain
+    (outside alternations and optional parts). Case-insensitive queries
+    drop trigrams with non-ASCII bytes, since only ASCII is folded in the
+    index. An empty set means the index can't narrow the query.
+    """
+    literals, fold = search.required_literals(pattern, regex, ignore_case)
+    required = set()
+    for literal in literals:
+        data = literal.encode("utf-8", errors="ignore")
+        for start in range(len(data) - 2):
+            gram = data[start : start + 3]
+            if fold and not gram.isascii():
+                continue
+            required.update(trigrams(gram))
+    return required
+
+
+def _index_file(path: str) -> Tuple[bool, bytes]:
+    # (indexed, trigrams as array bytes)
+    try:
+        if os.path.getsize(path) > MAX_FILE_BYTES:
+            return False, b""
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return False, b""
+    if search.is_binary(data[: search.SNIFF_BYTES]):
+        return True, b""  # Searches skip binary files, so they never match
+    return True, trigrams(data).tobytes()
+
+
+def _index_chunk(root: str, paths: List[str]) -> List[Tuple[bool, bytes]]:
+    return [_index_file(os.path.join(root, rel)) for rel in paths]
+
+
+def _stamp(stat: os.stat_result) -> List[int]:
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+class TrigramIndex:
+    """
+    A persistent trigram index of a workspace, to narrow content searches.
+
+    For every file the index keeps the set of three-byte sequences it
+    contains; a file can only match a query if it contains every trigram of
+    the query's literal parts, so `candidates` skips reading the rest.
+    Files changed since they were indexed (by mtime, size or inode), files
+    added since, and files too large to index are always kept, so a stale
+    index makes searches slower, never wrong.
+
+    The index is a single file of packed uint32 arrays that is memory-mapped
+    on load: a sorted trigram table with posting lists for queries, and the
+    per-file trigram lists that `update` copies for unchanged files so only
+    changed files are re-read.
+
+    Args:
+        root: The workspace directory.
+        path: Index file, defaults to one per workspace under
+            `~/.cache/source-agent/index`.
+    """
+
+    def __init__(self, root: pathlib.Path = ".", path: Optional[pathlib.Path] = None):
+        self.root = pathlib.Path(root).resolve()
+        key = hashlib.sha256(str(self.root).encode("utf-8")).hexdigest()[:16]
+        self.path = pathlib.Path(path) if path else cache_dir("index", f"{key}.idx")
+        self.close()
+
+    def files_to_index(self) -> List[str]:
+        """Relative paths of every file the index should cover."""
+        return list(search.walk(str(self.root), ignore=load_ignore(self.root)))
+
+    def load(self) -> bool:
+        """Map the index file; returns False if there is no usable index."""
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            magic, version, n_files, n_keys, table_len = _HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("unknown index format")
+            offset = _HEADER.size
+            files = json.loads(mapped[offset : offset + table_len])
+            offset += table_len + (-table_len % 4)
+
+            view = memoryview(mapped)[offset:].cast("I")
+            file_offsets, view = view[: n_files + 1], view[n_files + 1 :]
+            file_trigrams, view = view[: file_offsets[-1]], view[file_offsets[-1] :]
+            keys, view = view[:n_keys], view[n_keys:]
+            key_offsets, postings = view[: n_keys + 1], view[n_keys + 1 :]
+            if len(postings) != key_offsets[-1] or len(files) != n_files:
+                raise ValueError("truncated index")
+        except (ValueError, TypeError, IndexError, struct.error):
+            return False
+
+        self.file_offsets, self.file_trigrams = file_offsets, file_trigrams
+        self.keys, self.key_offsets, self.postings = keys, key_offsets, postings
+        self.files = files
+        self.ids = {entry[0]: i for i, entry in enumerate(files)}
+        self._mmap = mapped
+        return True
+
+    def close(self):
+        # The map is closed once the last view of it is dropped
+        self._mmap = None
+        self.file_offsets = self.file_trigrams = None
+        self.keys = self.key_offsets = self.postings = None
+        # [path, mtime_ns, size, inode, indexed] per file id
+        self.files: List[List[Any]] = []
+        self.ids: Dict[str, int] = {}
+
+    def update(self, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index up to date with the workspace and write it.
+
+        Only files that are new, or whose mtime, size or inode changed, are
+        read; everything else is copied from the existing index.
+
+        Args:
+            rebuild: Ignore the existing index and re-read every file.
+
+        Returns:
+            Counts of indexed, updated and removed files, distinct trigrams,
+            the index size in bytes and the time taken.
+        """
+        started = time.perf_counter()
+        if rebuild:
+            self.close()
+        elif self._mmap is None:
+            self.load()
+
+        entries, data, stale = [], [], []
+        for rel in self.files_to_index():
+            try:
+                stamp = _stamp(os.stat(self.root / rel))
+            except OSError:
+                continue
+            old = self.ids.get(rel)
+            if old is not None and self.files[old][1:4] == stamp:
+                entries.append(self.files[old])
+                start, end = self.file_offsets[old], self.file_offsets[old + 1]
+                data.append(self.file_trigrams[start:end].tobytes())
+            else:
+                entries.append([rel, *stamp, False])
+                data.append(b"")
+                stale.append(len(entries) - 1)
+
+        paths = [entries[i][0] for i in stale]
+        if search.use_workers(len(paths)):
+            chunks = search.map_chunks(_index_chunk, str(self.root), paths)
+            results = [result for chunk in chunks for result in chunk]
+        else:
+            results = _index_chunk(str(self.root), paths)
+        for i, (indexed, grams) in zip(stale, results, strict=True):
+            entries[i][4], data[i] = indexed, grams
+
+        removed = len(set(self.ids) - {entry[0] for entry in entries})
+        if stale or removed or self._mmap is None:
+            self._write(entries, data)
+            self.load()
+        return {
+            "files": len(entries),
+            "updated": len(stale),
+            "removed": removed,
+            "trigrams": len(self.keys),
+            "bytes": self.path.stat().st_size,
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+
+    def _write(self, entries: List[List[Any]], data: List[bytes]):
+        file_offsets = array.array("I", [0])
+        postings: Dict[int, array.array] = {}
+        for file_id, grams in enumerate(data):
+            keys = array.array("I")
+            keys.frombytes(grams)
+            file_offsets.append(file_offsets[-1] + len(keys))
+            for key in keys:
+                posting = postings.get(key)
+                if posting is None:
+                    posting = postings[key] = array.array("I")
+                posting.append(file_id)
+
+        keys = array.array("I", sorted(postings))
+        key_offsets = array.array("I", [0])
+        for key in keys:
+            key_offsets.append(key_offsets[-1] + len(postings[key]))
+
+        table = json.dumps(entries, separators=(",", ":")).encode("utf-8")
+        table += b" " * (-len(table) % 4)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(
+                    _HEADER.pack(MAGIC, VERSION, len(entries), len(keys), len(table))
+                )
+                f.write(table)
+                f.write(file_offsets.tobytes())
+                f.writelines(data)
+                f.write(keys.tobytes())
+                f.write(key_offsets.tobytes())
+                for key in keys:
+                    f.write(postings[key].tobytes())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def lookup(self, key: int) -> memoryview:
+        """Return the ids of the files containing trigram `key`."""
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return self.keys[:0]
+        return self.postings[self.key_offsets[i] : self.key_offsets[i + 1]]
+
+    def candidates(
+        self,
+        paths: Iterable[str],
+        pattern: str,
+        regex: bool = False,
+        ignore_case: bool = False,
+        prefix: str = "",
+    ) -> List[str]:
+        """
+        Return the subset of `paths` that may contain a match, in order.
+
+        Args:
+            paths: Files to narrow down, relative to the index root after
+                `prefix` is prepended.
+            pattern: Text or regular expression that will be searched for.
+            regex: Treat `pattern` as a regular expression.
+            ignore_case: The search is case-insensitive.
+            prefix: Path of the searched directory relative to the index root,
+                with a trailing slash.
+        """
+        return list(self.filter(paths, pattern, regex, ignore_case, prefix))
+
+    def filter(
+        self,
+        paths: Iterable[str],
+        pattern: str,
+        regex: bool = False,
+        ignore_case: bool = False,
+        prefix: str = "",
+    ) -> Iterator[str]:
+        """Lazily yield the `paths` that may contain a match, see `candidates`."""
+        required = query_trigrams(pattern, regex, ignore_case)
+        if not required or self._mmap is None:
+            yield from paths
+            return
+
+        # Intersect the shortest posting lists first
+        matched = None
+        for posting in sorted(map(self.lookup, required), key=len):
+            matched = set(posting) if matched is None else matched.intersection(posting)
+            if not matched:
+                break
+
+        for rel in paths:
+            file_id = self.ids.get(prefix + rel)
+            if file_id is None or file_id in matched or not self.files[file_id][4]:
+                yield rel
+                continue
+            try:  # Ruled out, unless it changed since it was indexed
+                stat = os.stat(os.path.join(self.root, prefix + rel))
+            except OSError:
+                continue
+            if _stamp(stat) != self.files[file_id][1:4]:
+                yield rel
+
+
+_indexes: Dict[str, Tuple[Tuple[int, int], TrigramIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(root: pathlib.Path = ".") -> Optional[TrigramIndex]:
+    """
+    Return the loaded index of `root`, or None if it was never built.
+
+    Loaded indexes are kept for the life of the process and only mapped
+    again when the index file is rewritten, so repeated searches only pay
+    for the lookups.
+    """
+    index = TrigramIndex(root)
+    try:
+        stat = index.path.stat()
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_ino)
+    with _indexes_lock:
+        cached = _indexes.get(str(index.path))
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if not index.load():
+            return None
+        _indexes[str(index.path)] = (stamp, index)
+        return index
+
+
+def clear_indexes():
+    """Forget every index loaded by `open_index`."""
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import uuid
+import pathlib
+import tempfile
+from .paths import cache_dir
+from typing import Any, Dict, List, Union, Optional
+from .context import message_to_dict
+
+
+CHECKPOINT_EVERY = 100
+
+# Journal record kinds
+MESSAGE = "message"
+EVENT = "event"
+
+
+def new_session_id() -> str:
+    """Return a sortable, unique session id like `20250101-120000-1a2b3c`."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def close_tool_calls(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Answer tool calls that never got a result, e.g. after a crash mid-step.
+
+    Providers reject a conversation with an unanswered tool call, so each one
+    gets an error result saying the session was interrupted. Runs over the
+    whole conversation, since a completed task also leaves its
+    `msg_complete_tool` call unanswered.
+    """
+    answered = {m.get("tool_call_id") for m in messages if m.get("role") == "tool"}
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if message.get("role") != "assistant" or not message.get("tool_calls"):
+            continue
+        missing = [
+            {
+                "role": "tool",
+                "tool_call_id": call["id"],
+                "name": call["function"]["name"],
+                "content": json.dumps(
+                    {"error": "Session interrupted before this tool call finished."}
+                ),
+            }
+            for call in message["tool_calls"]
+            if call["id"] not in answered
+        ]
+        end = index + 1
+        while end < len(messages) and messages[end].get("role") == "tool":
+            end += 1
+        messages[end:end] = missing
+    return messages
+
+
+class SessionJournal:
+    """
+    Append-only JSONL journal of a conversation, with compact checkpoints.
+
+    Every message added to the conversation (and every agent event) is
+    appended to `<directory>/<session_id>.jsonl` and flushed right away, so a
+    crash or Ctrl-C loses nothing. Every `checkpoint_every` records, and
+    whenever the conversation is rewritten (compaction, reset), the full
+    message list is written to `<session_id>.checkpoint.json` together with
+    the journal offset it covers. `load` reads the checkpoint and replays
+    only the records after it, so resuming takes about the same time however
+    long the session has run.
+
+    Args:
+        session_id: The session to write to (and resume), defaults to a new id.
+        directory: Where journals live, defaults to `~/.cache/source-agent/sessions`.
+        checkpoint_every: Records between automatic checkpoints.
+    """
+
+    def __init__(
+        self,
+        session_id: str = None,
+        directory: Optional[pathlib.Path] = None,
+        checkpoint_every: int = None,
+    ):
+        self.session_id = session_id or new_session_id()
+        self.directory = pathlib.Path(directory) if directory else cache_dir("sessions")
+        self.checkpoint_every = checkpoint_every or CHECKPOINT_EVERY
+        self.path = self.directory / f"{self.session_id}.jsonl"
+        self.checkpoint_path = self.directory / f"{self.session_id}.checkpoint.json"
+        # The conversation as journaled so far, written out by `checkpoint`
+        self.messages: List[Dict[str, Any]] = []
+        self._since_checkpoint = 0
+        self._file = None
+
+    @classmethod
+    def open(
+        cls, session: Union[str, pathlib.Path], directory: Optional[pathlib.Path] = None
+    ) -> "SessionJournal":
+        """
+        Open an existing session by id, or by the path of its `.jsonl` journal.
+
+        Raises:
+            FileNotFoundError: If there is no such session.
+        """
+        path = pathlib.Path(session)
+        if path.suffix == ".jsonl" and path.exists():
+            return cls(path.stem, path.parent)
+        journal = cls(str(session), directory)
+        if not journal.path.exists() and not journal.checkpoint_path.exists():
+            raise FileNotFoundError(f"No session '{session}' in {journal.directory}")
+        return journal
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Rebuild the conversation from the latest checkpoint and the journal tail.
+
+        A torn last line (from a crash mid-write) is ignored.
+
+        Returns:
+            The messages, or an empty list for a new session.
+        """
+        messages, offset = [], 0
+        if self.checkpoint_path.exists():
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            messages, offset = checkpoint["messages"], checkpoint["offset"]
+
+        records = 0
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    records += 1
+                    if record.get("kind") == MESSAGE:
+                        messages.append(record["message"])
+
+        self.messages = close_tool_calls(messages)
+        self._since_checkpoint = records
+        return list(self.messages)
+
+    def _write(self, record: Dict[str, Any]):
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+        record = {"ts": round(time.time(), 3), **record}
+        self._file.write(json.dumps(record, default=str).encode("utf-8") + b"\n")
+        self._file.flush()
+
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def append_message(self, message: Any):
+        """Journal a message added to the conversation."""
+        message = message_to_dict(message)
+        self.messages.append(message)
+        self._write({"kind": MESSAGE, "message": message})
+
+    def append_event(self, event_type: str, data: Dict[str, Any]):
+        """Journal an agent event; events are kept for inspection, not replayed."""
+        self._write({"kind": EVENT, "type": event_type, "data": data})
+
+    def checkpoint(self, messages: List[Any] = None):
+        """
+        Write the full conversation and the journal offset it covers.
+
+        Args:
+            messages: The conversation, when it was rewritten rather than
+                appended to. Defaults to the journaled messages.
+        """
+        if messages is not None:
+            self.messages = [message_to_dict(m) for m in messages]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        offset = self.path.stat().st_size if self.path.exists() else 0
+        data = json.dumps(
+            {"offset": offset, "messages": self.messages}, default=str
+        ).encode("utf-8")
+
+        # Write atomically so a crash never leaves a partial checkpoint
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+        self._since_checkpoint = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
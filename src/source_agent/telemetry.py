@@ -0,0 +1,209 @@
+import math
+import time
+import threading
+from typing import Any, Dict, List, Sequence
+
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Return the `pct`-th percentile of `values` using linear interpolation.
+
+    Args:
+        values: The samples, in any order.
+        pct: The percentile, between 0 and 100.
+
+    Returns:
+        The interpolated percentile, or 0.0 for an empty sequence.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(values: Sequence[float]) -> Dict[str, float]:
+    """Count, total and percentiles for a list of durations in seconds."""
+    summary = {"count": len(values), "total_seconds": round(sum(values), 4)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}_seconds"] = round(percentile(values, pct), 4)
+    return summary
+
+
+class LLMCallStats:
+    """Retry bookkeeping for a single `call_llm` invocation."""
+
+    def __init__(self):
+        self.attempts = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.throttle_seconds = 0.0
+        self.hedges = 0
+        self.failovers = 0
+
+    def merge(self, other: "LLMCallStats"):
+        """Add the attempts and waits of a request sent to a fallback provider."""
+        self.attempts += other.attempts
+        self.retries += other.retries
+        self.backoff_seconds += other.backoff_seconds
+        self.throttle_seconds += other.throttle_seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "backoff_seconds": round(self.backoff_seconds, 4),
+            "throttle_seconds": round(self.throttle_seconds, 4),
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+        }
+
+
+class RunTelemetry:
+    """
+    Collects timings and token counts over one `CodeAgent.run`.
+
+    Tool timings may be recorded from worker threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps = 0
+        self.llm_seconds: List[float] = []
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.throttle_seconds = 0.0
+        self.hedges = 0
+        self.failovers = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.tokens = {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+        }
+        # Tokens charged against a budget, estimated where usage wasn't reported
+        self.spent = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.tool_seconds: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        """Seconds since the run started."""
+        return time.perf_counter() - self.started
+
+    def record_step(self, step: int):
+        self.steps = max(self.steps, step)
+
+    def record_llm(
+        self,
+        seconds: float,
+        stats: LLMCallStats = None,
+        tokens: Dict[str, int] = None,
+        cache_hit: bool = False,
+    ):
+        """Record one completed LLM request."""
+        self.llm_seconds.append(seconds)
+        if stats:
+            self.retries += stats.retries
+            self.backoff_seconds += stats.backoff_seconds
+            self.throttle_seconds += stats.throttle_seconds
+            self.hedges += stats.hedges
+            self.failovers += stats.failovers
+        if cache_hit:
+            self.cache_hits += 1
+        for key in self.tokens:
+            self.tokens[key] += (tokens or {}).get(key, 0)
+
+    def record_spend(self, prompt_tokens: int, completion_tokens: int):
+        """Charge one completion against the run's budget."""
+        self.spent["prompt_tokens"] += prompt_tokens
+        self.spent["completion_tokens"] += completion_tokens
+
+    def record_failure(self, stats: LLMCallStats = None):
+        """Record an LLM request that failed after exhausting its retries."""
+        self.failures += 1
+        if stats:
+            self.retries += stats.retries
+            self.backoff_seconds += stats.backoff_seconds
+            self.throttle_seconds += stats.throttle_seconds
+            self.hedges += stats.hedges
+            self.failovers += stats.failovers
+
+    def record_tool(self, name: str, seconds: float):
+        """Record one tool execution."""
+        with self._lock:
+            self.tool_seconds.setdefault(name, []).append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totals and latency percentiles for the whole run.
+
+        Returns:
+            A JSON-serializable dict, used as the RUN_SUMMARY event data.
+        """
+        with self._lock:
+            tool_seconds = {name: list(v) for name, v in self.tool_seconds.items()}
+
+        all_tools = [s for samples in tool_seconds.values() for s in samples]
+        return {
+            "steps": self.steps,
+            "wall_seconds": round(self.elapsed(), 4),
+            "llm": {
+                **latency_summary(self.llm_seconds),
+                "retries": self.retries,
+                "backoff_seconds": round(self.backoff_seconds, 4),
+                "throttle_seconds": round(self.throttle_seconds, 4),
+                "hedges": self.hedges,
+                "failovers": self.failovers,
+                "cache_hits": self.cache_hits,
+                "failures": self.failures,
+            },
+            "tools": {
+                **latency_summary(all_tools),
+                "by_name": {
+                    name: {
+                        "count": len(samples),
+                        "total_seconds": round(sum(samples), 4),
+                    }
+                    for name, samples in sorted(tool_seconds.items())
+                },
+            },
+            "tokens": dict(self.tokens),
+        }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Render a RUN_SUMMARY payload as a compact, human-readable report."""
+    llm = summary["llm"]
+    tools = summary["tools"]
+    tokens = summary["tokens"]
+    lines = [
+        f"📈 Run summary: {summary['steps']} steps in {summary['wall_seconds']:.2f}s",
+        (
+            f"   LLM:    {llm['count']} calls, {llm['total_seconds']:.2f}s total, "
+            f"p50 {llm['p50_seconds']:.2f}s / p90 {llm['p90_seconds']:.2f}s / "
+            f"p99 {llm['p99_seconds']:.2f}s, {llm['retries']} retries "
+            f"({llm['backoff_seconds']:.2f}s backoff), "
+            f"{llm['throttle_seconds']:.2f}s throttled, {llm['hedges']} hedged, "
+            f"{llm['failovers']} failovers, {llm['cache_hits']} cache hits, "
+            f"{llm['failures']} failed"
+        ),
+        (
+            f"   Tools:  {tools['count']} calls, {tools['total_seconds']:.2f}s total, "
+            f"p50 {tools['p50_seconds']:.3f}s / p90 {tools['p90_seconds']:.3f}s / "
+            f"p99 {tools['p99_seconds']:.3f}s"
+        ),
+    ]
+    for name, stats in tools["by_name"].items():
+        lines.append(
+            f"           {name}: {stats['count']} calls, {stats['total_seconds']:.3f}s"
+        )
+    lines.append(
+        f"   Tokens: prompt {tokens['prompt_tokens']} "
+        f"(cached {tokens['cached_tokens']}), completion {tokens['completion_tokens']}"
+    )
+    return "\n".join(lines)
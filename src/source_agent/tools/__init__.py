@@ -1,8 +1,25 @@
 import pathlib
 import importlib
+from .tool_registry import registry
 
 
-# Auto-load all .py files in this directory (excluding __init__.py and tool_registry.py)
-for path in pathlib.Path(__file__).parent.glob("*.py"):
-    if path.stem not in ["__init__", "tool_registry"]:
-        importlib.import_module(f"{__package__}.{path.stem}")
+# Tool schemas are served from a static manifest, so startup doesn't import every
+# tool module (and `requests`, `bs4`, `ddgs` and `pathspec` with them). Each module
+# is imported on the first call of one of its tools.
+# Regenerate it after adding or changing a tool: python -m source_agent.tools
+MANIFEST = pathlib.Path(__file__).parent / "manifest.json"
+
+
+def import_all():
+    """Import every tool module, registering their real functions."""
+    # Sorted so the tool schema list, part of every prompt prefix, is identical across hosts.
+    for path in sorted(pathlib.Path(__file__).parent.glob("*.py")):
+        if path.stem not in ["__init__", "__main__", "tool_registry"]:
+            importlib.import_module(f"{__package__}.{path.stem}")
+
+
+if MANIFEST.exists():
+    registry.load_manifest(MANIFEST)
+else:
+    import_all()
+registry.discover()
@@ -0,0 +1,13 @@
+from . import MANIFEST, import_all
+from .tool_registry import registry
+
+
+import_all()
+# Plugin tools are cached separately by `registry.discover`
+names = [
+    name
+    for name, (module, _) in registry.sources.items()
+    if module.startswith(f"{__package__}.")
+]
+registry.write_manifest(MANIFEST, names)
+print(f"Wrote {len(names)} tools to {MANIFEST}")
@@ -0,0 +1,70 @@
+from ..artifacts import read_artifact
+from .tool_registry import registry
+
+
+@registry.register(
+    name="artifact_read_tool",
+    description=(
+        "Page through a large tool result that was stored as an artifact. "
+        "Read by character offset/limit, or by line range with start_line/end_line."
+    ),
+    parameters={
+        "type": "object",
+        "properties": {
+            "handle": {
+                "type": "string",
+                "description": "The artifact handle returned in place of the full result.",
+            },
+            "offset": {
+                "type": "integer",
+                "default": 0,
+                "description": "Character offset to start reading from.",
+            },
+            "limit": {
+                "type": "integer",
+                "default": 4000,
+                "description": "Maximum number of characters to return.",
+            },
+            "start_line": {
+                "type": "integer",
+                "description": "First line to return (1-based). Use instead of offset.",
+            },
+            "end_line": {
+                "type": "integer",
+                "description": "Last line to return (inclusive).",
+            },
+        },
+        "required": ["handle"],
+    },
+    read_only=True,
+)
+def artifact_read_tool(
+    handle: str,
+    offset: int = 0,
+    limit: int = 4000,
+    start_line: int = None,
+    end_line: int = None,
+) -> dict:
+    """
+    Read a page of a stored artifact.
+
+    Args:
+        handle (str): The artifact handle.
+        offset (int): Character offset to start reading from.
+        limit (int): Maximum number of characters to return.
+        start_line (int, optional): First line to return (1-based).
+        end_line (int, optional): Last line to return (inclusive).
+
+    Returns:
+        dict: The requested content and where the next page starts.
+    """
+    try:
+        return read_artifact(
+            handle,
+            offset=offset,
+            limit=limit,
+            start_line=start_line,
+            end_line=end_line,
+        )
+    except Exception as e:
+        return {"success": False, "error": f"Failed to read artifact: {str(e)}"}
@@ -108,6 +108,7 @@ def _evaluate_expression_node(node):
         },
         "required": ["expression"],
     },
+    read_only=True,
 )
 def calculate_expression_tool(expression: str) -> Union[int, float, str]:
     """
@@ -1,14 +1,12 @@
+import os
 import pathlib
-import pathspec
+from ..ignore import IgnoreRules, load_ignore
 from .tool_registry import registry
 
 
-def load_gitignore(root: pathlib.Path):
-    gitignore = root / ".gitignore"
-    if gitignore.exists():
-        lines = gitignore.read_text(encoding="utf-8").splitlines()
-        return pathspec.PathSpec.from_lines("gitwildmatch", lines)
-    return None
+def load_gitignore(root: pathlib.Path) -> IgnoreRules:
+    """Return the ignore rules for paths relative to `root`."""
+    return load_ignore(root)
 
 
 @registry.register(
@@ -30,6 +28,7 @@ def load_gitignore(root: pathlib.Path):
         },
         "required": [],
     },
+    read_only=True,
 )
 def file_list_tool(path=".", recursive=False):
     cwd = pathlib.Path.cwd().resolve()
@@ -43,18 +42,26 @@ def file_list_tool(path=".", recursive=False):
     if not str(target).startswith(str(cwd)):
         return {"success": False, "error": "Path traversal not allowed."}
 
-    spec = load_gitignore(cwd)
+    rules = load_gitignore(cwd)
     rel = lambda p: p.relative_to(cwd).as_posix()  # noqa: E731
 
     items = []
-    paths = target.rglob("*") if recursive else target.iterdir()
-
-    for p in paths:
-        if spec and spec.match_file(rel(p)):
-            continue
-        name = rel(p)
-        if p.is_dir() and not recursive:
-            name += "/"
-        items.append(name)
+    if not recursive:
+        for p in target.iterdir():
+            is_dir = p.is_dir()
+            if rules.is_ignored(rel(p), is_dir=is_dir):
+                continue
+            items.append(rel(p) + "/" if is_dir else rel(p))
+        return {"success": True, "files": sorted(items)}
+
+    # Ignored directories are pruned rather than listed and filtered
+    for dirpath, dirnames, filenames in os.walk(target):
+        base = rel(pathlib.Path(dirpath))
+        base = "" if base == "." else f"{base}/"
+        dirnames[:] = [
+            d for d in dirnames if not rules.is_ignored(base + d, is_dir=True)
+        ]
+        items.extend(base + d for d in dirnames)
+        items.extend(base + f for f in filenames if not rules.is_ignored(base + f))
 
     return {"success": True, "files": sorted(items)}
@@ -15,6 +15,7 @@ from .tool_registry import registry
         },
         "required": ["path"],
     },
+    read_only=True,
 )
 def file_read_tool(path: str) -> dict:
     """
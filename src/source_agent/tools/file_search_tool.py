@@ -1,31 +1,29 @@
-import re
 import pathlib
-import pathspec
+from .. import search, search_index
 from typing import Dict, List, Union, Callable, Optional
+from ..ignore import IgnoreRules, load_ignore
 from .tool_registry import registry
 
 
-def load_gitignore_spec(root: pathlib.Path) -> Optional[pathspec.PathSpec]:
+MAX_RESULTS = 200
+
+
+def load_gitignore_spec(root: pathlib.Path) -> IgnoreRules:
     """
-    Load a PathSpec object from a .gitignore file in the given root directory.
+    Load the ignore rules (nested .gitignore files, .git/info/exclude and
+    global excludes) for paths relative to the given root directory.
     """
-    gitignore = root / ".gitignore"
-    if gitignore.exists():
-        lines = gitignore.read_text(encoding="utf-8").splitlines()
-        return pathspec.PathSpec.from_lines("gitwildmatch", lines)
-    return None
+    return load_ignore(root)
 
 
-def is_ignored(
-    path: pathlib.Path, spec: Optional[pathspec.PathSpec], root: pathlib.Path
-) -> bool:
+def is_ignored(path: pathlib.Path, rules: IgnoreRules, root: pathlib.Path) -> bool:
     """
-    Check if the given path is ignored based on the pathspec rules.
+    Check if the given path is ignored based on the ignore rules.
     """
-    if not spec:
+    if not rules:
         return False
     rel = path.relative_to(root).as_posix()
-    return spec.match_file(rel)
+    return rules.is_ignored(rel, is_dir=path.is_dir())
 
 
 def is_subpath(path: pathlib.Path, base: pathlib.Path) -> bool:
@@ -43,10 +41,7 @@ def build_plain_text_matcher(pattern: str, ignore_case: bool) -> Callable[[str],
     """
     Returns a function that checks if a pattern appears in a line.
     """
-    if ignore_case:
-        lowered = pattern.lower()
-        return lambda line: lowered in line.lower()
-    return lambda line: pattern in line
+    return search.line_matcher(pattern, regex=False, ignore_case=ignore_case)
 
 
 @registry.register(
@@ -83,9 +78,29 @@ def build_plain_text_matcher(pattern: str, ignore_case: bool) -> Callable[[str],
                 "items": {"type": "string"},
                 "description": "Filter files by extensions (e.g. ['.py', '.txt'])",
             },
+            "max_results": {
+                "type": "integer",
+                "default": MAX_RESULTS,
+                "description": "Maximum number of matches (or files) to return, at least 1.",
+            },
+            "cursor": {
+                "type": "string",
+                "description": "next_cursor of a truncated search, to get the next page of the same search.",
+            },
+            "max_per_file": {
+                "type": "integer",
+                "default": 0,
+                "description": "Maximum matches per file, 0 for no limit.",
+            },
+            "context": {
+                "type": "integer",
+                "default": 0,
+                "description": "Lines of context to show around each match.",
+            },
         },
         "required": ["name"],
     },
+    read_only=True,
 )
 def file_search_tool(
     name: str,
@@ -94,13 +109,23 @@ def file_search_tool(
     regex: bool = False,
     ignore_case: bool = False,
     ext: Optional[List[str]] = None,
-) -> Dict[str, Union[bool, List[str]]]:
+    max_results: int = MAX_RESULTS,
+    cursor: Optional[str] = None,
+    max_per_file: int = 0,
+    context: int = 0,
+) -> Dict[str, Union[bool, str, List[str]]]:
     """
     Search for files in a directory matching a name pattern and optionally search for text or regex inside them.
-    Respects .gitignore rules.
+    Respects .gitignore rules, and uses the workspace's search index if one was built.
+
+    Matches are produced lazily and the search stops as soon as `max_results`
+    are found. A truncated search returns a `next_cursor`
+    (`path:line` of the last match, or `path` to continue after a whole file);
+    passing it back as `cursor` resumes the walk right after that point.
+    Context lines are formatted `path-line-text`, like grep.
 
     Returns:
-        Dict[str, Union[bool, List[str]]]: The search results or error message.
+        Dict[str, Union[bool, str, List[str]]]: The search results or error message.
     """
     try:
         cwd = pathlib.Path.cwd().resolve()
@@ -115,43 +140,83 @@ def file_search_tool(
         if not root.is_dir():
             return {"success": False, "content": [f"Error: Not a directory - {path}"]}
 
-        ignore_spec = load_gitignore_spec(root)
-        results = []
+        if max_results < 1:
+            return {
+                "success": False,
+                "content": [f"Error: max_results must be at least 1 - {max_results}"],
+            }
+
+        rules = load_gitignore_spec(root)
+        prefix = "" if root == cwd else f"{root.relative_to(cwd).as_posix()}/"
+
+        start, after = None, None
+        if cursor:
+            head, _, line = cursor.rpartition(":")
+            start, after = (head, int(line)) if line.isdigit() else (cursor, None)
+            if not start.startswith(prefix):
+                return {
+                    "success": False,
+                    "content": [f"Error: Invalid cursor - {cursor}"],
+                }
+            start = start[len(prefix) :]
+
+        # Prune ignored directories while walking, then filter by name
+        matches_name = search.name_matcher(name)
+        files = (
+            rel
+            for rel in search.walk(str(root), ignore=rules, start=start)
+            if matches_name(rel) and (not ext or pathlib.PurePath(rel).suffix in ext)
+        )
+        if start is not None and after is None:
+            files = (rel for rel in files if rel != start)
 
-        # Create the matcher based on provided pattern
-        matcher: Optional[Callable[[str], bool]] = None
         if pattern:
-            if regex:
-                flags = re.IGNORECASE if ignore_case else 0
-                matcher = re.compile(pattern, flags).search
-            else:
-                matcher = build_plain_text_matcher(pattern, ignore_case)
-
-        # File system traversal and filtering
-        for file in root.rglob(name):
-            if not file.is_file():
-                continue
-            if ext and file.suffix not in ext:
-                continue
-            if is_ignored(file, ignore_spec, root):
-                continue
-
-            # If content match is needed
-            if matcher:
-                try:
-                    for i, line in enumerate(
-                        file.read_text(encoding="utf-8", errors="ignore").splitlines(),
-                        1,
-                    ):
-                        if matcher(line):
-                            rel = file.relative_to(cwd)
-                            results.append(f"{rel}:{i}:{line.strip()}")
-                except Exception:
-                    continue  # Skip files that can't be read
-            else:
-                results.append(str(file.relative_to(cwd)))
-
-        return {"success": True, "content": results or ["No matches found."]}
+            # A built index rules out files that can't contain the pattern
+            index = search_index.open_index(cwd)
+            if index is not None:
+                files = index.filter(files, pattern, regex, ignore_case, prefix)
+            lines = search.scan(
+                str(root),
+                files,
+                pattern,
+                regex,
+                ignore_case,
+                context=context,
+                max_per_file=max_per_file,
+                resume=(start, after) if after is not None else None,
+            )
+        else:
+            lines = ((rel, None, None, True) for rel in files)
+
+        results, next_cursor = [], None
+        found, in_file, last = 0, 0, None
+        try:
+            for rel, number, line, is_match in lines:
+                if is_match:
+                    if found == max_results:
+                        # There is more: continue after the last reported match,
+                        # or after its file if that file's matches were capped
+                        last_rel, last_number = last
+                        whole_file = number is None or in_file == max_per_file
+                        next_cursor = f"{prefix}{last_rel}" + (
+                            "" if whole_file else f":{last_number}"
+                        )
+                        break
+                    found += 1
+                    in_file = in_file + 1 if last and last[0] == rel else 1
+                    last = (rel, number)
+                if number is None:
+                    results.append(f"{prefix}{rel}")
+                else:
+                    sep = ":" if is_match else "-"
+                    results.append(f"{prefix}{rel}{sep}{number}{sep}{line}")
+        finally:
+            lines.close()
+
+        response = {"success": True, "content": results or ["No matches found."]}
+        if next_cursor:
+            response["next_cursor"] = next_cursor
+        return response
 
     except Exception as e:
         return {"success": False, "content": [f"Unexpected error: {str(e)}"]}
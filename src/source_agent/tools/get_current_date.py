@@ -10,6 +10,7 @@ from .tool_registry import registry
         "properties": {},
         "required": [],
     },
+    read_only=True,
 )
 def get_current_date() -> dict:
     """
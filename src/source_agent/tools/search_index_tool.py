@@ -0,0 +1,41 @@
+import pathlib
+from .. import search_index
+from .tool_registry import registry
+
+
+@registry.register(
+    name="search_index_tool",
+    description=(
+        "Build or update the trigram index that speeds up file_search_tool content "
+        "searches. Only files changed since the last update are re-read."
+    ),
+    parameters={
+        "type": "object",
+        "properties": {
+            "rebuild": {
+                "type": "boolean",
+                "default": False,
+                "description": "Re-read every file instead of only the changed ones.",
+            },
+        },
+        "required": [],
+    },
+    read_only=False,
+)
+def search_index_tool(rebuild: bool = False) -> dict:
+    """
+    Build or incrementally update the search index of the workspace.
+
+    The index lives in the cache directory, so the workspace isn't modified.
+
+    Args:
+        rebuild (bool): Re-read every file instead of only the changed ones.
+
+    Returns:
+        dict: File and trigram counts, the index size and the time taken.
+    """
+    try:
+        index = search_index.TrigramIndex(pathlib.Path.cwd())
+        return {"success": True, "index": index.update(rebuild=rebuild)}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to update index: {e}"}
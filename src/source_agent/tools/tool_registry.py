@@ -1,24 +1,234 @@
+import os
+import sys
+import json
+import hashlib
+import pathlib
+import tempfile
+import importlib
+import importlib.metadata
+from ..paths import cache_dir
+
+
+# Installed packages add tools by declaring entry points in this group, e.g.
+#   [project.entry-points."source_agent.tools"]
+#   jira = "acme_agent_tools.jira"
+# Each names a module (or a single tool function) decorated with `registry.register`.
+ENTRY_POINT_GROUP = "source_agent.tools"
+
+
+class LazyTool:
+    """
+    Stands in for a tool function until the tool is first called.
+
+    Calling it imports the tool's module, whose `registry.register` decorator
+    then replaces this proxy in the registry with the real function.
+    """
+
+    def __init__(self, name, module, function):
+        self.name = name
+        self.module = module
+        self.function = function
+        self._func = None
+
+    def resolve(self):
+        if self._func is None:
+            self._func = getattr(importlib.import_module(self.module), self.function)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazyTool {self.name} from {self.module}>"
+
+
 class ToolRegistry:
     def __init__(self):
         self.tools = []
         self.tool_mapping = {}
+        self.read_only = set()
+        # Tool name -> (module, function name), for the manifest
+        self.sources = {}
+        # Tool name -> index in `tools`
+        self._positions = {}
+
+    def register(self, name, description, parameters, read_only=False):
+        """
+        Register a tool function together with its JSON schema.
+
+        A tool already known from a manifest keeps its place in `tools`, so
+        the schema list sent to the model doesn't change when it loads.
+
+        Args:
+            name: The tool name exposed to the model.
+            description: A description of what the tool does.
+            parameters: JSON schema for the tool's arguments.
+            read_only: True if the tool has no side effects and can safely run
+                concurrently with other read-only tools.
+        """
 
-    def register(self, name, description, parameters):
         def decorator(func):
-            self.tools.append(
+            schema = {
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": description,
+                    "parameters": parameters,
+                },
+            }
+            # Lets `discover` find the tools of a plugin module
+            func.__tool__ = (schema, read_only)
+            self.add(schema, func, (func.__module__, func.__name__), read_only)
+            return func
+
+        return decorator
+
+    def add(self, schema, func, source, read_only=False):
+        """
+        Add or replace a tool.
+
+        Args:
+            schema: The tool's JSON schema.
+            func: The tool function, or a `LazyTool`.
+            source: `(module, function name)` the function is imported from.
+            read_only: True if the tool has no side effects.
+        """
+        name = schema["function"]["name"]
+        index = self._positions.get(name)
+        if index is None:
+            self._positions[name] = len(self.tools)
+            self.tools.append(schema)
+        else:
+            self.tools[index] = schema
+        self.tool_mapping[name] = func
+        self.sources[name] = tuple(source)
+        if read_only:
+            self.read_only.add(name)
+        else:
+            self.read_only.discard(name)
+
+    def resolve(self, name):
+        """Return the real function of a tool, importing its module if needed."""
+        func = self.tool_mapping[name]
+        return func.resolve() if isinstance(func, LazyTool) else func
+
+    def load_manifest(self, path):
+        """
+        Register every tool in a manifest without importing any tool module.
+
+        Tools whose module was already imported keep their real function.
+
+        Args:
+            path: Path to the manifest written by `write_manifest`.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        for entry in entries:
+            name = entry["schema"]["function"]["name"]
+            source = (entry["module"], entry["function"])
+            current = self.tool_mapping.get(name)
+            if current is not None and not isinstance(current, LazyTool):
+                if self.sources.get(name) == source:
+                    continue  # Already imported for real
+            func = LazyTool(name, *source)
+            self.add(entry["schema"], func, source, entry.get("read_only", False))
+
+    def manifest(self, names=None):
+        """
+        Describe registered tools, sorted by name.
+
+        The order doesn't depend on which tools were loaded from an older
+        manifest first, so a regenerated manifest, and the tool list of every
+        agent loading it, come out the same on every host.
+
+        Args:
+            names: Only describe these tools, defaults to all.
+        """
+        entries = []
+        for schema in sorted(self.tools, key=lambda s: s["function"]["name"]):
+            name = schema["function"]["name"]
+            if names is not None and name not in names:
+                continue
+            module, function = self.sources[name]
+            entries.append(
                 {
-                    "type": "function",
-                    "function": {
-                        "name": name,
-                        "description": description,
-                        "parameters": parameters,
-                    },
+                    "module": module,
+                    "function": function,
+                    "read_only": name in self.read_only,
+                    "schema": schema,
                 }
             )
-            self.tool_mapping[name] = func
-            return func
+        return entries
 
-        return decorator
+    def write_manifest(self, path, names=None):
+        """Write the manifest of the registered tools (or just `names`) to `path`."""
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(self.manifest(names), indent=2) + "\n"
+
+        # Write atomically so concurrent agents never load a partial manifest
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def discover(self, group=ENTRY_POINT_GROUP, cache=True):
+        """
+        Register the tools that installed packages provide through entry points.
+
+        Importing every plugin would make startup grow with each tool added,
+        so the merged manifest of all plugin tools is cached on disk, keyed by
+        the entry points and the versions of the packages declaring them. On a
+        cache hit no plugin module is imported until one of its tools is
+        called. Installing, upgrading or removing a plugin invalidates it;
+        with an editable install, bump its version (or pass `cache=False`)
+        after changing a schema.
+
+        Plugins that fail to load are skipped with a warning.
+
+        Args:
+            group: The entry point group to search.
+            cache: False to import every plugin and skip the cache.
+
+        Returns:
+            The names of the discovered tools.
+        """
+        entry_points = plugin_entry_points(group)
+        if not entry_points:
+            return []
+
+        path = cache_dir("tools", f"manifest-{manifest_key(entry_points)}.json")
+        if cache and path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    names = [e["schema"]["function"]["name"] for e in json.load(f)]
+                self.load_manifest(path)
+                return names
+            except (OSError, ValueError, KeyError, TypeError):
+                pass  # Corrupt or foreign file, rebuild it
+
+        names = []
+        for entry_point in entry_points:
+            try:
+                loaded = entry_point.load()
+            except Exception as e:
+                print(
+                    f"⚠️ Skipping tool plugin {entry_point.name!r}: {e}",
+                    file=sys.stderr,
+                )
+                continue
+            for func in _plugin_tools(loaded):
+                schema, read_only = func.__tool__
+                source = (func.__module__, func.__name__)
+                self.add(schema, func, source, read_only)
+                names.append(schema["function"]["name"])
+
+        if cache:
+            try:
+                self.write_manifest(path, names)
+            except OSError:
+                pass  # A read-only cache only costs the speed-up
+        return names
 
     def get_tools(self):
         return self.tools
@@ -26,6 +236,41 @@ class ToolRegistry:
     def get_mapping(self):
         return self.tool_mapping
 
+    def is_read_only(self, name):
+        return name in self.read_only
+
+
+def plugin_entry_points(group=ENTRY_POINT_GROUP):
+    """Return the tool plugin entry points of every installed package, by name."""
+    return sorted(
+        importlib.metadata.entry_points(group=group),
+        key=lambda ep: (ep.name, ep.value),
+    )
+
+
+def manifest_key(entry_points):
+    """Hash the entry points and the versions of the packages declaring them."""
+    parts = []
+    for ep in entry_points:
+        dist = ep.dist
+        parts.append(
+            f"{ep.name}={ep.value}@{dist.name if dist else ''}=="
+            f"{dist.version if dist else ''}"
+        )
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _plugin_tools(loaded):
+    # An entry point names either a single tool or a module of tools
+    if hasattr(loaded, "__tool__"):
+        return [loaded]
+    return [
+        value
+        for value in vars(loaded).values()
+        if hasattr(value, "__tool__")
+        and getattr(value, "__module__", None) == loaded.__name__
+    ]
+
 
 # Global registry instance
 registry = ToolRegistry()
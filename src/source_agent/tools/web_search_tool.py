@@ -22,6 +22,7 @@ from .tool_registry import registry
         },
         "required": ["query"],
     },
+    read_only=True,
 )
 def web_search_tool(query: str, max_results: int = 5) -> dict:
     try:
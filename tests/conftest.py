@@ -1,4 +1,5 @@
 import pytest
+import source_agent
 
 @pytest.fixture(autouse=True)
 def isolate_env(monkeypatch):
@@ -13,3 +14,33 @@ def isolate_env(monkeypatch):
     ]
     for key in keys:
         monkeypatch.delenv(key, raising=False)
+
+
+@pytest.fixture(autouse=True)
+def clear_clients():
+    """
+    Drop shared API clients so a client patched in one test never leaks into another.
+    """
+    source_agent.providers.clear_clients()
+    yield
+    source_agent.providers.clear_clients()
+
+
+@pytest.fixture(autouse=True)
+def clear_limiters():
+    """
+    Forget rate limits learned from response headers in other tests.
+    """
+    source_agent.ratelimit.clear_limiters()
+    yield
+    source_agent.ratelimit.clear_limiters()
+
+
+@pytest.fixture(autouse=True)
+def clear_breakers():
+    """
+    Reset provider circuit breakers tripped by other tests.
+    """
+    source_agent.failover.clear_breakers()
+    yield
+    source_agent.failover.clear_breakers()
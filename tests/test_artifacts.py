@@ -0,0 +1,98 @@
+import json
+import pytest
+from source_agent.artifacts import ArtifactStore, result_text, read_artifact
+from source_agent.agents.code import CodeAgent
+from source_agent.tools.artifact_read_tool import artifact_read_tool
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_AGENT_ARTIFACT_DIR", str(tmp_path))
+    return ArtifactStore(threshold=100, preview_chars=10)
+
+
+def test_spill_keeps_small_results_inline(store):
+    assert store.spill("small") is None
+
+
+def test_spill_returns_preview_and_handle(store):
+    content = "\n".join(f"line {i}" for i in range(1, 101))
+    replacement = json.loads(store.spill(content, "file_read_tool"))
+    assert replacement["preview"] == content[:10]
+    assert replacement["total_chars"] == len(content)
+    assert replacement["total_lines"] == 100
+
+    page = artifact_read_tool(replacement["artifact"], offset=5, limit=20)
+    assert page["success"] and page["content"] == content[5:25]
+    assert page["next_offset"] == 25
+
+
+def test_read_artifact_by_line_range(store):
+    content = "\n".join(f"line {i}" for i in range(1, 101))
+    handle = store.put(content)
+    page = read_artifact(handle, start_line=99, end_line=150)
+    assert page["content"] == "line 99\nline 100"
+    assert page["next_line"] is None
+
+    page = read_artifact(handle, start_line=1, end_line=2)
+    assert page["content"] == "line 1\nline 2\n"
+    assert page["next_line"] == 3
+
+
+def test_read_artifact_rejects_bad_handles(store):
+    assert not read_artifact("../../etc/passwd")["success"]
+    assert "Invalid" in read_artifact("../abc")["error"]
+    assert "Invalid" in read_artifact("-/abc")["error"]
+    assert "not found" in read_artifact("abc/def")["error"]
+    assert "not found" in read_artifact("20261018-061019-8f69c2/def")["error"]
+
+
+def test_cleanup_removes_session(store):
+    store.put("x")
+    store.cleanup()
+    assert not store.directory.exists()
+
+
+class DummyFunction:
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+
+
+class DummyToolCall:
+    def __init__(self, function, id):
+        self.function = function
+        self.id = id
+
+
+def test_handle_tool_call_spills_raw_text_by_line(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_AGENT_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "big.txt").write_text("".join(f"line {i}\n" for i in range(1, 2001)))
+    agent = CodeAgent(system_prompt="SP", artifact_threshold=1000)
+
+    arguments = json.dumps({"path": "big.txt"})
+    result = agent.handle_tool_call(DummyToolCall(DummyFunction("file_read_tool", arguments), "1"))
+    content = json.loads(result["content"])
+    assert content["total_lines"] == 2001
+    assert content["preview"].startswith("line 1\nline 2\n")
+
+    page = read_artifact(content["artifact"], start_line=1, end_line=3)
+    assert page["content"] == "line 1\nline 2\nline 3\n"
+    assert page["next_line"] == 4 and page["total_lines"] == 2001
+    page = read_artifact(content["artifact"], start_line=2000)
+    assert page["content"] == "line 2000\n"
+
+
+def test_result_text_keeps_line_breaks():
+    assert result_text("a\nb") == "a\nb"
+    assert result_text({"path": "x", "content": "a\nb"}) == "a\nb"
+    assert result_text({"content": ["a:1:x", "b:2:y"]}) == "a:1:x\nb:2:y"
+    text = result_text({"exit_code": 1, "stdout": "one\ntwo"})
+    assert text == "exit_code: 1\nstdout:\none\ntwo"
+
+
+def test_artifact_threshold_zero_disables_store(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    assert CodeAgent(system_prompt="SP", artifact_threshold=0).artifact_store is None
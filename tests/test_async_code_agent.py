@@ -0,0 +1,143 @@
+import json
+import pytest
+import asyncio
+from source_agent.agents.code import AgentEventType
+from source_agent.agents.async_code import AsyncCodeAgent
+
+
+@pytest.fixture(autouse=True)
+def patch_openai(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.async_code.openai.AsyncOpenAI", lambda *args, **kwargs: None)
+
+
+class DummyFunction:
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+
+
+class DummyToolCall:
+    def __init__(self, function, id):
+        self.function = function
+        self.id = id
+
+
+class DummyMessage:
+    def __init__(self, content, tool_calls):
+        self.content = content
+        self.tool_calls = tool_calls
+
+
+class DummyChoice:
+    def __init__(self, message):
+        self.message = message
+
+
+class DummyResponse:
+    def __init__(self, choice):
+        self.choices = [choice]
+
+
+async def collect(agen):
+    return [event async for event in agen]
+
+
+def test_arun_executes_tools_and_completes():
+    agent = AsyncCodeAgent(api_key="k", base_url="u", model="m", temperature=0, system_prompt="SP")
+    agent.tool_mapping = {"echo": lambda text: {"echo": text}}
+    agent.read_only_tools = {"echo"}
+    replies = iter(
+        [
+            DummyMessage(
+                "working",
+                [
+                    DummyToolCall(DummyFunction("echo", json.dumps({"text": "a"})), "1"),
+                    DummyToolCall(DummyFunction("echo", json.dumps({"text": "b"})), "2"),
+                ],
+            ),
+            DummyMessage("", [DummyToolCall(DummyFunction("msg_complete_tool", "{}"), "3")]),
+        ]
+    )
+
+    async def fake_acall_llm(messages, stream=False):
+        await asyncio.sleep(0)
+        return DummyResponse(DummyChoice(next(replies)))
+
+    agent.acall_llm = fake_acall_llm
+    events = asyncio.run(collect(agent.arun(user_prompt="hi", max_steps=3)))
+
+    results = [e.data["result"] for e in events if e.type == AgentEventType.TOOL_RESULT]
+    assert results == [{"echo": "a"}, {"echo": "b"}]
+    assert [m["tool_call_id"] for m in agent.messages if isinstance(m, dict) and m["role"] == "tool"] == ["1", "2"]
+    assert events[-2].type == AgentEventType.TASK_COMPLETE
+
+
+def test_arun_reports_llm_errors():
+    agent = AsyncCodeAgent(api_key="k", base_url="u", model="m", temperature=0, system_prompt="SP")
+
+    async def failing_acall_llm(messages, stream=False):
+        raise RuntimeError("boom")
+
+    agent.acall_llm = failing_acall_llm
+    events = asyncio.run(collect(agent.arun(user_prompt="hi", max_steps=2)))
+    assert events[-2].type == AgentEventType.ERROR
+    assert "boom" in events[-2].data["message"]
+
+
+def test_acall_llm_retries_with_asyncio_sleep(monkeypatch):
+    agent = AsyncCodeAgent(api_key="k", base_url="u", model="m", temperature=0, system_prompt="SP")
+    calls = []
+
+    class Raw:
+        headers = {}
+
+        def parse(self):
+            return "ok"
+
+    class RawCompletions:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise ConnectionError("flaky")
+            return Raw()
+
+    class Completions:
+        with_raw_response = RawCompletions()
+
+    class Chat:
+        completions = Completions()
+
+    class Session:
+        chat = Chat()
+
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    agent.session = Session()
+    monkeypatch.setattr("source_agent.agents.async_code.asyncio.sleep", fake_sleep)
+    monkeypatch.setattr("source_agent.agents.async_code.RETRYABLE_OPENAI_ERRORS", (ConnectionError,))
+    assert asyncio.run(agent.acall_llm(agent.messages, backoff_base=0.01)) == "ok"
+    assert len(calls) == 2 and len(sleeps) == 1
+
+
+def test_summarize_messages_uses_a_blocking_client(monkeypatch):
+    agent = AsyncCodeAgent(api_key="k", base_url="u", model="m", temperature=0, system_prompt="SP")
+    requests = []
+
+    class Completions:
+        def create(self, **kwargs):
+            requests.append(kwargs)
+            return DummyResponse(DummyChoice(DummyMessage("the gist", None)))
+
+    class Chat:
+        completions = Completions()
+
+    class Session:
+        chat = Chat()
+
+    monkeypatch.setattr("source_agent.providers.get_client", lambda **kwargs: Session())
+    # Returns the summary text, not an un-awaited coroutine of the async session
+    assert agent.summarize_messages([{"role": "user", "content": "hi"}]) == "the gist"
+    assert requests[0]["model"] == "m"
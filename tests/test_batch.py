@@ -0,0 +1,115 @@
+import io
+import os
+import json
+import time
+import pytest
+import threading
+from source_agent.batch import run_item, run_batch, load_prompts
+from source_agent.agents.code import AgentEvent, AgentEventType
+
+
+class DummyAgent:
+    """Stands in for CodeAgent; records peak concurrency per provider."""
+
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def __init__(self, base_url=None, response_cache=None, **kwargs):
+        self.base_url = base_url
+        self.artifact_store = None
+        self.cache_dir = str(response_cache.directory) if response_cache else None
+
+    def run(self, user_prompt=None, max_steps=None):
+        with self.lock:
+            self.active[self.base_url] = self.active.get(self.base_url, 0) + 1
+            self.peak[self.base_url] = max(
+                self.peak.get(self.base_url, 0), self.active[self.base_url]
+            )
+        time.sleep(0.05)
+        with self.lock:
+            self.active[self.base_url] -= 1
+
+        yield AgentEvent(AgentEventType.ITERATION_START, {"step": 1, "max_steps": 1})
+        yield AgentEvent(
+            AgentEventType.AGENT_MESSAGE, {"content": f"done: {user_prompt}"}
+        )
+        if "fail" in user_prompt:
+            yield AgentEvent(AgentEventType.ERROR, {"message": "boom"})
+        else:
+            yield AgentEvent(AgentEventType.TASK_COMPLETE, {"message": "ok"})
+        yield AgentEvent(
+            AgentEventType.RUN_SUMMARY,
+            {"steps": 1, "cwd": os.getcwd(), "cache_dir": self.cache_dir},
+        )
+
+
+def build_job(item):
+    if item.get("provider") == "missing":
+        raise ValueError("Missing API key for provider 'missing'.")
+    return {
+        "user_prompt": item["prompt"],
+        "agent_kwargs": {"base_url": item.get("provider") or "default"},
+    }
+
+
+def test_load_prompts_assigns_ids(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text('{"prompt": "a", "id": "x"}\n\n"b"\n')
+    items = load_prompts(path)
+    assert items == [{"prompt": "a", "id": "x"}, {"prompt": "b", "id": "3"}]
+
+    path.write_text('{"id": "no prompt"}\n')
+    with pytest.raises(ValueError, match="line 1"):
+        load_prompts(path)
+
+
+def test_run_item_summarizes_events():
+    record = run_item({"id": "1", "prompt": "hello"}, {}, "hello", agent_factory=DummyAgent)
+    assert record["status"] == "complete"
+    assert record["final_message"] == "done: hello"
+    assert record["events"]["run_summary"] == 1
+    assert record["summary"]["steps"] == 1
+
+
+def test_run_batch_limits_concurrency_per_provider():
+    DummyAgent.peak.clear()
+    items = [{"id": str(i), "prompt": f"p{i}", "provider": "a"} for i in range(6)]
+    items += [{"id": f"b{i}", "prompt": "fail", "provider": "b"} for i in range(2)]
+    items.append({"id": "m", "prompt": "x", "provider": "missing"})
+    output = io.StringIO()
+
+    totals = run_batch(items, build_job, output, concurrency=2, agent_factory=DummyAgent)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(r["id"] for r in records) == sorted(item["id"] for item in items)
+    assert DummyAgent.peak["a"] == 2
+    assert totals == {"total": 9, "elapsed_seconds": totals["elapsed_seconds"], "complete": 6, "error": 3}
+    assert next(r for r in records if r["id"] == "m")["error"].startswith("Missing API key")
+
+
+def test_run_batch_isolates_workdirs(tmp_path):
+    items = [{"id": "one", "prompt": "p"}, {"id": "two", "prompt": "p"}]
+    output = io.StringIO()
+
+    run_batch(items, build_job, output, workdir_root=tmp_path, agent_factory=DummyAgent)
+
+    records = {r["id"]: r for r in map(json.loads, output.getvalue().splitlines())}
+    for item_id in ("one", "two"):
+        assert records[item_id]["status"] == "complete"
+        assert records[item_id]["summary"]["cwd"] == str(tmp_path / item_id)
+    assert os.getcwd() != str(tmp_path / "one")
+
+
+def test_run_batch_shares_relative_cache_dir_across_workdirs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    items = [{"id": "one", "prompt": "p"}, {"id": "two", "prompt": "p"}]
+    output = io.StringIO()
+
+    def cached_job(item):
+        return {"user_prompt": "p", "agent_kwargs": {"llm_cache": {"directory": "llm"}}}
+
+    run_batch(items, cached_job, output, workdir_root=tmp_path / "work", agent_factory=DummyAgent)
+
+    records = list(map(json.loads, output.getvalue().splitlines()))
+    assert [r["summary"]["cache_dir"] for r in records] == [str(tmp_path / "llm")] * 2
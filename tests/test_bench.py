@@ -0,0 +1,56 @@
+import json
+from source_agent import entrypoint
+from source_agent.bench import run_bench, format_table, validate_tool_call
+from source_agent.mock_server import MockServer
+from source_agent.tools.tool_registry import registry
+
+
+def call(name, arguments):
+    return {"function": {"name": name, "arguments": arguments}}
+
+
+def test_validate_tool_call():
+    tools = registry.get_tools()
+    assert validate_tool_call(call("file_read_tool", '{"path": "a.py"}'), tools)
+    assert not validate_tool_call(call("file_read_tool", "{}"), tools)
+    assert not validate_tool_call(call("file_read_tool", "{not json"), tools)
+    assert not validate_tool_call(call("no_such_tool", "{}"), tools)
+    assert validate_tool_call(call("get_current_date", ""), tools)
+
+
+def test_bench_against_local_endpoint():
+    scenario = {
+        "name": "mixed",
+        "usage": {"completion_tokens": 20},
+        "steps": [
+            {
+                "content": "Reading both files.",
+                "chunk_size": 2,
+                "delay": 0.01,
+                "tool_calls": [
+                    {"name": "file_read_tool", "arguments": {"path": "a.py"}},
+                    {"name": "file_read_tool", "arguments": {}},
+                ],
+            }
+        ],
+    }
+    with MockServer(scenario) as server:
+        target = {"name": "local", "base_url": server.base_url, "api_key": "k", "model": "mock"}
+        report = run_bench([target], prompts=[{"id": "p", "prompt": "go"}], repeats=2)
+
+    result = report["results"][0]
+    assert result["requests"] == 2 and result["errors"] == 0
+    assert result["tool_calls"] == 4
+    assert result["tool_call_validity"] == 0.5
+    assert 0 < result["ttft"]["p50_seconds"] <= result["latency"]["p50_seconds"]
+    assert result["tokens_per_second"] > 0
+    assert "local:mock" in format_table(report)
+
+
+def test_bench_subcommand_offline(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    code = entrypoint.main(["bench", "--mock", "--repeats", "1", "--json", str(output)])
+    assert code == 0
+    assert "tools ok" in capsys.readouterr().out
+    result = json.loads(output.read_text())["results"][0]
+    assert result["tool_call_validity"] == 1.0
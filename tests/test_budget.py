@@ -0,0 +1,87 @@
+import pytest
+from source_agent import entrypoint
+from source_agent.budget import Budget
+from source_agent.context import TokenEstimator, estimate_tokens
+from source_agent.agents.code import CodeAgent, AgentEventType
+from source_agent.mock_server import MockServer
+
+
+SCENARIO = {
+    "name": "budget",
+    "usage": {"prompt_tokens": 100_000, "completion_tokens": 50},
+    "steps": [
+        {"tool_calls": [{"name": "get_current_date", "arguments": {}}]},
+        {"tool_calls": [{"name": "get_current_date", "arguments": {}}]},
+        {"tool_calls": [{"name": "msg_complete_tool", "arguments": {}}]},
+    ],
+}
+
+
+def test_estimator_caches_messages_and_tools():
+    estimator = TokenEstimator()
+    messages = [{"role": "system", "content": "x" * 400}, {"role": "user", "content": "hi"}]
+    tools = [{"type": "function", "function": {"name": "t", "parameters": {}}}]
+
+    total = estimator.request(messages, tools)
+    assert total == sum(estimate_tokens(m) for m in messages) + estimator.tools(tools)
+    assert estimator.request(messages, tools) == total
+
+    messages[1] = {"role": "user", "content": "y" * 4000}
+    assert estimator.request(messages, tools) > total
+    estimator.prune(messages)
+    assert len(estimator._cache) == 2
+
+
+def test_budget_check():
+    budget = Budget(max_input_tokens=1000, max_output_tokens=100, max_request_tokens=600)
+    assert budget.check({"prompt_tokens": 300}, 500) is None
+    assert budget.check({"prompt_tokens": 0}, 700)["limit"] == "request_tokens"
+    assert budget.check({"prompt_tokens": 600}, 500)["limit"] == "input_tokens"
+    assert budget.check({"completion_tokens": 100}, 10)["limit"] == "output_tokens"
+
+    priced = Budget(max_cost=0.01, input_price=5.0, output_price=15.0)
+    assert priced.cost(1_000_000, 0) == 5.0
+    exceeded = priced.check({"prompt_tokens": 1500, "completion_tokens": 100}, 1000)
+    assert exceeded["limit"] == "cost" and exceeded["used"] == 0.009
+
+
+@pytest.mark.parametrize(
+    "budget, requests",
+    [
+        (Budget(max_request_tokens=10), 0),
+        (Budget(max_input_tokens=100_500), 1),
+        (Budget(max_output_tokens=100), 2),
+    ],
+)
+def test_agent_stops_before_doomed_request(budget, requests):
+    with MockServer(SCENARIO) as server:
+        agent = CodeAgent(
+            api_key="mock", base_url=server.base_url, model="mock", system_prompt="SP", budget=budget
+        )
+        events = list(agent.run(user_prompt="go"))
+        assert server.requests == requests
+
+    types = [e.type for e in events]
+    assert types[-2:] == [AgentEventType.BUDGET_EXCEEDED, AgentEventType.RUN_SUMMARY]
+    assert AgentEventType.TASK_COMPLETE not in types
+    assert events[-2].data["cap"] in (10, 100_500, 100)
+
+
+def test_budget_falls_back_to_estimates_without_usage():
+    scenario = {**SCENARIO, "usage": {}}  # The provider reports no usage
+    with MockServer(scenario) as server:
+        agent = CodeAgent(api_key="mock", base_url=server.base_url, model="mock", system_prompt="SP")
+        first = agent.token_estimator.request(agent.messages + [{"role": "user", "content": "go"}], agent.tools)
+        agent.budget = Budget(max_input_tokens=first * 3 // 2)
+        events = list(agent.run(user_prompt="go"))
+        assert server.requests == 1
+
+    assert events[-2].type == AgentEventType.BUDGET_EXCEEDED
+    assert events[-2].data["limit"] == "input_tokens"
+    assert events[-2].data["used"] == first
+    assert events[-1].data["tokens"]["prompt_tokens"] == 0  # Only reported usage is summarized
+
+
+def test_max_cost_needs_prices(capsys):
+    assert entrypoint.main(["--max-cost", "1"]) == 1
+    assert "--input-price" in capsys.readouterr().err
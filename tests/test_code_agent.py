@@ -19,7 +19,7 @@ class DummyToolCall:
 @pytest.fixture
 def agent(monkeypatch):
     c = CodeAgent(api_key="key", base_url="url", model="m", temperature=0.1, system_prompt="SP")
-    c.tool_mapping.clear()
+    c.tool_mapping = {}  # Not .clear(), the mapping is the global registry's
     return c
 
 
@@ -67,3 +67,35 @@ def test_handle_tool_call_unknown(agent):
     res = agent.handle_tool_call(call)
     content = json.loads(res["content"])
     assert "Unknown tool" in content["error"]
+
+
+def test_plan_tool_batches_groups_read_only(agent):
+    agent.read_only_tools = {"r"}
+    calls = [
+        DummyToolCall(DummyFunction("r", "{}"), "1"),
+        DummyToolCall(DummyFunction("r", "{}"), "2"),
+        DummyToolCall(DummyFunction("w", "{}"), "3"),
+        DummyToolCall(DummyFunction("r", "{}"), "4"),
+        DummyToolCall(DummyFunction("w", "{}"), "5"),
+        DummyToolCall(DummyFunction("w", "{}"), "6"),
+    ]
+    batches = agent.plan_tool_batches(calls)
+    assert [[c.id for c in b] for b in batches] == [["1", "2"], ["3"], ["4"], ["5"], ["6"]]
+
+
+def test_execute_tool_batch_runs_concurrently_in_order(agent):
+    import threading
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def slow(n):
+        # Every call waits for the others, so this only finishes if they overlap
+        barrier.wait()
+        return {"n": n}
+
+    agent.tool_mapping["slow"] = slow
+    agent.read_only_tools = {"slow"}
+    calls = [DummyToolCall(DummyFunction("slow", json.dumps({"n": n})), str(n)) for n in range(3)]
+    results = agent.execute_tool_batch(calls)
+    assert [r["tool_call_id"] for r in results] == ["0", "1", "2"]
+    assert [json.loads(r["content"])["n"] for r in results] == [0, 1, 2]
@@ -0,0 +1,98 @@
+import json
+import pytest
+from source_agent.context import SUMMARY_PREFIX, ContextWindowManager, estimate_tokens
+from source_agent.agents.code import CodeAgent, AgentEventType
+
+
+def tool_result(call_id, size):
+    return {"role": "tool", "tool_call_id": call_id, "name": "file_read_tool", "content": json.dumps("x" * size)}
+
+
+def assistant_call(call_id):
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{"id": call_id, "type": "function", "function": {"name": "file_read_tool", "arguments": "{}"}}],
+    }
+
+
+def conversation(turns, size=4000):
+    messages = [{"role": "system", "content": "SP"}, {"role": "user", "content": "go"}]
+    for i in range(turns):
+        messages.append(assistant_call(str(i)))
+        messages.append(tool_result(str(i), size))
+    return messages
+
+
+def test_under_budget_is_untouched():
+    messages = conversation(2, size=10)
+    snapshot = list(messages)
+    report = ContextWindowManager(budget_tokens=10_000).apply(messages)
+    assert messages == snapshot
+    assert report.tokens_saved == 0
+
+
+def test_elides_oldest_tool_results_first_and_keeps_tail():
+    messages = conversation(5)
+    manager = ContextWindowManager(budget_tokens=3000, keep_last=2)
+    report = manager.apply(messages)
+
+    assert report.tokens_saved > 0
+    assert report.tokens_after <= 3000
+    assert json.loads(messages[3]["content"])["elided"] is True
+    # Latest turn is kept verbatim
+    assert messages[-1] == tool_result("4", 4000)
+    assert messages[0] == {"role": "system", "content": "SP"}
+    # Tool call ids are still paired
+    assert [m["tool_call_id"] for m in messages if m["role"] == "tool"] == ["0", "1", "2", "3", "4"]
+
+
+def test_summarizes_middle_when_elision_is_not_enough():
+    messages = conversation(4)
+    messages[1] = {"role": "user", "content": "y" * 20000}
+    seen = []
+
+    def summarizer(middle):
+        seen.extend(middle)
+        return "short"
+
+    manager = ContextWindowManager(budget_tokens=1500, keep_last=2, summarizer=summarizer)
+    report = manager.apply(messages)
+
+    assert report.summarized == len(seen) > 0
+    assert messages[1]["content"] == f"{SUMMARY_PREFIX}\nshort"
+    assert messages[-2]["role"] == "assistant" and messages[-1]["role"] == "tool"
+    assert report.tokens_after < report.tokens_before
+
+
+def test_tail_never_starts_on_tool_result():
+    messages = conversation(3)
+    manager = ContextWindowManager(budget_tokens=1, keep_last=1)
+    assert messages[manager._tail_start(messages)]["role"] == "assistant"
+
+
+def test_estimate_tokens_handles_message_objects():
+    from openai.types.chat import ChatCompletionMessage
+
+    message = ChatCompletionMessage(role="assistant", content="a" * 400)
+    assert estimate_tokens(message) >= 100
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    return CodeAgent(system_prompt="SP")
+
+
+def test_agent_emits_context_compacted_event(agent):
+    agent.messages = conversation(5)
+    agent.context_manager = ContextWindowManager(budget_tokens=3000, keep_last=2)
+
+    def fake_call_llm(messages):
+        raise RuntimeError("stop")
+
+    agent.call_llm = fake_call_llm
+    events = list(agent.run(max_steps=1))
+    compacted = [e for e in events if e.type == AgentEventType.CONTEXT_COMPACTED]
+    assert len(compacted) == 1
+    assert compacted[0].data["tokens_saved"] > 0
@@ -62,4 +62,74 @@ def test_run_max_steps_reached():
     agent.call_llm = fake_call_llm
     events = list(agent.run(user_prompt="hi", max_steps=2))
     assert sum(1 for e in events if e.type == AgentEventType.ITERATION_START) == 2
-    assert events[-1].type == AgentEventType.MAX_STEPS_REACHED
+    assert events[-2].type == AgentEventType.MAX_STEPS_REACHED
+    assert events[-1].type == AgentEventType.RUN_SUMMARY
+
+
+class DummyChunkFunction:
+    def __init__(self, name=None, arguments=None):
+        self.name = name
+        self.arguments = arguments
+
+
+class DummyChunkToolCall:
+    def __init__(self, index, id=None, function=None):
+        self.index = index
+        self.id = id
+        self.function = function
+
+
+class DummyDelta:
+    def __init__(self, content=None, tool_calls=None):
+        self.content = content
+        self.tool_calls = tool_calls
+
+
+class DummyChunk:
+    def __init__(self, delta):
+        self.choices = [DummyChoiceDelta(delta)]
+
+
+class DummyChoiceDelta:
+    def __init__(self, delta):
+        self.delta = delta
+
+
+def test_run_streams_deltas_and_reassembles_tool_calls():
+    agent = CodeAgent(api_key="k", base_url="u", model="m", temperature=0, system_prompt="SP", stream=True)
+
+    def fake_call_llm(messages, stream=False):
+        assert stream is True
+        return iter(
+            [
+                DummyChunk(DummyDelta(content="Hel")),
+                DummyChunk(DummyDelta(content="lo")),
+                DummyChunk(
+                    DummyDelta(
+                        tool_calls=[
+                            DummyChunkToolCall(0, id="c1", function=DummyChunkFunction(name="msg_complete", arguments=""))
+                        ]
+                    )
+                ),
+                DummyChunk(
+                    DummyDelta(tool_calls=[DummyChunkToolCall(0, function=DummyChunkFunction(name="_tool", arguments="{}"))])
+                ),
+            ]
+        )
+
+    agent.call_llm = fake_call_llm
+    events = list(agent.run(user_prompt="hi", max_steps=1))
+
+    deltas = [e for e in events if e.type == AgentEventType.AGENT_MESSAGE_DELTA]
+    assert [d.data["content"] for d in deltas] == ["Hel", "lo"]
+    assert [d.data["index"] for d in deltas] == [0, 1]
+
+    message = next(e for e in events if e.type == AgentEventType.AGENT_MESSAGE)
+    assert message.data == {"content": "Hello", "streamed": True}
+
+    assistant = agent.messages[-1]
+    assert assistant.content == "Hello"
+    assert assistant.tool_calls[0].id == "c1"
+    assert assistant.tool_calls[0].function.name == "msg_complete_tool"
+    assert assistant.tool_calls[0].function.arguments == "{}"
+    assert events[-2].type == AgentEventType.TASK_COMPLETE
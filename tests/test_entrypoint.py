@@ -0,0 +1,39 @@
+import sys
+import argparse
+import subprocess
+from source_agent import batch, repomap, profiler, llm_cache, providers, entrypoint
+
+
+def test_help_does_not_import_provider_clients():
+    # The client libraries are only needed once a command actually runs
+    code = (
+        "import sys\n"
+        "from source_agent import entrypoint\n"
+        "try:\n"
+        "    entrypoint.main(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(sorted({'openai', 'pathspec'} & set(sys.modules)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_cli_defaults_match_module_defaults(monkeypatch):
+    parsed, parsers = {}, []
+    parse_args = argparse.ArgumentParser.parse_args
+    monkeypatch.setattr(
+        argparse.ArgumentParser, "parse_args", lambda self, argv: parsers.append(self) or parse_args(self, argv)
+    )
+    monkeypatch.setattr(entrypoint, "run", lambda args: parsed.update(vars(args)) or 0)
+    assert entrypoint.main(["--repo-map", "--profile-sample"]) == 0
+
+    assert parsed["concurrency"] == batch.CONCURRENCY
+    assert parsed["pool_size"] == providers.ClientOptions.max_connections
+    assert parsed["keepalive"] == providers.ClientOptions.keepalive_expiry
+    assert parsed["request_timeout"] == providers.ClientOptions.timeout
+    assert parsed["connect_timeout"] == providers.ClientOptions.connect_timeout
+    assert parsed["repo_map"] == repomap.BUDGET_TOKENS
+    assert parsed["profile_sample"] == profiler.SAMPLE_INTERVAL * 1000
+    choices = next(a.choices for a in parsers[0]._actions if a.dest == "llm_cache")
+    assert choices == list(llm_cache.MODES)
@@ -0,0 +1,210 @@
+import time
+import openai
+import pytest
+import asyncio
+import threading
+from types import SimpleNamespace
+from source_agent.failover import Fallback, ProviderChain, CircuitBreaker, get_breaker
+from source_agent.telemetry import LLMCallStats
+from source_agent.agents.code import CodeAgent, AgentEventType
+
+
+def test_circuit_breaker_opens_and_probes_after_cooldown():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.available()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # The single trial request
+    assert not breaker.available()
+    breaker.record_failure()
+    assert not breaker.available()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open and breaker.available()
+
+
+def test_chain_fails_over_and_trips_breakers():
+    def fn(target):
+        if target == "primary":
+            raise ConnectionError("down")
+        return f"from {target}"
+
+    chain = ProviderChain([("a", "primary"), ("b", "secondary")])
+    stats = LLMCallStats()
+    for _ in range(3):
+        assert chain.call(fn, stats=stats) == ("from secondary", "secondary")
+    assert stats.failovers == 3
+    assert get_breaker("a").is_open
+
+    # With the primary's breaker open it is skipped entirely
+    assert chain.call(fn, stats=stats) == ("from secondary", "secondary")
+    assert stats.failovers == 3
+
+
+def test_chain_skips_provider_whose_breaker_refuses(monkeypatch):
+    calls = []
+
+    def fn(target):
+        calls.append(target)
+        return target
+
+    # The breaker lost its half-open trial to another request after candidates()
+    monkeypatch.setattr(get_breaker("a"), "allow", lambda: False)
+    chain = ProviderChain([("a", "primary"), ("b", "secondary")])
+    assert chain.call(fn) == ("secondary", "secondary")
+    assert calls == ["secondary"]
+
+
+def test_chain_hedges_slow_primary():
+    def fn(target):
+        if target == "slow":
+            time.sleep(0.5)
+        return target
+
+    stats = LLMCallStats()
+    started = time.perf_counter()
+    result = ProviderChain([("a", "slow"), ("b", "fast")], hedge_after=0.05).call(fn, stats)
+    assert result == ("fast", "fast")
+    assert time.perf_counter() - started < 0.4
+    assert stats.hedges == 1
+
+    # Streams only fail over
+    result = ProviderChain([("a", "slow"), ("b", "fast")], hedge_after=0.05).call(fn, hedge=False)
+    assert result == ("slow", "slow")
+
+
+def test_chain_raises_request_errors_without_failover():
+    calls = []
+
+    def fn(target):
+        calls.append(target)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        ProviderChain([("a", 1), ("b", 2)]).call(fn)
+    assert calls == [1]
+    assert not get_breaker("a").is_open
+
+
+def test_async_chain_hedges_and_cancels_loser():
+    cancelled = []
+
+    async def fn(target):
+        if target == "slow":
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(target)
+                raise
+        return target
+
+    async def main():
+        chain = ProviderChain([("a", "slow"), ("b", "fast")], hedge_after=0.02)
+        result = await chain.acall(fn)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == ("fast", "fast")
+    assert cancelled == ["slow"]
+
+
+def test_agent_fails_over_to_fallback_model(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+
+    def call_llm(self, messages, **kwargs):
+        if self.base_url == "primary":
+            self.llm_call_stats.attempts += 1
+            raise ConnectionError("primary down")
+        self.llm_call_stats.attempts += 1
+        message = SimpleNamespace(content=f"{self.model} answered", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    monkeypatch.setattr(CodeAgent, "call_llm", call_llm)
+    agent = CodeAgent(
+        base_url="primary",
+        model="big",
+        system_prompt="SP",
+        fallbacks=[Fallback(base_url="backup", api_key="k", model="small")],
+    )
+    events = list(agent.run(user_prompt="hi", max_steps=1))
+
+    messages = [e for e in events if e.type == AgentEventType.AGENT_MESSAGE]
+    assert messages[0].data["content"] == "small answered"
+    usage = next(e for e in events if e.type == AgentEventType.LLM_USAGE)
+    assert usage.data["failovers"] == 1
+    assert usage.data["attempts"] == 2
+    assert events[-1].data["llm"]["failovers"] == 1
+
+
+def test_losing_hedge_cannot_touch_the_primary_stats(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    release, finished = threading.Event(), threading.Event()
+
+    def call_llm(self, messages, **kwargs):
+        self.llm_call_stats.attempts += 1
+        if self.base_url == "primary":
+            release.wait(5)
+            self.llm_call_stats.retries += 1  # Lands after the fallback won
+            finished.set()
+        message = SimpleNamespace(content=f"{self.model} answered", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    monkeypatch.setattr(CodeAgent, "call_llm", call_llm)
+    agent = CodeAgent(
+        base_url="primary",
+        model="big",
+        system_prompt="SP",
+        fallbacks=[Fallback(base_url="backup", api_key="k", model="small")],
+        hedge_after=0.01,
+    )
+    assert agent.fallback_agents[0].token_estimator is not agent.token_estimator
+
+    events = list(agent.run(user_prompt="hi", max_steps=1))
+    usage = next(e for e in events if e.type == AgentEventType.LLM_USAGE)
+    assert usage.data["hedges"] == 1
+    assert usage.data["attempts"] == 1  # Only the winner had finished
+    stats = agent.llm_call_stats.as_dict()
+
+    release.set()
+    assert finished.wait(5)
+    assert agent.llm_call_stats.as_dict() == stats
+
+
+def test_agent_fails_over_without_retrying_the_primary(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    monkeypatch.setattr("source_agent.agents.code.time.sleep", lambda seconds: None)
+    calls = []
+
+    def session(base_url):
+        def create(**kwargs):
+            calls.append(base_url)
+            if base_url == "primary":
+                raise openai.APIConnectionError(request=None)
+            message = SimpleNamespace(content="answered", tool_calls=None)
+            response = SimpleNamespace(
+                choices=[SimpleNamespace(message=message)], usage=None
+            )
+            return SimpleNamespace(headers={}, parse=lambda: response)
+
+        completions = SimpleNamespace(with_raw_response=SimpleNamespace(create=create))
+        return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    monkeypatch.setattr(
+        CodeAgent, "_create_session", lambda self: session(self.base_url)
+    )
+    agent = CodeAgent(
+        base_url="primary",
+        model="big",
+        system_prompt="SP",
+        fallbacks=[Fallback(base_url="backup", api_key="k", model="small")],
+    )
+    events = list(agent.run(user_prompt="hi", max_steps=1))
+
+    assert calls == ["primary", "backup"]
+    usage = next(e for e in events if e.type == AgentEventType.LLM_USAGE)
+    assert usage.data["failovers"] == 1 and usage.data["retries"] == 0
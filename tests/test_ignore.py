@@ -0,0 +1,124 @@
+import pytest
+from source_agent import ignore
+from source_agent.ignore import IgnoreRules, load_rules, global_excludes_file
+from source_agent.tools.file_list_tool import file_list_tool
+from source_agent.tools.file_search_tool import file_search_tool
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    # No global excludes from the machine running the tests
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", str(tmp_path / "gitconfig"))
+    root = tmp_path / "repo"
+    (root / ".git" / "info").mkdir(parents=True)
+    (root / "src" / "gen").mkdir(parents=True)
+    (root / "src" / "keep").mkdir()
+    (root / ".gitignore").write_text("*.log\nbuild/\n")
+    (root / "src" / ".gitignore").write_text("gen/\n*.tmp\n!important.log\n")
+    for rel in [
+        "app.py",
+        "debug.log",
+        "build/out.py",
+        "src/main.py",
+        "src/scratch.tmp",
+        "src/important.log",
+        "src/gen/code.py",
+        "src/keep/data.py",
+    ]:
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text("needle\n")
+    monkeypatch.chdir(root)
+    yield root
+    ignore.clear_rules()
+
+
+def test_nested_gitignores(repo):
+    rules = IgnoreRules(repo)
+    assert rules.is_ignored("debug.log")
+    assert rules.is_ignored("build", is_dir=True)
+    assert rules.is_ignored("build/out.py")
+    assert rules.is_ignored("src/scratch.tmp")
+    assert rules.is_ignored("src/gen", is_dir=True)
+    assert rules.is_ignored("src/gen/code.py")
+    # A deeper .gitignore re-includes what the root one excludes
+    assert not rules.is_ignored("src/important.log")
+    assert not rules.is_ignored("src/main.py")
+    # Patterns are relative to the directory of their .gitignore
+    assert not rules.is_ignored("gen", is_dir=True)
+    assert rules.match_file("src/gen/") and not rules.match_file("src/keep/")
+
+
+def test_ignored_directory_cannot_be_reincluded(repo):
+    (repo / ".gitignore").write_text("build/\n!build/out.py\n")
+    assert IgnoreRules(repo).is_ignored("build/out.py")
+
+
+def test_info_exclude_and_global_excludes(repo, tmp_path):
+    (repo / ".git" / "info" / "exclude").write_text("app.py\n")
+    (tmp_path / "config" / "git").mkdir(parents=True)
+    (tmp_path / "config" / "git" / "ignore").write_text("*.py\n")
+    rules = IgnoreRules(repo)
+    assert rules.is_ignored("app.py")
+    assert rules.is_ignored("src/main.py")
+    assert not IgnoreRules(repo, global_excludes=False).is_ignored("src/main.py")
+
+    # core.excludesFile overrides the default location
+    custom = tmp_path / "excludes"
+    custom.write_text("main.py\n")
+    (tmp_path / "gitconfig").write_text(
+        f'[user]\n\tname = someone\n[core]\n\texcludesFile = "{custom}" # ours\n'
+    )
+    assert global_excludes_file() == str(custom)
+    rules = IgnoreRules(repo)
+    assert rules.is_ignored("src/main.py") and not rules.is_ignored("src/keep/data.py")
+
+
+def test_root_below_repository_top(repo):
+    # Rules from .gitignore files above the root still apply
+    rules = IgnoreRules(repo / "src")
+    assert rules.is_ignored("gen", is_dir=True)
+    assert rules.is_ignored("scratch.tmp")
+    assert not rules.is_ignored("important.log")
+    (repo / "src" / "keep" / "other.log").write_text("")
+    assert IgnoreRules(repo / "src" / "keep").is_ignored("other.log")
+
+
+def test_rules_cached_until_changed(repo):
+    path = str(repo / ".gitignore")
+    spec = load_rules(path)
+    assert load_rules(path) is spec
+    (repo / ".gitignore").write_text("*.log\nbuild/\napp.py\n")
+    assert load_rules(path) is not spec
+    assert IgnoreRules(repo).is_ignored("app.py")
+    assert load_rules(str(repo / "missing")) is None
+
+
+def test_file_tools_honor_nested_rules(repo):
+    listed = file_list_tool(recursive=True)["files"]
+    assert listed == [
+        ".git",
+        ".git/info",
+        ".gitignore",
+        "app.py",
+        "src",
+        "src/.gitignore",
+        "src/important.log",
+        "src/keep",
+        "src/keep/data.py",
+        "src/main.py",
+    ]
+    assert file_list_tool("src")["files"] == [
+        "src/.gitignore",
+        "src/important.log",
+        "src/keep/",
+        "src/main.py",
+    ]
+
+    res = file_search_tool(name="*", pattern="needle")
+    assert res["content"] == [
+        "app.py:1:needle",
+        "src/important.log:1:needle",
+        "src/main.py:1:needle",
+        "src/keep/data.py:1:needle",
+    ]
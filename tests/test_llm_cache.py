@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import pytest
+from openai.types.chat import ChatCompletionMessage
+from source_agent.llm_cache import RECORD, REPLAY, READ_THROUGH, ResponseCache, CacheMissError
+from source_agent.agents.code import CodeAgent, AgentEventType
+
+
+def test_key_is_stable_and_sensitive_to_messages():
+    a = ResponseCache.key({"model": "m", "messages": [{"role": "user", "content": "hi"}]})
+    b = ResponseCache.key({"messages": [{"content": "hi", "role": "user"}], "model": "m"})
+    c = ResponseCache.key({"model": "m", "messages": [{"role": "user", "content": "ho"}]})
+    assert a == b
+    assert a != c
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = ResponseCache(directory=tmp_path)
+    cache.put("ab12", {"message": {"role": "assistant", "content": "x"}})
+    assert cache.get("ab12")["message"]["content"] == "x"
+    assert cache.get("cd34") is None
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ResponseCache(directory=tmp_path, max_bytes=250)
+    for i, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.put(key, {"payload": "x" * 60})
+        past = time.time() - 100 + i
+        os.utime(cache._path(key), (past, past))
+
+    cache.get("aa01")  # refresh the oldest entry
+    cache.put("dd04", {"payload": "x" * 60})
+
+    assert cache.get("bb02") is None
+    assert cache.get("aa01") is not None
+    assert cache.get("dd04") is not None
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        ResponseCache(mode="sometimes")
+
+
+class Response:
+    def __init__(self, content, tool_calls=None):
+        message = ChatCompletionMessage(role="assistant", content=content, tool_calls=tool_calls)
+        self.choices = [type("Choice", (), {"message": message})]
+        self.usage = None
+
+
+def make_agent(monkeypatch, tmp_path, mode, **kwargs):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    cache = ResponseCache(directory=tmp_path, mode=mode)
+    return CodeAgent(system_prompt="SP", model="m", response_cache=cache, **kwargs)
+
+
+def test_read_through_then_replay(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_call_llm(messages):
+        calls.append(messages)
+        return Response("recorded")
+
+    agent = make_agent(monkeypatch, tmp_path, READ_THROUGH)
+    agent.call_llm = fake_call_llm
+    list(agent.run(user_prompt="hi", max_steps=1))
+    list(make_agent(monkeypatch, tmp_path, READ_THROUGH).run(user_prompt="hi", max_steps=1))
+    assert len(calls) == 1
+
+    replay = make_agent(monkeypatch, tmp_path, REPLAY)
+    replay.call_llm = lambda messages: pytest.fail("replay must not call the model")
+    events = list(replay.run(user_prompt="hi", max_steps=1))
+    message = next(e for e in events if e.type == AgentEventType.AGENT_MESSAGE)
+    assert message.data["content"] == "recorded"
+
+
+def test_replay_miss_is_an_error(monkeypatch, tmp_path):
+    agent = make_agent(monkeypatch, tmp_path, REPLAY)
+    events = list(agent.run(user_prompt="never seen", max_steps=1))
+    assert events[-2].type == AgentEventType.ERROR
+    assert events[-2].data["exception_type"] == CacheMissError.__name__
+
+
+def test_record_mode_always_calls_model(monkeypatch, tmp_path):
+    calls = []
+    for _ in range(2):
+        agent = make_agent(monkeypatch, tmp_path, RECORD)
+        agent.call_llm = lambda messages: calls.append(1) or Response("r")
+        list(agent.run(user_prompt="hi", max_steps=1))
+    assert len(calls) == 2
+
+
+def test_replay_hits_after_a_spilled_result(monkeypatch, tmp_path):
+    monkeypatch.setenv("SOURCE_AGENT_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    big_call = {"id": "1", "type": "function", "function": {"name": "big", "arguments": "{}"}}
+
+    def scripted_call_llm(messages):
+        if messages[-1]["role"] == "user":
+            return Response(None, [big_call])
+        return Response(f"see {json.loads(messages[-1]['content'])['artifact']}")
+
+    runs = []
+    for mode in (READ_THROUGH, REPLAY):
+        # Every agent spills into its own, randomly named artifact session
+        agent = make_agent(monkeypatch, tmp_path / "llm", mode, artifact_threshold=50)
+        agent.tool_mapping = {"big": lambda: "y" * 500}
+        agent.call_llm = scripted_call_llm if mode == READ_THROUGH else None
+        events = list(agent.run(user_prompt="hi", max_steps=2))
+        runs.append((agent, next(e for e in events if e.type == AgentEventType.AGENT_MESSAGE)))
+
+    (recorded, first), (replayed, second) = runs
+    assert recorded.artifact_store.session_id != replayed.artifact_store.session_id
+    # The replayed handle points into the replaying run's own store
+    assert first.data["content"].startswith(f"see {recorded.artifact_store.session_id}/")
+    assert second.data["content"] == first.data["content"].replace(
+        recorded.artifact_store.session_id, replayed.artifact_store.session_id
+    )
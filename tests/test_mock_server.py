@@ -0,0 +1,79 @@
+import json
+import pytest
+from source_agent import entrypoint
+from source_agent.loop_bench import format_report, run_loop_benchmark
+from source_agent.agents.code import CodeAgent, AgentEventType
+from source_agent.mock_server import MockServer, load_scenario
+
+
+SCENARIO = {
+    "name": "test",
+    "usage": {"prompt_tokens": 10, "completion_tokens": 2},
+    "steps": [
+        {
+            "content": "Checking the date first.",
+            "chunk_size": 4,
+            "tool_calls": [{"name": "get_current_date", "arguments": {}}],
+            "errors": [{"status": 429, "headers": {"retry-after": "0"}}],
+        },
+        {"tool_calls": [{"name": "msg_complete_tool", "arguments": {}}]},
+    ],
+}
+
+
+def test_load_bundled_and_file_scenarios(tmp_path):
+    assert load_scenario("basic")["name"] == "basic"
+
+    path = tmp_path / "empty.json"
+    path.write_text(json.dumps({"steps": []}))
+    with pytest.raises(ValueError, match="no steps"):
+        load_scenario(path)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_agent_runs_against_mock_server(stream):
+    with MockServer(SCENARIO) as server:
+        agent = CodeAgent(
+            api_key="mock", base_url=server.base_url, model="mock", system_prompt="SP", stream=stream
+        )
+        events = list(agent.run(user_prompt=f"stream={stream}"))
+
+        assert server.requests == 3
+        assert server.errors_served == 1
+
+    types = [e.type for e in events]
+    assert AgentEventType.TASK_COMPLETE in types
+    result = next(e for e in events if e.type == AgentEventType.TOOL_RESULT)
+    assert result.data["name"] == "get_current_date"
+    assert (AgentEventType.AGENT_MESSAGE_DELTA in types) == stream
+
+    summary = events[-1].data
+    assert summary["llm"]["retries"] == 1
+    assert summary["tokens"]["prompt_tokens"] == 20
+
+
+def test_loop_benchmark_report():
+    report = run_loop_benchmark(SCENARIO, runs=3, concurrency=2)
+    assert report["steps"] == 6
+    assert report["llm_calls"] == 6
+    assert report["retries"] == 3
+    assert report["steps_per_second"] > 0
+    assert report["client_overhead_per_call_seconds"] >= 0
+    assert "steps/s" in format_report(report)
+    assert report["peak_rss_mb"] > 0
+
+
+def test_loop_benchmark_report_without_resource_module(monkeypatch):
+    # Windows has no `resource` module, so RSS is left out of the report
+    monkeypatch.setattr("source_agent.loop_bench.resource", None)
+    report = run_loop_benchmark(SCENARIO, runs=1)
+    assert "peak_rss_mb" not in report and "rss_growth_mb" not in report
+    assert "Memory" not in format_report(report)
+    assert "heap peak" in format_report(run_loop_benchmark(SCENARIO, runs=1, trace_memory=True))
+
+
+def test_loop_bench_subcommand(tmp_path, capsys):
+    path = tmp_path / "scenario.json"
+    path.write_text(json.dumps(SCENARIO))
+    assert entrypoint.main(["loop-bench", "--scenario", str(path), "--runs", "1", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["scenario"] == "test"
@@ -0,0 +1,76 @@
+import json
+import time
+import pytest
+from source_agent import profiler
+from source_agent.agents.code import CodeAgent
+from source_agent.mock_server import MockServer
+
+
+SCENARIO = {
+    "name": "profile",
+    "steps": [
+        {"tool_calls": [{"name": "get_current_date", "arguments": {}}]},
+        {"tool_calls": [{"name": "msg_complete_tool", "arguments": {}}]},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def stop_profiler():
+    yield
+    profiler.stop()
+
+
+def test_span_is_a_shared_noop_when_disabled():
+    assert profiler.active() is None
+    assert profiler.span("a") is profiler.span("b")
+    with profiler.span("a"):
+        pass
+
+
+def test_nested_spans_and_errors():
+    p = profiler.start()
+    with profiler.span("outer", "test", key=1):
+        with profiler.span("inner"):
+            time.sleep(0.001)
+    with pytest.raises(ValueError):
+        with profiler.span("failing"):
+            raise ValueError("x")
+    assert profiler.stop() is p
+
+    events = {e["name"]: e for e in p.trace()["traceEvents"] if e["ph"] == "X"}
+    outer, inner = events["outer"], events["inner"]
+    assert outer["args"] == {"key": 1} and outer["cat"] == "test"
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert events["failing"]["args"] == {"error": "ValueError"}
+
+
+def test_agent_run_trace(tmp_path):
+    profiler.start()
+    with MockServer(SCENARIO) as server:
+        agent = CodeAgent(api_key="mock", base_url=server.base_url, model="mock", system_prompt="SP")
+        agent.tool_mapping = {"get_current_date": lambda: {"success": True}}
+        list(agent.run(user_prompt="go"))
+    profiler.stop().write(tmp_path / "trace.json")
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    names = [e["name"] for e in trace["traceEvents"] if e["ph"] == "X"]
+    for name in ["run", "llm_call", "http_request", "parse_response", "get_current_date", "serialize_result"]:
+        assert name in names
+    assert names.count("llm_call") == 2
+
+
+def busy_tool():
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampling_shows_hot_spots():
+    p = profiler.start(sample_interval=0.002)
+    busy_tool()
+    profiler.stop()
+
+    samples = [e for e in p.trace()["traceEvents"] if e.get("cat") == "sample"]
+    assert any(e["name"].startswith("busy_tool (test_profiler.py") for e in samples)
@@ -0,0 +1,64 @@
+import pytest
+from openai.types.chat import ChatCompletionMessage
+from source_agent.agents.code import CodeAgent, AgentEventType
+from source_agent.prompt_cache import EXPLICIT, CACHE_CONTROL, usage_tokens, apply_cache_breakpoints
+
+
+def test_apply_cache_breakpoints_marks_system_and_latest_turn():
+    assistant = ChatCompletionMessage(role="assistant", content="thinking")
+    messages = [
+        {"role": "system", "content": "SP"},
+        {"role": "user", "content": "hi"},
+        assistant,
+        {"role": "tool", "tool_call_id": "1", "name": "t", "content": "result"},
+    ]
+    marked = apply_cache_breakpoints(messages)
+
+    assert marked[0]["content"] == [{"type": "text", "text": "SP", "cache_control": CACHE_CONTROL}]
+    assert marked[3]["content"][0]["cache_control"] == CACHE_CONTROL
+    assert marked[1] == {"role": "user", "content": "hi"}
+    assert marked[2] is assistant
+    # Original conversation stays byte-stable
+    assert messages[0] == {"role": "system", "content": "SP"}
+    assert messages[3]["content"] == "result"
+
+
+@pytest.mark.parametrize(
+    "usage,cached",
+    [
+        ({"prompt_tokens": 100, "completion_tokens": 5, "prompt_tokens_details": {"cached_tokens": 80}}, 80),
+        ({"prompt_tokens": 100, "completion_tokens": 5, "prompt_cache_hit_tokens": 60}, 60),
+        ({"prompt_tokens": 100, "completion_tokens": 5, "cache_read_input_tokens": 40}, 40),
+        ({"prompt_tokens": 100, "completion_tokens": 5}, 0),
+    ],
+)
+def test_usage_tokens_normalizes_providers(usage, cached):
+    tokens = usage_tokens(usage)
+    assert tokens["cached_tokens"] == cached
+    assert tokens["uncached_tokens"] == 100 - cached
+    assert tokens["completion_tokens"] == 5
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    return CodeAgent(system_prompt="SP", prompt_cache=EXPLICIT)
+
+
+def test_completion_kwargs_add_breakpoints_without_mutating(agent):
+    kwargs = agent._completion_kwargs(agent.messages)
+    assert kwargs["messages"][0]["content"][0]["cache_control"] == CACHE_CONTROL
+    assert agent.messages[0]["content"] == "SP"
+
+
+def test_run_reports_cached_tokens(agent):
+    class Response:
+        usage = {"prompt_tokens": 50, "completion_tokens": 2, "prompt_tokens_details": {"cached_tokens": 30}}
+        choices = [type("Choice", (), {"message": ChatCompletionMessage(role="assistant", content="hi")})]
+
+    agent.call_llm = lambda messages: Response()
+    events = list(agent.run(user_prompt="hi", max_steps=1))
+    usage = next(e for e in events if e.type == AgentEventType.LLM_USAGE)
+    assert usage.data["cached_tokens"] == 30
+    assert usage.data["uncached_tokens"] == 20
+    assert usage.data["step"] == 1
@@ -45,3 +45,40 @@ def test_all_providers_have_valid_config(provider):
     config = PROVIDERS[provider]
     assert isinstance(config.env_var, str) and config.env_var
     assert isinstance(config.base_url, str) and config.base_url.startswith("http")
+    assert config.prompt_cache in ("explicit", "implicit", "none")
+
+
+def test_clients_are_shared_per_endpoint():
+    """
+    Test that agents talking to the same endpoint share one pooled client.
+    """
+    from source_agent.providers import ClientOptions, get_client, configure_clients
+
+    first = get_client("https://api.groq.com/v1", "key-a")
+    assert get_client("https://api.groq.com/v1", "key-a") is first
+    assert get_client("https://api.groq.com/v1", "key-b") is not first
+
+    configure_clients(ClientOptions(max_connections=5, timeout=30.0, connect_timeout=2.0))
+    try:
+        client = get_client("https://api.groq.com/v1", "key-a")
+        assert client is not first
+        assert client.timeout.read == 30.0
+        assert client.timeout.connect == 2.0
+    finally:
+        configure_clients(ClientOptions())
+
+
+def test_async_clients_are_shared_per_event_loop():
+    """
+    Test that async clients are only reused within one running event loop.
+    """
+    import asyncio
+    from source_agent.providers import get_async_client
+
+    async def pair():
+        return get_async_client("https://api.x.ai/v1", "k"), get_async_client("https://api.x.ai/v1", "k")
+
+    first, second = asyncio.run(pair())
+    assert first is second
+    assert asyncio.run(pair())[0] is not first
+    assert get_async_client("https://api.x.ai/v1", "k") is not first
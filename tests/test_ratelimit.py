@@ -0,0 +1,122 @@
+import openai
+import pytest
+from types import SimpleNamespace
+from source_agent.ratelimit import (
+    RateLimiter,
+    TokenBucket,
+    get_limiter,
+    retry_after,
+    is_transient,
+    parse_duration,
+)
+from source_agent.agents.code import CodeAgent
+
+
+def status_error(cls, status, headers=None):
+    error = cls.__new__(cls)
+    error.status_code = status
+    error.response = SimpleNamespace(headers=headers or {})
+    return error
+
+
+def test_parse_duration_and_retry_after():
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("soon") is None
+    assert retry_after({"retry-after": "3"}) == 3
+    assert retry_after({"retry-after-ms": "250", "retry-after": "3"}) == 0.25
+    assert retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0
+    assert retry_after({}) is None
+
+
+def test_is_transient():
+    assert is_transient(status_error(openai.RateLimitError, 429))
+    assert is_transient(status_error(openai.APIStatusError, 408))
+    assert is_transient(status_error(openai.InternalServerError, 503))
+    assert not is_transient(status_error(openai.BadRequestError, 400))
+    assert not is_transient(ValueError("no status"))
+
+
+def test_bucket_queues_reservations_at_refill_rate():
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    assert bucket.reserve(1, now=bucket.updated) == 0
+    assert bucket.reserve(1, now=bucket.updated) == 0
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(1)
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(2)
+
+
+def test_limiter_learns_from_headers():
+    limiter = RateLimiter()
+    assert limiter.reserve(1000) == 0  # No limits known yet
+    limiter.update(
+        {
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "1s",
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "500",
+            "x-ratelimit-reset-tokens": "30s",
+        }
+    )
+    assert limiter.tracks_tokens
+    # Requests refill at 60/s from empty, tokens at 500/30s with 500 left
+    assert 0 < limiter.reserve(100) < 0.1
+    assert limiter.reserve(600) == pytest.approx((200) / (500 / 30), rel=0.05)
+
+    limiter.block(5)
+    assert limiter.reserve() > 4
+
+
+def test_limiters_are_shared_per_endpoint(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    first = CodeAgent(base_url="https://api.groq.com/v1", system_prompt="SP")
+    second = CodeAgent(base_url="https://api.groq.com/v1", system_prompt="SP")
+    assert first.rate_limiter is second.rate_limiter is get_limiter("https://api.groq.com/v1")
+
+
+def make_agent(monkeypatch, errors):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    agent = CodeAgent(base_url="u", system_prompt="SP")
+    calls = []
+
+    class Raw:
+        headers = {"x-ratelimit-limit-requests": "10", "x-ratelimit-remaining-requests": "9"}
+
+        def parse(self):
+            return "ok"
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        if errors:
+            raise errors.pop(0)
+        return Raw()
+
+    completions = SimpleNamespace(with_raw_response=SimpleNamespace(create=create))
+    agent.session = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return agent, calls
+
+
+def test_call_llm_does_not_retry_client_errors(monkeypatch):
+    agent, calls = make_agent(monkeypatch, [status_error(openai.BadRequestError, 400)])
+    sleeps = []
+    monkeypatch.setattr("source_agent.agents.code.time.sleep", sleeps.append)
+    with pytest.raises(openai.BadRequestError):
+        agent.call_llm(agent.messages)
+    assert len(calls) == 1
+    assert agent.llm_call_stats.retries == 0
+
+
+def test_call_llm_honors_retry_after(monkeypatch):
+    error = status_error(openai.RateLimitError, 429, {"retry-after": "7"})
+    agent, calls = make_agent(monkeypatch, [error])
+    sleeps = []
+    monkeypatch.setattr("source_agent.agents.code.time.sleep", sleeps.append)
+
+    assert agent.call_llm(agent.messages) == "ok"
+    assert len(calls) == 2
+    assert 7 in sleeps
+    assert agent.llm_call_stats.backoff_seconds == 7
+    # The block applies to every session sharing the limiter
+    assert agent.rate_limiter.blocked_until > 0
+    assert agent.rate_limiter.requests.capacity == 10
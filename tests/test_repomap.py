@@ -0,0 +1,82 @@
+import os
+import pytest
+import source_agent.repomap as repomap
+from source_agent.repomap import RepoMap, outline_python
+from source_agent.agents.code import CodeAgent
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_AGENT_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "__init__.py").write_text("")
+    (root / "pkg" / "core.py").write_text(
+        "class Engine:\n    def start(self):\n        pass\n\n\n"
+        "def run(config, *args):\n    pass\n\n\n"
+        "def _helper():\n    pass\n"
+    )
+    (root / "pkg" / "cli.py").write_text("from .core import run\n\n\ndef main(argv):\n    run(argv)\n")
+    (root / "pkg" / "extra.py").write_text("from pkg import core\n\n\ndef extra():\n    pass\n")
+    (root / "tests").mkdir()
+    (root / "tests" / "test_core.py").write_text("from pkg.core import run\n\n\ndef test_run():\n    pass\n")
+    (root / "build").mkdir()
+    (root / "build" / "junk.py").write_text("def junk():\n    pass\n")
+    (root / "secret.log").write_text("x")
+    (root / ".gitignore").write_text("*.log\n")
+    (root / "pyproject.toml").write_text("[project]\nname = 'pkg'\n")
+    return root
+
+
+def test_outline_python():
+    symbols, imports = outline_python(
+        "import os\nfrom . import a\nfrom ..b import c\nclass A: pass\nasync def f(x, *rest): pass\ndef _p(): pass\n"
+    )
+    assert symbols == ["class A", "def f(x, *rest)"]
+    assert imports == ["os", ".", ".a", "..b", "..b.c"]
+
+
+def test_map_outlines_ranked_files(workspace):
+    text = RepoMap(workspace).render()
+    lines = text.splitlines()[1:]
+
+    assert "pkg/core.py: class Engine, def run(config, *args)" in lines
+    assert "pkg/cli.py: def main(argv)" in lines
+    assert not any("junk" in line or "secret" in line or "gitignore" in line for line in lines)
+
+    ranked = RepoMap(workspace).rank(RepoMap(workspace).outlines())
+    assert ranked[0] == "pyproject.toml"
+    assert ranked[1] == "pkg/core.py"  # Imported by three files
+    assert ranked[-1] == "tests/test_core.py"
+
+
+def test_map_fits_budget(workspace):
+    text = RepoMap(workspace, budget_tokens=30).render()
+    assert len(text) <= 30 * 4 + 40
+    assert "pkg/core.py" in text
+    assert "more files not shown" in text
+
+
+def test_map_cache_only_reparses_changed_files(workspace, monkeypatch):
+    RepoMap(workspace).render()
+
+    parsed = []
+    original = repomap.outline_python
+    monkeypatch.setattr(repomap, "outline_python", lambda source: parsed.append(source) or original(source))
+
+    RepoMap(workspace).render()
+    assert parsed == []
+
+    core = workspace / "pkg" / "core.py"
+    core.write_text("def renamed():\n    pass\n")
+    os.utime(core, ns=(1, 1))
+    text = RepoMap(workspace).render()
+    assert len(parsed) == 1
+    assert "pkg/core.py: def renamed()" in text
+
+
+def test_agent_appends_repo_map_to_system_prompt(workspace, monkeypatch):
+    monkeypatch.chdir(workspace)
+    agent = CodeAgent(api_key="k", base_url="http://localhost", model="m", system_prompt="SP", repo_map=500)
+    assert agent.system_prompt.startswith("SP\n\n# Repository map")
+    assert "pkg/core.py" in agent.messages[0]["content"]
@@ -0,0 +1,251 @@
+import os
+import pytest
+import pathspec
+from source_agent import search
+from source_agent.tools.file_search_tool import file_search_tool
+
+
+def make_tree(root):
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "b.py").write_text("import os\nTODO: b\n")
+    (root / "src" / "a.py").write_text("TODO: a\n")
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "node_modules" / "dep" / "index.js").write_text("TODO: dep\n")
+    (root / "build").mkdir()
+    (root / "build" / "out.py").write_text("TODO: built\n")
+    (root / ".gitignore").write_text("build/\n*.log\n")
+    (root / "debug.log").write_text("TODO: log\n")
+    (root / "top.py").write_text("x = 1\n")
+
+
+def test_walk_prunes_before_descending(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    spec = pathspec.PathSpec.from_lines("gitwildmatch", ["build/", "*.log"])
+    visited = []
+    real_scandir = os.scandir
+
+    def spy(path):
+        visited.append(os.path.relpath(path, tmp_path))
+        return real_scandir(path)
+
+    monkeypatch.setattr(search.os, "scandir", spy)
+    files = list(search.walk(str(tmp_path), ignore=spec))
+
+    assert files == [".gitignore", "top.py", "src/a.py", "src/pkg/b.py"]
+    assert "node_modules" not in visited and "build" not in visited
+
+
+def test_walk_hidden(tmp_path):
+    make_tree(tmp_path)
+    assert ".gitignore" not in list(search.walk(str(tmp_path), hidden=False))
+
+
+def test_name_matcher():
+    assert search.name_matcher("*.py")("src/pkg/b.py")
+    assert not search.name_matcher("*.py")("src/pkg.py/readme")
+    assert search.name_matcher("pkg/*.py")("src/pkg/b.py")
+    assert not search.name_matcher("pkg/*.py")("src/a.py")
+
+
+def test_name_matcher_double_star_spans_directories(tmp_path, monkeypatch):
+    match = search.name_matcher("src/**/*.py")
+    assert match("src/y.py") and match("src/a/b/x.py") and match("lib/src/a/x.py")
+    assert not match("src/a/b/x.txt") and not match("other/a/x.py")
+    assert search.name_matcher("a/**/b/**/c.py")("a/b/c.py")
+    assert search.name_matcher("a/**/**/c.py")("a/x/y/c.py")
+    assert not search.name_matcher("a/**/c.py")("a/x/b.py")
+
+    monkeypatch.chdir(tmp_path)
+    for rel in ["src/y.py", "src/a/b/x.py", "src/a/b/z.txt", "docs/w.py"]:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text("")
+    res = file_search_tool(name="src/**/*.py")
+    assert sorted(res["content"]) == ["src/a/b/x.py", "src/y.py"]
+
+
+def test_parallel_scan_matches_sequential_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(search.os, "cpu_count", lambda: 2)
+    paths = []
+    for i in range(40):
+        path = f"f{i:02}.txt"
+        (tmp_path / path).write_text(f"hit {i}\nmiss\nHIT again\n")
+        paths.append(path)
+
+    sequential = list(search.scan(str(tmp_path), paths, "hit", ignore_case=True))
+    parallel = list(
+        search.scan(str(tmp_path), paths, "hit", ignore_case=True, parallel_min_files=0)
+    )
+
+    assert parallel == sequential
+    assert sequential[:2] == [
+        ("f00.txt", 1, "hit 0", True),
+        ("f00.txt", 3, "HIT again", True),
+    ]
+    assert len(sequential) == 80
+
+
+def test_file_search_skips_pruned_and_ignored(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_tree(tmp_path)
+
+    res = file_search_tool(name="*", pattern="TODO")
+
+    assert res["content"] == ["src/a.py:1:TODO: a", "src/pkg/b.py:2:TODO: b"]
+
+
+def test_file_search_subdirectory_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_tree(tmp_path)
+
+    res = file_search_tool(name="*.py", path="src", ext=[".py"])
+
+    assert res["content"] == ["src/a.py", "src/pkg/b.py"]
+
+
+def test_walk_resumes_at_start(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "src" / "z.py").write_text("")
+    everything = list(search.walk(str(tmp_path)))
+
+    for i, path in enumerate(everything):
+        assert list(search.walk(str(tmp_path), start=path)) == everything[i:]
+
+
+def test_scan_context_and_per_file_cap(tmp_path):
+    (tmp_path / "a.txt").write_text("x\nhit 1\ny\nz\nhit 2\nhit 3\nw\n")
+
+    lines = list(search.scan(str(tmp_path), ["a.txt"], "hit", context=1))
+    assert [(n, is_match) for _, n, _, is_match in lines] == [
+        (1, False),
+        (2, True),
+        (3, False),
+        (4, False),
+        (5, True),
+        (6, True),
+        (7, False),
+    ]
+
+    capped = list(search.scan(str(tmp_path), ["a.txt"], "hit", max_per_file=2))
+    assert [n for _, n, _, _ in capped] == [2, 5]
+    resumed = list(search.scan(str(tmp_path), ["a.txt"], "hit", resume=("a.txt", 2)))
+    assert [n for _, n, _, _ in resumed] == [5, 6]
+
+
+def test_file_search_pages_through_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src").mkdir()
+    for name in ("a.py", "b.py"):
+        (tmp_path / "src" / name).write_text("TODO 1\nTODO 2\nTODO 3\n")
+
+    pages, cursor = [], None
+    while True:
+        res = file_search_tool(
+            name="*.py", pattern="TODO", path="src", max_results=2, cursor=cursor
+        )
+        pages.append(res["content"])
+        cursor = res.get("next_cursor")
+        if cursor is None:
+            break
+
+    assert pages == [
+        ["src/a.py:1:TODO 1", "src/a.py:2:TODO 2"],
+        ["src/a.py:3:TODO 3", "src/b.py:1:TODO 1"],
+        ["src/b.py:2:TODO 2", "src/b.py:3:TODO 3"],
+    ]
+
+
+def test_file_search_cursor_skips_capped_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ("a.py", "b.py", "c.py"):
+        (tmp_path / name).write_text("TODO 1\nTODO 2\n")
+
+    res = file_search_tool(name="*.py", pattern="TODO", max_results=1, max_per_file=1)
+    assert res["content"] == ["a.py:1:TODO 1"] and res["next_cursor"] == "a.py"
+
+    res = file_search_tool(
+        name="*.py", pattern="TODO", max_per_file=1, cursor=res["next_cursor"]
+    )
+    assert res["content"] == ["b.py:1:TODO 1", "c.py:1:TODO 1"]
+    assert "next_cursor" not in res
+
+    res = file_search_tool(name="*.py", max_results=2)
+    assert res["content"] == ["a.py", "b.py"] and res["next_cursor"] == "b.py"
+    res = file_search_tool(name="*.py", cursor=res["next_cursor"])
+    assert res["content"] == ["c.py"]
+
+
+@pytest.mark.parametrize("max_results", [0, -1])
+def test_file_search_rejects_max_results_below_one(tmp_path, monkeypatch, max_results):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text("TODO\n")
+    res = file_search_tool(name="*.py", pattern="TODO", max_results=max_results)
+    assert not res["success"]
+    assert res["content"] == [f"Error: max_results must be at least 1 - {max_results}"]
+
+
+def test_file_search_stops_walking_at_max_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(50):
+        (tmp_path / f"d{i:02}").mkdir()
+        (tmp_path / f"d{i:02}" / "f.txt").write_text("needle\n")
+    listed = []
+    real_scandir = os.scandir
+
+    def spy(path):
+        listed.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(search.os, "scandir", spy)
+    res = file_search_tool(name="*.txt", pattern="needle", max_results=1)
+
+    assert res["content"] == ["d00/f.txt:1:needle"]
+    assert len(listed) < 10
+
+
+def test_scan_skips_binary_files(tmp_path):
+    (tmp_path / "blob.bin").write_bytes(b"needle\x00\x01\x02needle\n")
+    (tmp_path / "text.txt").write_bytes(b"needle\n")
+
+    lines = list(search.scan(str(tmp_path), ["blob.bin", "text.txt"], "needle"))
+
+    assert lines == [("text.txt", 1, "needle", True)]
+
+
+@pytest.mark.parametrize("mmap_min_bytes", [1 << 20, 16])
+def test_scan_file_byte_search(tmp_path, monkeypatch, mmap_min_bytes):
+    monkeypatch.setattr(search, "SNIFF_BYTES", 8)
+    monkeypatch.setattr(search, "MMAP_MIN_BYTES", mmap_min_bytes)
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(b"one\r\nTwo needle\r\nthree\r\n\r\nfour NEEDLE$\r\nfive")
+
+    def find(pattern, regex=False, ignore_case=False, context=0):
+        lines = search.scan(
+            str(tmp_path), ["crlf.txt"], pattern, regex, ignore_case, context=context
+        )
+        return [(n, line, is_match) for _, n, line, is_match in lines]
+
+    assert find("needle") == [(2, "Two needle", True)]
+    assert find("NEEDLE", ignore_case=True) == [
+        (2, "Two needle", True),
+        (5, "four NEEDLE$", True),
+    ]
+    # `$` still anchors at the end of a CRLF line
+    assert find(r"needle$", regex=True) == [(2, "Two needle", True)]
+    assert find(r"^f\w+", regex=True) == [(5, "four NEEDLE$", True), (6, "five", True)]
+    assert find("three", context=2) == [
+        (1, "one", False),
+        (2, "Two needle", False),
+        (3, "three", True),
+        (4, "", False),
+        (5, "four NEEDLE$", False),
+    ]
+    assert find("five", context=1) == [(5, "four NEEDLE$", False), (6, "five", True)]
+
+
+def test_literal_finder():
+    assert search.literal_finder(r"\d+", regex=True) is None
+    assert search.literal_finder("é", ignore_case=True) is None
+    find = search.literal_finder(r"def (\w+)_cache\(", regex=True)
+    assert find(b"x_cache(\ny_CACHE(", 0) == 1
+    find = search.literal_finder(r"def (\w+)_cache\(", regex=True, ignore_case=True)
+    assert find(b"y_CACHE(", 0) == 1
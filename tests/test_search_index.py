@@ -0,0 +1,110 @@
+import os
+import pytest
+from source_agent import search_index
+from source_agent.entrypoint import main
+from source_agent.search_index import TrigramIndex, query_trigrams
+from source_agent.tools.tool_registry import registry
+from source_agent.tools.file_search_tool import file_search_tool
+from source_agent.tools.search_index_tool import search_index_tool
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_AGENT_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "ws"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "alpha.py").write_text("def parse_config():\n    pass\n")
+    (root / "src" / "beta.py").write_text("def render_page():\n    pass\n")
+    (root / "notes.txt").write_text("Parse the CONFIG later\n")
+    monkeypatch.chdir(root)
+    yield root
+    search_index.clear_indexes()
+
+
+def test_query_trigrams():
+    assert query_trigrams("ab") == set()
+    assert query_trigrams("abcd") == {0x616263, 0x626364}
+    assert query_trigrams("ABC", ignore_case=True) == {0x616263}
+    # Only literal runs every match needs: not alternations or optional parts
+    assert query_trigrams(r"foo(bar|baz)x?", regex=True) == {0x666F6F}
+    assert query_trigrams(r"\w+", regex=True) == set()
+
+
+def test_candidates_narrow_and_keep_order(workspace):
+    index = TrigramIndex(workspace)
+    stats = index.update()
+    assert stats["files"] == 3 and stats["updated"] == 3
+
+    paths = ["notes.txt", "src/alpha.py", "src/beta.py"]
+    assert index.candidates(paths, "parse_config") == ["src/alpha.py"]
+    assert index.candidates(paths, "parse", ignore_case=True) == paths[:2]
+    assert index.candidates(paths, r"def \w+_page", regex=True) == ["src/beta.py"]
+    assert index.candidates(["alpha.py"], "parse", prefix="src/") == ["alpha.py"]
+
+
+def test_update_is_incremental(workspace):
+    index = TrigramIndex(workspace)
+    index.update()
+    (workspace / "src" / "beta.py").write_text("def parse_config_again():\n")
+    (workspace / "notes.txt").unlink()
+
+    stats = TrigramIndex(workspace).update()
+
+    assert stats["files"] == 2 and stats["updated"] == 1 and stats["removed"] == 1
+    index.load()
+    assert index.candidates(["src/alpha.py", "src/beta.py"], "config_again") == [
+        "src/beta.py"
+    ]
+
+
+def test_changed_files_are_kept_before_update(workspace):
+    index = TrigramIndex(workspace)
+    index.update()
+    beta = workspace / "src" / "beta.py"
+    beta.write_text("def parse_config():\n")
+    os.utime(beta, ns=(1, 1))
+
+    assert index.candidates(["src/beta.py"], "parse_config") == ["src/beta.py"]
+
+
+def test_corrupt_index_is_ignored(workspace):
+    index = TrigramIndex(workspace)
+    index.update()
+    index.path.write_bytes(index.path.read_bytes()[:40])
+    assert not TrigramIndex(workspace).load()
+
+
+def test_file_search_uses_index(workspace, monkeypatch):
+    res = search_index_tool()
+    assert res["success"] and res["index"]["files"] == 3
+    # It writes the index, so it must not run alongside other tools as a reader
+    assert not registry.is_read_only("search_index_tool")
+
+    scanned = []
+    real_scan = search_index.search.scan
+
+    def spy(root, paths, *args, **kwargs):
+        paths = list(paths)
+        scanned.extend(paths)
+        return real_scan(root, paths, *args, **kwargs)
+
+    monkeypatch.setattr(search_index.search, "scan", spy)
+    res = file_search_tool(name="*.py", pattern="render_page", path="src")
+
+    assert res["content"] == ["src/beta.py:1:def render_page():"]
+    assert scanned == ["beta.py"]
+
+
+def test_index_subcommand(workspace, capsys):
+    assert main(["index", "--json"]) == 0
+    assert '"files": 3' in capsys.readouterr().out
+
+
+def test_binary_files_are_never_candidates(workspace):
+    (workspace / "data.bin").write_bytes(b"parse_config\x00\x01")
+    index = TrigramIndex(workspace)
+    index.update()
+
+    assert index.candidates(["data.bin", "src/alpha.py"], "parse_config") == [
+        "src/alpha.py"
+    ]
@@ -0,0 +1,141 @@
+import json
+import pytest
+from source_agent import entrypoint
+from source_agent.sessions import SessionJournal, close_tool_calls
+from source_agent.agents.code import CodeAgent, AgentEventType
+from source_agent.mock_server import MockServer
+from source_agent.tools.artifact_read_tool import artifact_read_tool
+
+
+SCENARIO = {
+    "name": "session",
+    "steps": [
+        {"tool_calls": [{"name": "get_current_date", "arguments": {}}]},
+        {"tool_calls": [{"name": "msg_complete_tool", "arguments": {}}]},
+    ],
+}
+
+
+def tool_call_message(call_id, name="get_current_date"):
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": name, "arguments": "{}"}}
+        ],
+    }
+
+
+def test_journal_round_trip(tmp_path):
+    journal = SessionJournal("s1", tmp_path)
+    journal.checkpoint([{"role": "system", "content": "SP"}])
+    journal.append_message({"role": "user", "content": "hi"})
+    journal.append_event("tool_call", {"name": "x"})
+    journal.append_message({"role": "assistant", "content": "hello"})
+    journal.close()
+
+    messages = SessionJournal.open("s1", tmp_path).load()
+    assert [m["role"] for m in messages] == ["system", "user", "assistant"]
+    assert SessionJournal.open(journal.path).load() == messages
+
+
+def test_load_replays_only_the_tail(tmp_path):
+    journal = SessionJournal("s2", tmp_path, checkpoint_every=10)
+    for i in range(25):
+        journal.append_message({"role": "user", "content": str(i)})
+    journal.close()
+
+    checkpoint = json.loads(journal.checkpoint_path.read_text())
+    assert len(checkpoint["messages"]) == 20
+    with open(journal.path, "rb") as f:
+        f.seek(checkpoint["offset"])
+        assert len(f.readlines()) == 5
+
+    resumed = SessionJournal("s2", tmp_path)
+    assert [m["content"] for m in resumed.load()] == [str(i) for i in range(25)]
+
+
+def test_load_ignores_torn_last_line(tmp_path):
+    journal = SessionJournal("s3", tmp_path)
+    journal.append_message({"role": "user", "content": "kept"})
+    journal.close()
+    with open(journal.path, "ab") as f:
+        f.write(b'{"kind": "message", "mess')
+
+    resumed = SessionJournal("s3", tmp_path)
+    assert [m["content"] for m in resumed.load()] == ["kept"]
+    # Resuming checkpoints past the torn line, so new records stay readable
+    resumed.checkpoint()
+    resumed.append_message({"role": "user", "content": "after"})
+    resumed.close()
+    assert [m["content"] for m in SessionJournal("s3", tmp_path).load()] == ["kept", "after"]
+
+
+def test_open_unknown_session(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        SessionJournal.open("missing", tmp_path)
+
+
+def test_close_tool_calls_answers_missing_results():
+    messages = [
+        tool_call_message("a"),
+        {"role": "tool", "tool_call_id": "a", "name": "get_current_date", "content": "{}"},
+        tool_call_message("b", "msg_complete_tool"),
+        {"role": "user", "content": "next"},
+        tool_call_message("c"),
+    ]
+    closed = close_tool_calls(messages)
+    assert [m.get("tool_call_id") for m in closed if m["role"] == "tool"] == ["a", "b", "c"]
+    assert closed[3]["tool_call_id"] == "b" and closed[4]["role"] == "user"
+    assert "interrupted" in closed[-1]["content"]
+
+
+def test_agent_resumes_journaled_session(tmp_path):
+    with MockServer(SCENARIO) as server:
+        kwargs = dict(api_key="mock", base_url=server.base_url, model="mock", system_prompt="SP")
+        agent = CodeAgent(journal=SessionJournal("s4", tmp_path), **kwargs)
+        list(agent.run(user_prompt="first"))
+        agent.journal.close()
+
+        resumed = CodeAgent(journal=SessionJournal.open("s4", tmp_path), **kwargs)
+
+    assert [m["role"] for m in resumed.messages] == ["system", "user", "assistant", "tool", "assistant", "tool"]
+    assert resumed.messages[1]["content"] == "first"
+
+    records = [json.loads(line) for line in agent.journal.path.read_text().splitlines()]
+    events = [r["type"] for r in records if r["kind"] == "event"]
+    assert events[-1] == AgentEventType.RUN_SUMMARY.value
+
+
+def test_resume_unknown_session_exits(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("SOURCE_AGENT_CACHE_DIR", str(tmp_path))
+    assert entrypoint.main(["--resume", "nope"]) == 1
+    assert "No session" in capsys.readouterr().err
+
+
+def test_journaled_session_artifacts_are_readable(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_AGENT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("SOURCE_AGENT_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "AGENTS.md").write_text("SP")
+    (tmp_path / "big.txt").write_text("".join(f"line {i}\n" for i in range(1, 3001)))
+    journal = SessionJournal()
+    journal.checkpoint([{"role": "system", "content": "SP"}])
+    journal.close()
+
+    scenario = {
+        "name": "spill",
+        "steps": [
+            {"tool_calls": [{"name": "file_read_tool", "arguments": {"path": "big.txt"}}]},
+            {"tool_calls": [{"name": "msg_complete_tool", "arguments": {}}]},
+        ],
+    }
+    with MockServer(scenario) as server:
+        monkeypatch.setattr(entrypoint.source_agent.providers, "get", lambda provider: ("mock", server.base_url))
+        assert entrypoint.main(["--resume", journal.session_id, "-p", "read big.txt"]) == 0
+
+    messages = SessionJournal.open(journal.session_id).load()
+    spilled = json.loads(next(m for m in messages if m.get("name") == "file_read_tool")["content"])
+    assert spilled["artifact"].startswith(f"{journal.session_id}/")
+    page = artifact_read_tool(spilled["artifact"], start_line=2, end_line=3)
+    assert page["success"] and page["content"] == "line 2\nline 3\n"
@@ -0,0 +1,58 @@
+import sys
+import subprocess
+
+
+# Loading the package and the tool schemas must not pull these in
+HEAVY_MODULES = ["openai", "requests", "bs4", "ddgs", "pathspec"]
+
+# Generous, so slow CI machines pass; a regression to eager tool imports
+# costs well over a second
+STARTUP_BUDGET_SECONDS = 0.5
+
+
+def import_times(code):
+    """Run `code` under `python -X importtime` and return {module: seconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def test_import_skips_heavy_dependencies():
+    times = import_times(
+        "import source_agent; source_agent.tools.tool_registry.registry.get_tools()"
+    )
+    assert "source_agent" in times
+    assert [m for m in HEAVY_MODULES if m in times] == []
+
+
+def test_import_within_budget():
+    times = import_times("import source_agent.tools")
+    total = sum(seconds for name, seconds in times.items() if "." not in name)
+    assert total < STARTUP_BUDGET_SECONDS
+
+
+def test_tool_imported_on_first_call():
+    # `importlib.import_module` bypasses -X importtime, so ask sys.modules
+    code = (
+        "import sys, source_agent\n"
+        "mapping = source_agent.tools.tool_registry.registry.get_mapping()\n"
+        "mapping['get_current_date']()\n"
+        "print(' '.join(sorted(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    modules = result.stdout.split()
+    assert "source_agent.tools.get_current_date" in modules
+    assert "source_agent.tools.web_search_tool" not in modules
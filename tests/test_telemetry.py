@@ -0,0 +1,91 @@
+import json
+import pytest
+from source_agent.telemetry import LLMCallStats, RunTelemetry, percentile, format_summary
+from source_agent.agents.code import CodeAgent, AgentEventType
+
+
+def test_percentile_interpolates():
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([4, 1, 3, 2], 100) == 4
+
+
+def test_summary_totals_and_report():
+    telemetry = RunTelemetry()
+    stats = LLMCallStats()
+    stats.retries, stats.backoff_seconds = 2, 1.5
+    telemetry.record_step(1)
+    telemetry.record_llm(0.5, stats, {"prompt_tokens": 10, "completion_tokens": 3, "cached_tokens": 4})
+    telemetry.record_llm(1.5, None, {"prompt_tokens": 20, "completion_tokens": 2, "cached_tokens": 0}, cache_hit=True)
+    telemetry.record_tool("file_read_tool", 0.25)
+    telemetry.record_tool("file_read_tool", 0.75)
+
+    summary = telemetry.summary()
+    assert summary["llm"]["count"] == 2
+    assert summary["llm"]["total_seconds"] == 2.0
+    assert summary["llm"]["retries"] == 2
+    assert summary["llm"]["cache_hits"] == 1
+    assert summary["tools"]["by_name"]["file_read_tool"] == {"count": 2, "total_seconds": 1.0}
+    assert summary["tokens"] == {"prompt_tokens": 30, "completion_tokens": 5, "cached_tokens": 4}
+    json.dumps(summary)
+    assert "Run summary" in format_summary(summary)
+
+
+class DummyFunction:
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+
+
+class DummyToolCall:
+    def __init__(self, function, id):
+        self.function = function
+        self.id = id
+
+
+class DummyMessage:
+    def __init__(self, content, tool_calls):
+        self.content = content
+        self.tool_calls = tool_calls
+
+
+class DummyResponse:
+    def __init__(self, message, usage=None):
+        self.choices = [type("Choice", (), {"message": message})]
+        self.usage = usage
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr("source_agent.agents.code.openai.OpenAI", lambda *args, **kwargs: None)
+    return CodeAgent(system_prompt="SP")
+
+
+def test_run_events_carry_timings(agent):
+    agent.tool_mapping = {"noop": lambda: {"ok": True}}
+    replies = iter(
+        [
+            DummyMessage("", [DummyToolCall(DummyFunction("noop", "{}"), "1")]),
+            DummyMessage("", [DummyToolCall(DummyFunction("msg_complete_tool", "{}"), "2")]),
+        ]
+    )
+    agent.call_llm = lambda messages: DummyResponse(next(replies), {"prompt_tokens": 7, "completion_tokens": 1})
+    events = list(agent.run(user_prompt="hi", max_steps=3))
+
+    starts = [e for e in events if e.type == AgentEventType.ITERATION_START]
+    assert all("elapsed_seconds" in e.data for e in starts)
+
+    usage = [e for e in events if e.type == AgentEventType.LLM_USAGE]
+    assert len(usage) == 2
+    assert usage[0].data["llm_seconds"] >= 0 and usage[0].data["retries"] == 0
+
+    result = next(e for e in events if e.type == AgentEventType.TOOL_RESULT)
+    assert result.data["duration_seconds"] >= 0
+
+    summary = events[-1]
+    assert summary.type == AgentEventType.RUN_SUMMARY
+    assert summary.data["steps"] == 2
+    assert summary.data["llm"]["count"] == 2
+    assert summary.data["tools"]["by_name"]["noop"]["count"] == 1
+    assert summary.data["tokens"]["prompt_tokens"] == 14
@@ -0,0 +1,102 @@
+import sys
+import pytest
+import textwrap
+import importlib
+from source_agent.tools.tool_registry import LazyTool, ToolRegistry, registry
+
+
+PLUGIN = textwrap.dedent("""
+    from source_agent.tools.tool_registry import registry
+
+
+    @registry.register(
+        name="plugin_echo_tool",
+        description="Echo the text back.",
+        parameters={"type": "object", "properties": {"text": {"type": "string"}}},
+        read_only=True,
+    )
+    def plugin_echo_tool(text):
+        return {"success": True, "content": [text]}
+    """)
+
+
+def install_plugin(root, version="1.0"):
+    """Install a fake distribution declaring a tool entry point into `root`."""
+    (root / "acme_tools.py").write_text(PLUGIN)
+    dist_info = root / "acme_tools-1.0.dist-info"
+    dist_info.mkdir(exist_ok=True)
+    (dist_info / "METADATA").write_text(
+        f"Metadata-Version: 2.1\nName: acme-tools\nVersion: {version}\n"
+    )
+    (dist_info / "entry_points.txt").write_text(
+        "[source_agent.tools]\necho = acme_tools\n"
+    )
+    importlib.invalidate_caches()
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_AGENT_CACHE_DIR", str(tmp_path / "cache"))
+    site = tmp_path / "site"
+    site.mkdir()
+    monkeypatch.syspath_prepend(str(site))
+    install_plugin(site)
+
+    # Plugin modules register with the global registry; restore it afterwards
+    saved = (
+        list(registry.tools),
+        dict(registry.tool_mapping),
+        set(registry.read_only),
+        dict(registry.sources),
+        dict(registry._positions),
+    )
+    yield site
+    sys.modules.pop("acme_tools", None)
+    registry.tools[:] = saved[0]
+    for attr, value in zip(
+        ["tool_mapping", "read_only", "sources", "_positions"], saved[1:], strict=True
+    ):
+        setattr(registry, attr, value)
+
+
+def test_discover_imports_plugins_and_caches_manifest(plugin, tmp_path):
+    tr = ToolRegistry()
+    assert tr.discover() == ["plugin_echo_tool"]
+    assert tr.is_read_only("plugin_echo_tool")
+    assert tr.get_mapping()["plugin_echo_tool"]("hi")["content"] == ["hi"]
+    assert list((tmp_path / "cache" / "tools").glob("manifest-*.json"))
+
+
+def test_discover_cache_hit_defers_import(plugin):
+    ToolRegistry().discover()
+    sys.modules.pop("acme_tools")
+
+    tr = ToolRegistry()
+    assert tr.discover() == ["plugin_echo_tool"]
+    assert "acme_tools" not in sys.modules
+    assert isinstance(tr.get_mapping()["plugin_echo_tool"], LazyTool)
+
+    assert tr.get_mapping()["plugin_echo_tool"]("hi")["success"]
+    assert "acme_tools" in sys.modules
+    assert tr.resolve("plugin_echo_tool") is sys.modules["acme_tools"].plugin_echo_tool
+
+
+def test_discover_cache_keyed_by_version(plugin, tmp_path):
+    ToolRegistry().discover()
+    install_plugin(plugin, version="2.0")
+    ToolRegistry().discover()
+    assert len(list((tmp_path / "cache" / "tools").glob("manifest-*.json"))) == 2
+
+
+def test_discover_skips_broken_plugin(plugin, capsys):
+    (plugin / "acme_tools.py").write_text("raise ImportError('boom')")
+    assert ToolRegistry().discover(cache=False) == []
+    assert "boom" in capsys.readouterr().err
+
+
+def test_register_replaces_schema_in_place():
+    tr = ToolRegistry()
+    for name in ["a", "b"]:
+        tr.register(name=name, description="old", parameters={})(lambda: None)
+    tr.register(name="a", description="new", parameters={})(lambda: None)
+    assert [t["function"]["description"] for t in tr.get_tools()] == ["new", "old"]
@@ -5,6 +5,7 @@ import pytest
 import tempfile
 import shutil
 import re
+import json
 from source_agent.tools.file_list_tool import file_list_tool, load_gitignore
 from source_agent.tools.file_read_tool import file_read_tool
 from source_agent.tools.file_write_tool import file_write_tool
@@ -222,3 +223,45 @@ def test_web_search_tool_failure(monkeypatch):
     monkeypatch.setattr("source_agent.tools.web_search_tool.DDGS", BadDDGS)
     res = web_search_tool(query="x")
     assert not res["success"] and "Search failed" in res["content"][0]
+
+
+def test_tool_registry_read_only():
+    tr = ToolRegistry()
+
+    @tr.register(name="r", description="d", parameters={}, read_only=True)
+    def reader():
+        return True
+
+    @tr.register(name="w", description="d", parameters={})
+    def writer():
+        return True
+
+    assert tr.is_read_only("r")
+    assert not tr.is_read_only("w")
+
+
+def test_tool_registry_manifest_defers_import(tmp_path):
+    tr = ToolRegistry()
+    tr.register(name="d", description="d", parameters={}, read_only=True)(
+        file_delete_tool
+    )
+    path = tmp_path / "manifest.json"
+    tr.write_manifest(path)
+
+    lazy = ToolRegistry()
+    lazy.load_manifest(path)
+    assert lazy.get_tools() == tr.get_tools()
+    assert lazy.is_read_only("d")
+    assert lazy.get_mapping()["d"].resolve() is file_delete_tool
+
+
+def test_tool_manifest_is_current():
+    from source_agent.tools import MANIFEST, import_all
+    from source_agent.tools.tool_registry import registry
+
+    import_all()
+    on_disk = json.loads(MANIFEST.read_text(encoding="utf-8"))
+    # Stale when a tool was added or changed without `python -m source_agent.tools`
+    assert registry.manifest() == on_disk
+    names = [entry["schema"]["function"]["name"] for entry in on_disk]
+    assert names == sorted(names)